@@ -32,22 +32,66 @@ def create_app(config_name='development'):
     jwt.init_app(app)
     migrate.init_app(app, db)
 
-    # Configure cache
-    app.config['CACHE_TYPE'] = 'SimpleCache'
-    app.config['CACHE_DEFAULT_TIMEOUT'] = 120
+    # Configure cache (backend chosen by CACHE_TYPE in config)
     cache.init_app(app)
+
+    # Configure friend graph cache
+    from app.utils.friend_cache import friend_cache
+    friend_cache.configure(
+        max_users=app.config['FRIEND_CACHE_MAX_USERS'],
+        ttl=app.config['FRIEND_CACHE_TTL']
+    )
     
+    # Live location write-behind store
+    from app.utils.live_locations import live_locations
+    live_locations.init_app(app)
+
+    # Presence registry (in memory, or shared by every worker)
+    from app.utils.presence import presence
+    presence.init_app(app)
+
+    # Chat history ring buffers
+    from app.utils.chat_history import chat_history
+    chat_history.init_app(app)
+
+    # Chat group commit
+    from app.utils.chat_writer import chat_writer
+    chat_writer.init_app(app)
+
+    # Typing indicator coalescing and DM conversation membership cache
+    from app.utils.typing_indicators import typing_indicators, conversation_members
+    typing_indicators.init_app(app)
+    conversation_members.init_app(app)
+
+    # Photo derivative rendering pool
+    from app.utils.media_pipeline import media_pipeline
+    media_pipeline.init_app(app)
+
+    # Conditional, cacheable media responses (optionally served by nginx)
+    from app.utils.media_files import media_files
+    media_files.init_app(app)
+
+    # Resumable (chunked) video uploads
+    from app.utils.resumable_uploads import resumable_uploads
+    resumable_uploads.init_app(app)
+
+    # Per-request SQL instrumentation
+    from app.utils.sql_profiler import sql_profiler
+    sql_profiler.init_app(app)
+
     # Configure CORS
     CORS(app, 
          origins=app.config['CORS_ORIGINS'],
          supports_credentials=True,
-         allow_headers=['Content-Type', 'Authorization'],
-         methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
+         allow_headers=['Content-Type', 'Authorization', 'Upload-Offset', 'Upload-Checksum'],
+         expose_headers=['Upload-Offset', 'Upload-Length', 'Location'],
+         methods=['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
     
     # Initialize SocketIO
     socketio.init_app(app,
                      cors_allowed_origins=app.config['CORS_ORIGINS'],
-                     async_mode='eventlet')
+                     async_mode='eventlet',
+                     message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
     
     # Initialize Flask-RESTX API
     api = Api(
@@ -169,8 +213,18 @@ def create_app(config_name='development'):
     except ImportError:
         pass
 
+    try:
+        from app.routes.debug_swagger import api as debug_ns
+        api.add_namespace(debug_ns, path='/_debug')
+    except ImportError:
+        pass
+
     # Import WebSocket events
     from app import socket_events
+
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
     
     # Health check endpoint
     @app.route('/health')
@@ -0,0 +1,77 @@
+"""
+Flask CLI commands
+Run with `flask --app run <command>` from the backend directory
+"""
+import time
+
+import click
+
+from app.models import recompute_show_counts, recompute_user_stats
+from app.utils import feed
+from app.utils.presence import presence
+from app.utils.media_pipeline import media_pipeline
+from app.utils.resumable_uploads import resumable_uploads
+from app.utils.synthetic import seed_synthetic, SYNTHETIC_PASSWORD
+
+
+def register_commands(app):
+    """Attach maintenance commands to the app's CLI group"""
+
+    @app.cli.command('recount-shows')
+    def recount_shows():
+        """Recompute denormalized per-show media/comment/song counters."""
+        drifted = recompute_show_counts()
+        click.echo(f'Recomputed show counters ({drifted} shows had drifted)')
+
+    @app.cli.command('rebuild-user-stats')
+    def rebuild_user_stats():
+        """Rebuild per-user dashboard totals and distinct artist/venue references."""
+        drifted = recompute_user_stats()
+        click.echo(f'Rebuilt user stats ({drifted} users had drifted)')
+
+    @app.cli.command('rebuild-feed')
+    def rebuild_feed():
+        """Rebuild every user's home feed timeline from friendships and visibility."""
+        written = feed.rebuild_all()
+        click.echo(f'Rebuilt feed timelines ({written} entries)')
+
+    @app.cli.command('reset-presence')
+    def reset_presence():
+        """Forget shared presence left behind by stopped workers; run before starting them."""
+        presence.reset()
+        click.echo(f"Cleared presence ({presence.stats()['backend']})")
+
+    @app.cli.command('process-photos')
+    @click.option('--skip-failed', is_flag=True, help="Leave photos marked 'failed' alone")
+    @click.option('--variants', is_flag=True, help='Also render the size ladder for ready photos that have none')
+    def process_photos(skip_failed, variants):
+        """Render derivatives for photos a stopped server left pending (and retry failed ones)."""
+        processed = media_pipeline.process_pending(include_failed=not skip_failed, missing_variants=variants)
+        click.echo(f'Processed {processed} photos ({media_pipeline.failed} failed)')
+
+    @app.cli.command('expire-uploads')
+    def expire_uploads():
+        """Delete resumable uploads left idle past MEDIA_UPLOAD_EXPIRY, and stray partial files."""
+        removed = resumable_uploads.expire()
+        click.echo(f'Removed {removed} expired uploads')
+
+    @app.cli.command('seed-synthetic')
+    @click.option('--users', default=1000, show_default=True, help='Number of users')
+    @click.option('--shows', default=100000, show_default=True, help='Number of shows across all users')
+    @click.option('--artists', default=2000, show_default=True)
+    @click.option('--venues', default=500, show_default=True)
+    @click.option('--avg-friends', default=20, show_default=True, help='Mean friends per user (power-law spread)')
+    @click.option('--shows-per-concert', default=3.0, show_default=True, help='Mean shows sharing one concert')
+    @click.option('--seed', default=42, show_default=True, help='Random seed; same seed and sizes give the same data')
+    @click.option('--batch-size', default=10000, show_default=True, help='Rows per INSERT batch')
+    def seed_synthetic_command(users, shows, artists, venues, avg_friends, shows_per_concert, seed, batch_size):
+        """Bulk-load a deterministic synthetic dataset for benchmarking."""
+        started = time.perf_counter()
+        counts = seed_synthetic(
+            users=users, shows=shows, artists=artists, venues=venues, avg_friends=avg_friends,
+            shows_per_concert=shows_per_concert, seed=seed, batch_size=batch_size, log=click.echo
+        )
+        for table, count in sorted(counts.items()):
+            click.echo(f'  {table}: {count}')
+        click.echo(f'Seeded in {time.perf_counter() - started:.1f}s '
+                   f'(all synthetic users have password {SYNTHETIC_PASSWORD!r})')
@@ -1,9 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import json
 import pyotp
 
+from app.utils.friend_cache import friend_cache
+
 db = SQLAlchemy()
 
 class User(db.Model):
@@ -140,19 +143,55 @@ class Venue(db.Model):
             'longitude': self.longitude
         }
 
+class Concert(db.Model):
+    """Canonical concert identity shared by every user's show for the same artist/venue/date"""
+    __tablename__ = 'concerts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    shows = db.relationship('Show', backref='concert', lazy='dynamic')
+
+    __table_args__ = (
+        db.UniqueConstraint('artist_id', 'venue_id', 'date', name='unique_concert'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'artist_id': self.artist_id,
+            'venue_id': self.venue_id,
+            'date': self.date.isoformat() if self.date else None
+        }
+
 class Show(db.Model):
     """Show/Concert model"""
     __tablename__ = 'shows'
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
+    # active_history: a change of artist/venue must know the old one for the user_stats refs
+    artist_id = db.column_property(db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False),
+                                   active_history=True)
+    venue_id = db.column_property(db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False),
+                                  active_history=True)
+    concert_id = db.Column(db.Integer, db.ForeignKey('concerts.id'), nullable=True, index=True)
     date = db.Column(db.Date, nullable=False, index=True)
     time = db.Column(db.Time)
     notes = db.Column(db.Text)
     rating = db.Column(db.Integer)
-    visible_to = db.Column(db.Text, nullable=True)  # JSON array of friend IDs, null = visible to all friends
+    visibility_restricted = db.Column(db.Boolean, nullable=False, default=False, server_default='0')  # False = visible to all friends
+
+    # Denormalized counters, kept exact by _apply_show_counter_deltas (flask recount-shows repairs drift)
+    photo_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    audio_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    video_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    song_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -163,20 +202,24 @@ class Show(db.Model):
     setlist_songs = db.relationship('SetlistSong', backref='show', lazy='dynamic', cascade='all, delete-orphan', order_by='SetlistSong.order')
     checkins = db.relationship('ShowCheckin', backref='show', lazy='dynamic', cascade='all, delete-orphan')
     chat_messages = db.relationship('ChatMessage', backref='show', lazy='dynamic', cascade='all, delete-orphan')
+    visibility_entries = db.relationship('ShowVisibility', backref='show', cascade='all, delete-orphan')
     
     def to_dict(self, include_details=False, viewer_id=None, counts=None):
         if counts:
             photo_count, audio_count, video_count, comment_count, song_count = counts
         else:
-            photo_count = self.photos.count()
-            audio_count = self.audio_recordings.count()
-            video_count = self.video_recordings.count()
-            comment_count = self.comments.count()
-            song_count = self.setlist_songs.count()
+            photo_count = self.photo_count or 0
+            audio_count = self.audio_count or 0
+            video_count = self.video_count or 0
+            comment_count = self.comment_count or 0
+            song_count = self.song_count or 0
 
         data = {
             'id': self.id,
             'user_id': self.user_id,
+            'artist_id': self.artist_id,
+            'venue_id': self.venue_id,
+            'concert_id': self.concert_id,
             'owner': {'id': self.user.id, 'username': self.user.username} if self.user else None,
             'is_owner': viewer_id == self.user_id if viewer_id else None,
             'artist': self.artist.to_dict() if self.artist else None,
@@ -184,6 +227,7 @@ class Show(db.Model):
             'date': self.date.isoformat() if self.date else None,
             'time': self.time.strftime('%H:%M') if self.time else None,
             'notes': self.notes,
+            'rating': self.rating,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'photo_count': photo_count,
             'audio_count': audio_count,
@@ -203,19 +247,63 @@ class Show(db.Model):
 
     def get_visible_to_ids(self):
         """Return set of friend IDs this show is visible to, or None (= all friends)."""
-        if self.visible_to is None:
-            return None
-        try:
-            return set(json.loads(self.visible_to))
-        except (json.JSONDecodeError, TypeError):
+        if not self.visibility_restricted:
             return None
+        return {entry.user_id for entry in self.visibility_entries}
 
     def set_visible_to(self, friend_ids):
         """Set selective visibility list. None = visible to all friends."""
         if friend_ids is None:
-            self.visible_to = None
-        else:
-            self.visible_to = json.dumps([int(fid) for fid in friend_ids])
+            self.visibility_restricted = False
+            self.visibility_entries = []
+            return
+        wanted = {int(fid) for fid in friend_ids}
+        kept = [entry for entry in self.visibility_entries if entry.user_id in wanted]
+        existing = {entry.user_id for entry in kept}
+        self.visibility_restricted = True
+        self.visibility_entries = kept + [ShowVisibility(user_id=uid) for uid in sorted(wanted - existing)]
+
+    @staticmethod
+    def visible_to_clause(viewer_id):
+        """SQL predicate: the show is visible to viewer_id (unrestricted, or viewer is on its list)."""
+        return db.or_(
+            Show.visibility_restricted.is_(False),
+            db.exists().where(
+                ShowVisibility.show_id == Show.id,
+                ShowVisibility.user_id == viewer_id
+            )
+        )
+
+    def same_concert_clause(self):
+        """SQL predicate: a show of the same concert (only this show if it has no concert yet)."""
+        if self.concert_id is None:
+            return Show.id == self.id
+        return Show.concert_id == self.concert_id
+
+
+class ShowVisibility(db.Model):
+    """Friends a restricted show is visible to"""
+    __tablename__ = 'show_visibility'
+
+    show_id = db.Column(db.Integer, db.ForeignKey('shows.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True, index=True)
+
+class FeedEntry(db.Model):
+    """Materialized home-feed timeline row: a friend's show visible to a viewer"""
+    __tablename__ = 'feed_entries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    viewer_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    show_id = db.Column(db.Integer, db.ForeignKey('shows.id', ondelete='CASCADE'), nullable=False, index=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    show_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('viewer_id', 'show_id', name='unique_feed_entry'),
+        db.Index('ix_feed_entries_viewer_order', 'viewer_id', 'show_date', 'show_id'),
+        db.Index('ix_feed_entries_viewer_owner', 'viewer_id', 'owner_id'),
+    )
 
 class Photo(db.Model):
     """Photo model"""
@@ -223,15 +311,41 @@ class Photo(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    show_id = db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False)
+    show_id = db.column_property(db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False, index=True),
+                                 active_history=True)  # a move updates both shows' counters
     filename = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255))
     thumbnail_filename = db.Column(db.String(255))
     caption = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Derivative rendering: pending -> processing -> ready | failed (see app.utils.media_pipeline)
+    processing_status = db.Column(db.String(20), nullable=False, default='ready', server_default='ready')
+    variants = db.Column(db.Text)  # JSON list of resized WebP/AVIF copies: [{w, h, format, file, bytes}]
+
+    # Dashboard activity reads each user's newest rows first
+    __table_args__ = (
+        db.Index('ix_photos_user_created', 'user_id', 'created_at'),
+    )
 
     comments = db.relationship('Comment', backref='photo', lazy='dynamic', cascade='all, delete-orphan')
 
+    def get_variants(self):
+        if self.variants:
+            try:
+                return json.loads(self.variants)
+            except (json.JSONDecodeError, TypeError):
+                return []
+        return []
+
+    def set_variants(self, value):
+        self.variants = json.dumps(value) if value else None
+
+    def srcset(self, fmt='webp'):
+        """`srcset` attribute value for one format's variants, or None before they exist."""
+        entries = [f"/api/photos/{self.id}?w={v['w']}&format={fmt} {v['w']}w"
+                   for v in self.get_variants() if v['format'] == fmt]
+        return ', '.join(entries) or None
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -240,10 +354,13 @@ class Photo(db.Model):
             'original_filename': self.original_filename,
             'thumbnail_filename': self.thumbnail_filename,
             'caption': self.caption,
+            'processing_status': self.processing_status,
             'comment_count': self.comments.count(),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'url': f'/api/photos/{self.id}',
-            'thumbnail_url': f'/api/photos/{self.id}/thumbnail' if self.thumbnail_filename else None
+            'thumbnail_url': f'/api/photos/{self.id}/thumbnail' if self.thumbnail_filename else None,
+            'srcset': self.srcset('webp'),
+            'avif_srcset': self.srcset('avif')
         }
 
 class AudioRecording(db.Model):
@@ -252,12 +369,18 @@ class AudioRecording(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    show_id = db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False)
+    show_id = db.column_property(db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False, index=True),
+                                 active_history=True)  # a move updates both shows' counters
     filename = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255))
     title = db.Column(db.String(200))
     duration = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Dashboard activity reads each user's newest rows first
+    __table_args__ = (
+        db.Index('ix_audio_recordings_user_created', 'user_id', 'created_at'),
+    )
     
     def to_dict(self):
         return {
@@ -277,7 +400,8 @@ class VideoRecording(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    show_id = db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False)
+    show_id = db.column_property(db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False, index=True),
+                                 active_history=True)  # a move updates both shows' counters
     filename = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255))
     file_path = db.Column(db.String(500))
@@ -288,6 +412,11 @@ class VideoRecording(db.Model):
     thumbnail_filename = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Dashboard activity reads each user's newest rows first
+    __table_args__ = (
+        db.Index('ix_video_recordings_user_created', 'user_id', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -304,18 +433,52 @@ class VideoRecording(db.Model):
             'thumbnail_url': f'/api/videos/{self.id}/thumbnail' if self.thumbnail_filename else None
         }
 
+class UploadSession(db.Model):
+    """Resumable video upload in progress; its bytes are in a part file (see app.utils.resumable_uploads)"""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, also the part file's name
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    show_id = db.Column(db.Integer, db.ForeignKey('shows.id', ondelete='CASCADE'), nullable=False)
+    original_filename = db.Column(db.String(255), nullable=False)
+    title = db.Column(db.String(200))
+    description = db.Column(db.Text)
+    length = db.Column(db.BigInteger, nullable=False)  # total bytes the client will send
+    video_id = db.Column(db.Integer, db.ForeignKey('video_recordings.id', ondelete='SET NULL'))  # once completed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def to_dict(self, offset):
+        return {
+            'id': self.id,
+            'show_id': self.show_id,
+            'filename': self.original_filename,
+            'length': self.length,
+            'offset': offset,
+            'video_id': self.video_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'url': f'/api/videos/uploads/{self.id}'
+        }
+
 class Comment(db.Model):
     """Comment model"""
     __tablename__ = 'comments'
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    show_id = db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False)
+    show_id = db.column_property(db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False, index=True),
+                                 active_history=True)  # a move updates both shows' counters
     photo_id = db.Column(db.Integer, db.ForeignKey('photos.id'), nullable=True)
     text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Dashboard activity reads each user's newest rows first
+    __table_args__ = (
+        db.Index('ix_comments_user_created', 'user_id', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -332,7 +495,8 @@ class SetlistSong(db.Model):
     __tablename__ = 'setlist_songs'
 
     id = db.Column(db.Integer, primary_key=True)
-    show_id = db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False)
+    show_id = db.column_property(db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False, index=True),
+                                 active_history=True)  # a move updates both shows' counters
     title = db.Column(db.String(200), nullable=False)
     order = db.Column(db.Integer, nullable=False)
     notes = db.Column(db.Text)
@@ -398,7 +562,9 @@ class ShowCheckin(db.Model):
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
     last_location_update = db.Column(db.DateTime)
-    share_with = db.Column(db.Text, nullable=True)  # JSON array of friend IDs, null = all friends
+    share_restricted = db.Column(db.Boolean, nullable=False, default=False, server_default='0')  # False = all friends
+
+    share_entries = db.relationship('CheckinShare', backref='checkin', cascade='all, delete-orphan')
 
     __table_args__ = (
         db.UniqueConstraint('user_id', 'show_id', name='unique_user_show_checkin'),
@@ -406,21 +572,36 @@ class ShowCheckin(db.Model):
 
     def get_share_with_ids(self):
         """Return set of friend IDs to share with, or None (= all friends)."""
-        if self.share_with is None:
-            return None
-        try:
-            return set(json.loads(self.share_with))
-        except (json.JSONDecodeError, TypeError):
+        if not self.share_restricted:
             return None
+        return {entry.user_id for entry in self.share_entries}
 
     def set_share_with(self, friend_ids):
         """Set selective sharing list. None = share with all friends."""
         if friend_ids is None:
-            self.share_with = None
-        else:
-            self.share_with = json.dumps([int(fid) for fid in friend_ids])
+            if self.share_restricted or self.share_entries:
+                self.share_entries = []
+            self.share_restricted = False
+            return
+        wanted = {int(fid) for fid in friend_ids}
+        kept = [entry for entry in self.share_entries if entry.user_id in wanted]
+        existing = {entry.user_id for entry in kept}
+        self.share_restricted = True
+        self.share_entries = kept + [CheckinShare(user_id=uid) for uid in sorted(wanted - existing)]
+
+    @staticmethod
+    def shared_with_clause(viewer_id):
+        """SQL predicate: the checkin's location is shared with viewer_id."""
+        return db.or_(
+            ShowCheckin.share_restricted.is_(False),
+            db.exists().where(
+                CheckinShare.checkin_id == ShowCheckin.id,
+                CheckinShare.user_id == viewer_id
+            )
+        )
 
     def to_dict(self):
+        share_ids = self.get_share_with_ids()
         return {
             'id': self.id,
             'user': self.user.to_dict() if self.user else None,
@@ -428,9 +609,17 @@ class ShowCheckin(db.Model):
             'checked_in_at': self.checked_in_at.isoformat() if self.checked_in_at else None,
             'checked_out_at': self.checked_out_at.isoformat() if self.checked_out_at else None,
             'is_active': self.is_active,
-            'share_with': self.get_share_with_ids(),
+            'share_with': sorted(share_ids) if share_ids is not None else None,
         }
 
+
+class CheckinShare(db.Model):
+    """Friends a checkin's live location is shared with (when share_restricted)"""
+    __tablename__ = 'checkin_share'
+
+    checkin_id = db.Column(db.Integer, db.ForeignKey('show_checkins.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True, index=True)
+
 class Conversation(db.Model):
     """Direct message conversation between two users"""
     __tablename__ = 'conversations'
@@ -497,7 +686,7 @@ class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
     
     id = db.Column(db.Integer, primary_key=True)
-    show_id = db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False)
+    show_id = db.Column(db.Integer, db.ForeignKey('shows.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -553,17 +742,362 @@ class Notification(db.Model):
         }
 
 
-def get_friend_ids(user_id):
-    """Get set of user IDs that are accepted friends of the given user."""
-    friendships = Friendship.query.filter(
+# Dashboard totals kept in user_stats, in the order the dashboard returns them
+USER_STAT_FIELDS = (
+    'total_shows', 'total_artists', 'total_venues', 'total_photos',
+    'total_audio', 'total_videos', 'total_comments',
+)
+
+
+class UserStats(db.Model):
+    """Per-user dashboard totals, maintained on every flush that adds or removes shows/media"""
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total_shows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_artists = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_venues = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_photos = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_audio = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_videos = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_comments = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def to_dict(self):
+        return {field: getattr(self, field) or 0 for field in USER_STAT_FIELDS}
+
+
+class UserArtistRef(db.Model):
+    """How many of a user's shows feature an artist; one row per distinct artist seen"""
+    __tablename__ = 'user_artist_refs'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), primary_key=True)
+    show_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class UserVenueRef(db.Model):
+    """How many of a user's shows were at a venue; one row per distinct venue visited"""
+    __tablename__ = 'user_venue_refs'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), primary_key=True)
+    show_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+def _load_friend_ids(user_id):
+    rows = db.session.query(Friendship.user_id, Friendship.friend_id).filter(
         db.or_(
             Friendship.user_id == user_id,
             Friendship.friend_id == user_id
         ),
         Friendship.status == 'accepted'
     ).all()
-    ids = set()
-    for f in friendships:
-        ids.add(f.friend_id if f.user_id == user_id else f.user_id)
-    return ids
+    return {friend_id if uid == user_id else uid for uid, friend_id in rows}
+
+
+def get_friend_ids(user_id, cached=True):
+    """Get set of user IDs that are accepted friends of the given user.
+    Served from the in-process friend cache; the returned frozenset must not be mutated.
+    cached=False reads the friendships table instead, for writes that must not act on a
+    copy another worker has not yet invalidated (e.g. feed fan-out)."""
+    if not cached:
+        return frozenset(_load_friend_ids(user_id))
+    return friend_cache.get(user_id, _load_friend_ids)
+
+
+def get_sibling_show_ids(show_id):
+    """Get all show IDs for the same concert in a single indexed read on shows.concert_id."""
+    sibling = db.aliased(Show)
+    rows = db.session.query(sibling.id).join(
+        Show, sibling.concert_id == Show.concert_id
+    ).filter(Show.id == show_id).all()
+    if not rows:
+        return [show_id]
+    return [r.id for r in rows]
+
+
+def _concert_key(show):
+    return (show.artist_id, show.venue_id, show.date)
+
+
+def _concert_for(session, artist_id, venue_id, show_date):
+    """The Concert for an artist/venue/date, inserted if there is none yet. The INSERT runs
+    in a savepoint, so losing the race to another flush that inserted the same concert
+    (unique_concert) rolls back only the savepoint, and that row is read instead."""
+    key = {'artist_id': artist_id, 'venue_id': venue_id, 'date': show_date}
+    concert = Concert.query.filter_by(**key).first()
+    if concert:
+        return concert
+    connection = session.connection()
+    try:
+        with connection.begin_nested():
+            concert_id = connection.execute(Concert.__table__.insert().values(**key)).inserted_primary_key[0]
+    except IntegrityError:
+        concert = Concert.query.filter_by(**key).first()
+        if concert is None:
+            raise
+        return concert
+    return session.get(Concert, concert_id)
+
 
+@db.event.listens_for(db.session, 'before_flush')
+def _sync_show_concerts(session, flush_context, instances):
+    """Keep Show.concert_id pointing at the canonical Concert row on create/update/delete.
+    A Concert left without shows, by deletes or by shows moving to another one, is deleted."""
+    pending = {}
+    previous = {}  # moved show -> concert_id it had before this flush
+    for obj in session.new:
+        if isinstance(obj, Show) and obj.concert_id is None and obj.concert is None:
+            pending.setdefault(_concert_key(obj), []).append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Show) and session.is_modified(obj):
+            state = db.inspect(obj)
+            if any(state.attrs[attr].history.has_changes() for attr in ('artist_id', 'venue_id', 'date')):
+                pending.setdefault(_concert_key(obj), []).append(obj)
+                history = state.attrs['concert_id'].history
+                previous[obj] = (history.deleted or history.unchanged or [obj.concert_id])[0]
+
+    with session.no_autoflush:
+        assigned = set()  # concerts shows are joining in this flush
+        for (artist_id, venue_id, show_date), shows in pending.items():
+            if artist_id is None or venue_id is None or show_date is None:
+                continue
+            concert = _concert_for(session, artist_id, venue_id, show_date)
+            for show in shows:
+                show.concert = concert
+            assigned.add(concert.id)
+
+        # Drop concerts whose last show is being deleted or moved to another concert
+        deleted_ids = {}
+        for obj in session.deleted:
+            if isinstance(obj, Show) and obj.concert_id is not None:
+                deleted_ids.setdefault(obj.concert_id, set()).add(obj.id)
+        for show, concert_id in previous.items():
+            if concert_id is not None and show.concert is not None and show.concert.id != concert_id:
+                deleted_ids.setdefault(concert_id, set()).add(show.id)
+        if previous:
+            from app.utils.live_locations import live_locations  # imports this module
+            for show in previous:
+                live_locations.show_moved(show.id)
+        for concert_id, show_ids in deleted_ids.items():
+            if concert_id in assigned:
+                continue
+            remaining = Show.query.filter(
+                Show.concert_id == concert_id,
+                Show.id.notin_(show_ids)
+            ).with_entities(Show.id).first()
+            if not remaining:
+                concert = Concert.query.get(concert_id)
+                if concert:
+                    session.delete(concert)
+
+
+# Child model -> Show counter column it maintains
+SHOW_COUNTER_COLUMNS = {
+    Photo: 'photo_count',
+    AudioRecording: 'audio_count',
+    VideoRecording: 'video_count',
+    Comment: 'comment_count',
+    SetlistSong: 'song_count',
+}
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def _apply_show_counter_deltas(session, flush_context):
+    """Apply per-show counter deltas for media/comment/song inserts, deletes and moves to
+    another show in this flush. One UPDATE per affected show, inside the same transaction
+    as the writes."""
+    deltas = {}
+
+    def bump(show_id, column, step):
+        if show_id is not None:
+            per_show = deltas.setdefault(show_id, {})
+            per_show[column] = per_show.get(column, 0) + step
+
+    for objs, step in ((session.new, 1), (session.deleted, -1)):
+        for obj in objs:
+            column = SHOW_COUNTER_COLUMNS.get(type(obj))
+            if column:
+                bump(obj.show_id, column, step)
+    for obj in session.dirty:
+        column = SHOW_COUNTER_COLUMNS.get(type(obj))
+        if column:
+            history = db.inspect(obj).attrs['show_id'].history
+            for old in history.deleted:
+                bump(old, column, -1)
+            for new in history.added:
+                bump(new, column, 1)
+
+    deleted_show_ids = {obj.id for obj in session.deleted if isinstance(obj, Show)}
+    shows = Show.__table__
+    for show_id, columns in deltas.items():
+        if show_id in deleted_show_ids:
+            continue
+        values = {col: shows.c[col] + delta for col, delta in columns.items() if delta}
+        if values:
+            session.connection().execute(
+                shows.update().where(shows.c.id == show_id).values(**values)
+            )
+
+
+def recompute_show_counts():
+    """Recompute every Show counter from the child tables. Returns the number of shows that drifted."""
+    shows = Show.__table__
+    exact = {
+        column: db.select(db.func.count()).select_from(model.__table__)
+            .where(model.__table__.c.show_id == shows.c.id).scalar_subquery()
+        for model, column in SHOW_COUNTER_COLUMNS.items()
+    }
+    drifted = db.session.execute(
+        db.select(db.func.count()).select_from(shows).where(
+            db.or_(*[shows.c[column] != expr for column, expr in exact.items()])
+        )
+    ).scalar()
+    db.session.execute(shows.update().values(**exact))
+    db.session.commit()
+    return drifted
+
+
+# Model -> user_stats column it maintains (keyed by the row's user_id)
+USER_STAT_COLUMNS = {
+    Show: 'total_shows',
+    Photo: 'total_photos',
+    AudioRecording: 'total_audio',
+    VideoRecording: 'total_videos',
+    Comment: 'total_comments',
+}
+
+
+def _apply_ref_delta(connection, table, key_column, user_id, key, delta):
+    """Adjust one user/artist or user/venue reference count.
+    Returns +1 when the reference was created, -1 when it dropped to zero, else 0."""
+    where = db.and_(table.c.user_id == user_id, table.c[key_column] == key)
+    result = connection.execute(
+        table.update().where(where).values(show_count=table.c.show_count + delta)
+    )
+    if result.rowcount == 0:
+        if delta <= 0:
+            return 0
+        connection.execute(table.insert().values(user_id=user_id, show_count=delta, **{key_column: key}))
+        return 1
+    if delta < 0:
+        removed = connection.execute(table.delete().where(where, table.c.show_count <= 0))
+        return -1 if removed.rowcount else 0
+    return 0
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def _apply_user_stat_deltas(session, flush_context):
+    """Keep user_stats and the distinct artist/venue references in step with this flush.
+    Runs on the flush connection, so the totals commit or roll back with the writes."""
+    totals = {}
+    refs = {'artist_id': {}, 'venue_id': {}}
+
+    def bump(user_id, column, step):
+        per_user = totals.setdefault(user_id, {})
+        per_user[column] = per_user.get(column, 0) + step
+
+    for objs, step in ((session.new, 1), (session.deleted, -1)):
+        for obj in objs:
+            column = USER_STAT_COLUMNS.get(type(obj))
+            if not column or obj.user_id is None:
+                continue
+            bump(obj.user_id, column, step)
+            if isinstance(obj, Show):
+                for key_column, per_key in refs.items():
+                    key = (obj.user_id, getattr(obj, key_column))
+                    per_key[key] = per_key.get(key, 0) + step
+
+    # A show moved to another artist/venue swaps one reference for another
+    for obj in session.dirty:
+        if isinstance(obj, Show):
+            state = db.inspect(obj)
+            for key_column, per_key in refs.items():
+                history = state.attrs[key_column].history
+                if not history.has_changes():
+                    continue
+                for old in history.deleted:
+                    per_key[(obj.user_id, old)] = per_key.get((obj.user_id, old), 0) - 1
+                for new in history.added:
+                    per_key[(obj.user_id, new)] = per_key.get((obj.user_id, new), 0) + 1
+
+    if not totals and not any(refs.values()):
+        return
+
+    connection = session.connection()
+    deleted_user_ids = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    ref_tables = {
+        'artist_id': (UserArtistRef.__table__, 'total_artists'),
+        'venue_id': (UserVenueRef.__table__, 'total_venues'),
+    }
+    for key_column, per_key in refs.items():
+        table, column = ref_tables[key_column]
+        for (user_id, key), delta in per_key.items():
+            if not delta or key is None or user_id in deleted_user_ids:
+                continue
+            change = _apply_ref_delta(connection, table, key_column, user_id, key, delta)
+            if change:
+                bump(user_id, column, change)
+
+    stats = UserStats.__table__
+    for user_id, columns in totals.items():
+        if user_id in deleted_user_ids:
+            continue
+        deltas = {col: delta for col, delta in columns.items() if delta}
+        if not deltas:
+            continue
+        result = connection.execute(
+            stats.update().where(stats.c.user_id == user_id)
+                .values(**{col: stats.c[col] + delta for col, delta in deltas.items()})
+        )
+        if result.rowcount == 0:
+            connection.execute(stats.insert().values(user_id=user_id, **deltas))
+
+    for user_id in deleted_user_ids:
+        for table in (stats, UserArtistRef.__table__, UserVenueRef.__table__):
+            connection.execute(table.delete().where(table.c.user_id == user_id))
+
+
+def recompute_user_stats():
+    """Rebuild user_stats and the artist/venue reference tables from shows and media.
+    Returns the number of users whose stats had drifted."""
+    stats = UserStats.__table__
+    before = {row.user_id: tuple(row[1:]) for row in db.session.execute(
+        db.select(stats.c.user_id, *[stats.c[field] for field in USER_STAT_FIELDS])
+    )}
+
+    shows = Show.__table__
+    for model, key_column in ((UserArtistRef, 'artist_id'), (UserVenueRef, 'venue_id')):
+        table = model.__table__
+        db.session.execute(table.delete())
+        db.session.execute(table.insert().from_select(
+            ['user_id', key_column, 'show_count'],
+            db.select(shows.c.user_id, shows.c[key_column], db.func.count())
+                .where(shows.c[key_column].isnot(None))
+                .group_by(shows.c.user_id, shows.c[key_column])
+        ))
+
+    totals = {}
+    sources = [(model.__table__, column) for model, column in USER_STAT_COLUMNS.items()]
+    sources += [(UserArtistRef.__table__, 'total_artists'), (UserVenueRef.__table__, 'total_venues')]
+    for table, column in sources:
+        rows = db.session.execute(
+            db.select(table.c.user_id, db.func.count()).group_by(table.c.user_id)
+        )
+        for user_id, count in rows:
+            if user_id is not None:
+                totals.setdefault(user_id, dict.fromkeys(USER_STAT_FIELDS, 0))[column] = count
+
+    db.session.execute(stats.delete())
+    if totals:
+        db.session.execute(stats.insert(), [
+            {'user_id': user_id, **columns} for user_id, columns in totals.items()
+        ])
+
+    zero = (0,) * len(USER_STAT_FIELDS)
+    drifted = sum(
+        1 for user_id in set(before) | set(totals)
+        if before.get(user_id, zero) != tuple(totals.get(user_id, {}).get(f, 0) for f in USER_STAT_FIELDS)
+    )
+    db.session.commit()
+    return drifted
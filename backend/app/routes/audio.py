@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from app.models import db, AudioRecording, Show
+from app.utils.media_files import media_files, mimetype_for
 import os
 import uuid
 
@@ -75,11 +76,10 @@ def get_audio(audio_id):
         return jsonify({'error': 'Audio not found'}), 404
     
     filepath = os.path.join(UPLOAD_FOLDER, audio.filename)
-    
-    if not os.path.exists(filepath):
+    response = media_files.serve(filepath, mimetype_for(audio.filename, 'audio/mpeg'), 'private')
+    if response is None:
         return jsonify({'error': 'Audio file not found'}), 404
-    
-    return send_file(filepath, mimetype='audio/*')
+    return response
 
 @audio_bp.route('/<int:audio_id>', methods=['PUT'])
 @jwt_required()
@@ -2,7 +2,7 @@
 Audio API Routes - Flask-RESTX Implementation
 Handles audio recording uploads, streaming, updates, and deletion
 """
-from flask import request, send_file, Response
+from flask import request, Response
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
@@ -10,6 +10,7 @@ from werkzeug.datastructures import FileStorage
 import os
 
 from app.models import db, AudioRecording, Show
+from app.utils.media_files import media_files, mimetype_for
 
 # Create namespace
 api = Namespace('audio', description='Audio recording management operations')
@@ -137,22 +138,12 @@ class AudioDetail(Resource):
         if not audio:
             return {'error': 'Audio not found'}, 404
         
-        if not os.path.exists(audio.file_path):
+        # AudioRecording has no file_path column; files live under uploads/audio by filename
+        file_path = os.path.join('uploads', 'audio', audio.filename)
+        response = media_files.serve(file_path, mimetype_for(audio.filename, 'audio/mpeg'), 'private')
+        if response is None:
             return {'error': 'File not found'}, 404
-        
-        # Determine mime type based on extension
-        extension = audio.filename.rsplit('.', 1)[1].lower() if '.' in audio.filename else ''
-        mime_types = {
-            'mp3': 'audio/mpeg',
-            'wav': 'audio/wav',
-            'ogg': 'audio/ogg',
-            'm4a': 'audio/mp4',
-            'flac': 'audio/flac',
-            'aac': 'audio/aac'
-        }
-        mime_type = mime_types.get(extension, 'audio/mpeg')
-        
-        return send_file(audio.file_path, mimetype=mime_type)
+        return response
     
     @api.doc('update_audio_metadata', security='jwt')
     @api.expect(audio_update_model)
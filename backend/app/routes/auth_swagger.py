@@ -849,67 +849,57 @@ class AppearOffline(Resource):
 
         if appear_offline:
             # Clear active location sharing so user disappears from "Friends Here"
+            from app.utils.live_locations import live_locations
+            live_locations.remove_user(user.id)
             active_checkins = ShowCheckin.query.filter_by(
                 user_id=user.id,
                 is_active=True
             ).filter(ShowCheckin.latitude.isnot(None)).all()
+            stopped = [(checkin.show_id, checkin.get_share_with_ids()) for checkin in active_checkins]
             for checkin in active_checkins:
                 checkin.latitude = None
                 checkin.longitude = None
                 checkin.last_location_update = None
-                checkin.share_with = None
+                checkin.set_share_with(None)
             db.session.commit()
 
             # Notify friends via WebSocket that location stopped and user went offline
             from app import socketio
-            from app.socket_events import online_users, active_users, get_sibling_show_ids, user_sids
+            from app.socket_events import (
+                emit_to_users, online_friends, connected_friends, location_audience, location_event
+            )
+            from app.utils.presence import presence
             from app.models import get_friend_ids
 
             friend_ids = get_friend_ids(user.id)
 
             # Tell the user's own sessions to stop location tracking
-            sids_before = set(online_users.get(user.id, set()))
-            online_users.pop(user.id, None)
+            sids_before = presence.online_sids(user.id)
+            presence.go_offline(user.id)
             for sid in sids_before:
                 socketio.emit('appear_offline_updated', {'appear_offline': True}, to=sid)
 
             # Tell friends we went offline and hide from show lists
-            for fid in friend_ids:
-                if fid in online_users:
-                    for sid in online_users[fid]:
-                        socketio.emit('friend_offline', {
-                            'user_id': user.id,
-                            'username': user.username
-                        }, to=sid)
-                # Send hide event to ALL connected sids (not just online_users)
-                for sid in user_sids.get(fid, set()):
-                    socketio.emit('friend_hide_from_show', {
-                        'user_id': user.id,
-                        'username': user.username
-                    }, to=sid)
-
-            # Broadcast location_stopped to friends in active show rooms
-            for checkin in active_checkins:
-                sibling_ids = get_sibling_show_ids(checkin.show_id)
-                for sid in sibling_ids:
-                    if sid in active_users:
-                        for friend_id, info in active_users[sid].items():
-                            if friend_id in friend_ids:
-                                socketio.emit('location_stopped', {
-                                    'user_id': user.id,
-                                    'username': user.username
-                                }, to=info['sid'])
+            # (the hide event goes to ALL connected sids, not just online_users)
+            status = {'user_id': user.id, 'username': user.username}
+            emit_to_users('friend_offline', status, online_friends(friend_ids))
+            emit_to_users('friend_hide_from_show', status, connected_friends(friend_ids))
+
+            # Broadcast location_stopped to friends at the same concerts
+            for show_id, share_ids in stopped:
+                emit_to_users('location_stopped', location_event(show_id, status),
+                              location_audience(user.id, show_id, share_ids, friend_ids))
 
         else:
             # Going back online — restore presence from connected sockets
             from app import socketio
-            from app.socket_events import online_users, user_sids
+            from app.socket_events import emit_to_users, online_friends, connected_friends
+            from app.utils.presence import presence
             from app.models import get_friend_ids
 
-            sids = user_sids.get(user.id, set())
+            sids = presence.sids(user.id)
             if sids:
-                was_empty = not online_users.get(user.id)
-                online_users[user.id] = set(sids)
+                was_empty = presence.go_online(user.id, sids)
 
                 # Notify own sockets
                 for sid in sids:
@@ -918,19 +908,10 @@ class AppearOffline(Resource):
                 # Notify friends we came back online and re-show on show lists
                 if was_empty:
                     friend_ids = get_friend_ids(user.id)
-                    for fid in friend_ids:
-                        if fid in online_users:
-                            for sid in online_users[fid]:
-                                socketio.emit('friend_online', {
-                                    'user_id': user.id,
-                                    'username': user.username
-                                }, to=sid)
-                        # Send show_at_show event to ALL connected sids
-                        for sid in user_sids.get(fid, set()):
-                            socketio.emit('friend_show_at_show', {
-                                'user_id': user.id,
-                                'username': user.username
-                            }, to=sid)
+                    status = {'user_id': user.id, 'username': user.username}
+                    emit_to_users('friend_online', status, online_friends(friend_ids))
+                    # Send show_at_show event to ALL connected sids
+                    emit_to_users('friend_show_at_show', status, connected_friends(friend_ids))
 
         return {'message': 'Appear offline status updated', 'appear_offline': user.appear_offline}
 
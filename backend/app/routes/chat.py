@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, ChatMessage, Show, ShowCheckin
+from app.utils.chat_writer import chat_writer
 from datetime import datetime
 
 chat_bp = Blueprint('chat', __name__, url_prefix='/api/chat')
@@ -41,15 +42,10 @@ def send_message(show_id):
     if not data or 'message' not in data:
         return jsonify({'error': 'Missing message content'}), 400
     
-    message = ChatMessage(
-        show_id=show_id,
-        user_id=user_id,
-        message=data['message']
-    )
-    
     try:
-        db.session.add(message)
-        db.session.commit()
+        # Ids come from the same counter as the socket messages chat_writer queues
+        pending = chat_writer.write(show_id, user_id, data['message'])
+        message = ChatMessage.query.get(pending.id)
         return jsonify(message.to_dict()), 201
     except Exception as e:
         db.session.rollback()
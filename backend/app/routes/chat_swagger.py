@@ -8,6 +8,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 
 from app.models import db, ChatMessage, Show, User
+from app.utils.chat_writer import chat_writer
 
 # Create namespace
 api = Namespace('chat', description='Chat message operations')
@@ -106,15 +107,9 @@ class ShowChatMessages(Resource):
         if not message_text:
             return {'error': 'message is required'}, 400
         
-        message = ChatMessage(
-            show_id=show_id,
-            user_id=current_user_id,
-            message=message_text,
-            timestamp=datetime.utcnow()
-        )
-        
-        db.session.add(message)
-        db.session.commit()
+        # Ids come from the same counter as the socket messages chat_writer queues
+        pending = chat_writer.write(show_id, current_user_id, message_text)
+        message = ChatMessage.query.get(pending.id)
         
         # Get user info for response
         user = User.query.get(current_user_id)
@@ -2,9 +2,11 @@
 Dashboard API Routes - Flask-RESTX Implementation
 Handles user statistics and recent activity feeds
 """
+from flask import request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func, text
+from sqlalchemy import literal, union_all
+from datetime import datetime
 import requests
 import time
 import re
@@ -12,9 +14,11 @@ import threading
 
 from app.models import (
     db, Show, Artist, Venue, Photo, AudioRecording,
-    VideoRecording, Comment, User
+    VideoRecording, Comment, User, UserStats, UserArtistRef, UserVenueRef,
+    USER_STAT_FIELDS
 )
-from app import cache
+from app.utils import tagged_cache
+from app.utils.tagged_cache import user_tag
 
 MUSICBRAINZ_BASE_URL = 'https://musicbrainz.org/ws/2'
 MUSICBRAINZ_HEADERS = {
@@ -131,6 +135,12 @@ def _backfill_artist_metadata(artist_ids_with_mbids, app):
                 if metadata['image_url'] and not artist.image_url:
                     artist.image_url = metadata['image_url']
         db.session.commit()
+        tagged_cache.invalidate(ARTIST_METADATA_TAG)
+
+
+# Dashboard entries are invalidated by tag, so the TTL only bounds cache size
+DASHBOARD_CACHE_TTL = 6 * 60 * 60
+ARTIST_METADATA_TAG = 'artist_metadata'
 
 
 # Create namespace
@@ -223,6 +233,85 @@ comment_list_model = api.model('CommentList', {
     'total': fields.Integer(description='Total comments')
 })
 
+activity_item_model = api.model('ActivityItem', {
+    'type': fields.String(description='photo, audio, video or comment'),
+    'id': fields.Integer(description='ID of the photo, recording or comment'),
+    'show_id': fields.Integer(description='Show ID'),
+    'text': fields.String(description='Caption, title or comment text'),
+    'created_at': fields.DateTime(description='Creation time'),
+    'show_name': fields.String(description='Show name')
+})
+
+activity_list_model = api.model('ActivityList', {
+    'items': fields.List(fields.Nested(activity_item_model)),
+    'next_cursor': fields.String(description='Pass as ?before= for the next page'),
+    'has_more': fields.Boolean(description='Whether older items exist')
+})
+
+
+def _build_artists(user_id):
+    """Artists by show count for DashboardArtists (cached per user)"""
+    # Per-user artist show counts from user_artist_refs
+    artist_stats = db.session.query(
+        Artist.id,
+        Artist.name,
+        Artist.mbid,
+        Artist.disambiguation,
+        Artist.image_url,
+        UserArtistRef.show_count
+    ).join(UserArtistRef, UserArtistRef.artist_id == Artist.id)\
+     .filter(UserArtistRef.user_id == user_id)\
+     .order_by(UserArtistRef.show_count.desc())\
+     .all()
+
+    # Fire-and-forget backfill for artists missing description OR image_url
+    to_backfill = [(aid, mbid) for aid, name, mbid, desc, img, count in artist_stats if mbid and (not desc or not img)]
+    if to_backfill[:3]:
+        from flask import current_app
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=_backfill_artist_metadata,
+            args=(to_backfill[:3], app),
+            daemon=True
+        ).start()
+
+    results = [{
+        'artist_id': artist_id,
+        'artist_name': artist_name,
+        'show_count': show_count,
+        'description': description or '',
+        'image_url': image_url or ''
+    } for artist_id, artist_name, mbid, description, image_url, show_count in artist_stats]
+
+    return {
+        'artists': results,
+        'total': len(results)
+    }
+
+
+def _build_venues(user_id):
+    """Venues by show count for DashboardVenues (cached per user)"""
+    # Per-user venue show counts from user_venue_refs
+    venue_stats = db.session.query(
+        Venue.id,
+        Venue.name,
+        UserVenueRef.show_count
+    ).join(UserVenueRef, UserVenueRef.venue_id == Venue.id)\
+     .filter(UserVenueRef.user_id == user_id)\
+     .order_by(UserVenueRef.show_count.desc())\
+     .all()
+
+    results = [{
+        'venue_id': venue_id,
+        'venue_name': venue_name,
+        'show_count': show_count
+    } for venue_id, venue_name, show_count in venue_stats]
+
+    return {
+        'venues': results,
+        'total': len(results)
+    }
+
 
 @api.route('/stats')
 class DashboardStats(Resource):
@@ -233,34 +322,11 @@ class DashboardStats(Resource):
         """Get user statistics overview"""
         current_user_id = int(get_jwt_identity())
 
-        cache_key = f'dashboard_stats_{current_user_id}'
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-
-        # Single query instead of 7 separate COUNT queries
-        row = db.session.execute(text("""
-            SELECT
-                (SELECT COUNT(*) FROM shows WHERE user_id = :uid) as total_shows,
-                (SELECT COUNT(DISTINCT artist_id) FROM shows WHERE user_id = :uid) as total_artists,
-                (SELECT COUNT(DISTINCT venue_id) FROM shows WHERE user_id = :uid) as total_venues,
-                (SELECT COUNT(*) FROM photos WHERE user_id = :uid) as total_photos,
-                (SELECT COUNT(*) FROM audio_recordings WHERE user_id = :uid) as total_audio,
-                (SELECT COUNT(*) FROM video_recordings WHERE user_id = :uid) as total_videos,
-                (SELECT COUNT(*) FROM comments WHERE user_id = :uid) as total_comments
-        """), {'uid': current_user_id}).fetchone()
-
-        result = {
-            'total_shows': row[0],
-            'total_artists': row[1],
-            'total_venues': row[2],
-            'total_photos': row[3],
-            'total_audio': row[4],
-            'total_videos': row[5],
-            'total_comments': row[6]
-        }
-        cache.set(cache_key, result, timeout=120)
-        return result
+        # Maintained on write by the user_stats flush hook; a single primary-key read
+        stats = UserStats.query.get(current_user_id)
+        if not stats:
+            return dict.fromkeys(USER_STAT_FIELDS, 0)
+        return stats.to_dict()
 
 
 @api.route('/artists')
@@ -272,50 +338,12 @@ class DashboardArtists(Resource):
         """Get user's top artists by show count"""
         current_user_id = int(get_jwt_identity())
 
-        cache_key = f'dashboard_artists_{current_user_id}'
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-
-        # Get artists with show counts
-        artist_stats = db.session.query(
-            Artist.id,
-            Artist.name,
-            Artist.mbid,
-            Artist.disambiguation,
-            Artist.image_url,
-            func.count(Show.id).label('show_count')
-        ).join(Show, Show.artist_id == Artist.id)\
-         .filter(Show.user_id == current_user_id)\
-         .group_by(Artist.id, Artist.name, Artist.mbid, Artist.disambiguation, Artist.image_url)\
-         .order_by(func.count(Show.id).desc())\
-         .all()
-
-        # Fire-and-forget backfill for artists missing description OR image_url
-        to_backfill = [(aid, mbid) for aid, name, mbid, desc, img, count in artist_stats if mbid and (not desc or not img)]
-        if to_backfill[:3]:
-            from flask import current_app
-            app = current_app._get_current_object()
-            threading.Thread(
-                target=_backfill_artist_metadata,
-                args=(to_backfill[:3], app),
-                daemon=True
-            ).start()
-
-        results = [{
-            'artist_id': artist_id,
-            'artist_name': artist_name,
-            'show_count': show_count,
-            'description': description or '',
-            'image_url': image_url or ''
-        } for artist_id, artist_name, mbid, description, image_url, show_count in artist_stats]
-
-        result = {
-            'artists': results,
-            'total': len(results)
-        }
-        cache.set(cache_key, result, timeout=120)
-        return result
+        return tagged_cache.get_or_set(
+            f'dashboard_artists_{current_user_id}',
+            [user_tag(current_user_id, 'shows'), ARTIST_METADATA_TAG],
+            lambda: _build_artists(current_user_id),
+            timeout=DASHBOARD_CACHE_TTL
+        )
 
 
 @api.route('/venues')
@@ -327,34 +355,119 @@ class DashboardVenues(Resource):
         """Get user's top venues by show count"""
         current_user_id = int(get_jwt_identity())
 
-        cache_key = f'dashboard_venues_{current_user_id}'
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-
-        # Get venues with show counts
-        venue_stats = db.session.query(
-            Venue.id,
-            Venue.name,
-            func.count(Show.id).label('show_count')
-        ).join(Show, Show.venue_id == Venue.id)\
-         .filter(Show.user_id == current_user_id)\
-         .group_by(Venue.id, Venue.name)\
-         .order_by(func.count(Show.id).desc())\
-         .all()
+        return tagged_cache.get_or_set(
+            f'dashboard_venues_{current_user_id}',
+            [user_tag(current_user_id, 'shows')],
+            lambda: _build_venues(current_user_id),
+            timeout=DASHBOARD_CACHE_TTL
+        )
 
-        results = [{
-            'venue_id': venue_id,
-            'venue_name': venue_name,
-            'show_count': show_count
-        } for venue_id, venue_name, show_count in venue_stats]
 
-        result = {
-            'venues': results,
-            'total': len(results)
+# Activity type -> (model, text column) for the unified activity query
+ACTIVITY_SOURCES = {
+    'photo': (Photo, Photo.caption),
+    'audio': (AudioRecording, AudioRecording.title),
+    'video': (VideoRecording, VideoRecording.title),
+    'comment': (Comment, Comment.text),
+}
+
+activity_parser = api.parser()
+activity_parser.add_argument('type', type=str, location='args',
+                             help='Comma-separated types to include: photo, audio, video, comment (default all)')
+activity_parser.add_argument('limit', type=int, location='args', default=20, help='Items per page (max 100)')
+activity_parser.add_argument('before', type=str, location='args', help='Keyset cursor from next_cursor')
+
+
+def _encode_activity_cursor(item):
+    return f"{item['created_at']}|{item['type']}|{item['id']}"
+
+
+def _decode_activity_cursor(cursor):
+    created_at, item_type, item_id = cursor.split('|')
+    return datetime.fromisoformat(created_at), item_type, int(item_id)
+
+
+def _activity_items(user_id, types, limit, before=None):
+    """Newest activity across the requested media tables in one UNION ALL query.
+    Rows are ordered by (created_at, type, id) descending; `before` is a decoded cursor."""
+    branches = []
+    for item_type in types:
+        model, text_column = ACTIVITY_SOURCES[item_type]
+        branch = db.select(
+            literal(item_type, db.String).label('type'),
+            model.id.label('id'),
+            model.show_id.label('show_id'),
+            db.cast(text_column, db.Text).label('text'),
+            model.created_at.label('created_at'),
+            Artist.name.label('artist_name'),
+            Venue.name.label('venue_name'),
+        ).join(Show, model.show_id == Show.id)\
+         .outerjoin(Artist, Show.artist_id == Artist.id)\
+         .outerjoin(Venue, Show.venue_id == Venue.id)\
+         .where(model.user_id == user_id, model.created_at.isnot(None))
+
+        if before:
+            created_at, after_type, after_id = before
+            # Same tie-break as the ORDER BY; the type comparison is resolved per branch
+            if item_type < after_type:
+                tie = model.created_at == created_at
+            elif item_type == after_type:
+                tie = db.and_(model.created_at == created_at, model.id < after_id)
+            else:
+                tie = db.false()
+            branch = branch.where(db.or_(model.created_at < created_at, tie))
+        branches.append(branch)
+
+    activity = union_all(*branches).subquery()
+    rows = db.session.execute(
+        db.select(activity)
+          .order_by(activity.c.created_at.desc(), activity.c.type.desc(), activity.c.id.desc())
+          .limit(limit)
+    ).all()
+
+    return [{
+        'type': row.type,
+        'id': row.id,
+        'show_id': row.show_id,
+        'text': row.text,
+        'created_at': row.created_at.isoformat(),
+        'show_name': f'{row.artist_name} at {row.venue_name}' if row.artist_name and row.venue_name else 'Unknown Show'
+    } for row in rows]
+
+
+@api.route('/activity')
+class DashboardActivity(Resource):
+    @api.doc('get_activity', security='jwt')
+    @api.expect(activity_parser)
+    @api.response(200, 'Success', activity_list_model)
+    @api.response(400, 'Bad request')
+    @jwt_required()
+    def get(self):
+        """Get user's recent photos, recordings and comments in one feed, newest first"""
+        current_user_id = int(get_jwt_identity())
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+        requested = request.args.get('type')
+        types = [t.strip() for t in requested.split(',') if t.strip()] if requested else list(ACTIVITY_SOURCES)
+        unknown = [t for t in types if t not in ACTIVITY_SOURCES]
+        if unknown or not types:
+            return {'error': f"Unknown activity type: {', '.join(unknown)}" if unknown else 'No activity type given'}, 400
+
+        before = None
+        if request.args.get('before'):
+            try:
+                before = _decode_activity_cursor(request.args['before'])
+            except ValueError:
+                return {'error': 'Invalid cursor'}, 400
+
+        items = _activity_items(current_user_id, types, limit + 1, before)
+        has_more = len(items) > limit
+        items = items[:limit]
+        return {
+            'items': items,
+            'next_cursor': _encode_activity_cursor(items[-1]) if has_more else None,
+            'has_more': has_more
         }
-        cache.set(cache_key, result, timeout=120)
-        return result
 
 
 @api.route('/photos/recent')
@@ -365,22 +478,15 @@ class DashboardRecentPhotos(Resource):
     def get(self):
         """Get user's recent photos"""
         current_user_id = int(get_jwt_identity())
-        
-        photos = db.session.query(Photo, Show)\
-            .join(Show, Photo.show_id == Show.id)\
-            .filter(Photo.user_id == current_user_id)\
-            .order_by(Photo.created_at.desc())\
-            .limit(10)\
-            .all()
-        
+
         results = [{
-            'id': photo.id,
-            'show_id': photo.show_id,
-            'caption': photo.caption,
-            'uploaded_at': photo.created_at.isoformat(),
-            'show_name': f"{show.artist.name} at {show.venue.name}" if show.artist and show.venue else 'Unknown Show'
-        } for photo, show in photos]
-        
+            'id': item['id'],
+            'show_id': item['show_id'],
+            'caption': item['text'],
+            'uploaded_at': item['created_at'],
+            'show_name': item['show_name']
+        } for item in _activity_items(current_user_id, ['photo'], 10)]
+
         return {
             'photos': results,
             'total': len(results)
@@ -395,22 +501,15 @@ class DashboardRecentAudio(Resource):
     def get(self):
         """Get user's recent audio recordings"""
         current_user_id = int(get_jwt_identity())
-        
-        recordings = db.session.query(AudioRecording, Show)\
-            .join(Show, AudioRecording.show_id == Show.id)\
-            .filter(AudioRecording.user_id == current_user_id)\
-            .order_by(AudioRecording.created_at.desc())\
-            .limit(10)\
-            .all()
-        
+
         results = [{
-            'id': audio.id,
-            'show_id': audio.show_id,
-            'title': audio.title,
-            'uploaded_at': audio.created_at.isoformat(),
-            'show_name': f"{show.artist.name} at {show.venue.name}" if show.artist and show.venue else 'Unknown Show'
-        } for audio, show in recordings]
-        
+            'id': item['id'],
+            'show_id': item['show_id'],
+            'title': item['text'],
+            'uploaded_at': item['created_at'],
+            'show_name': item['show_name']
+        } for item in _activity_items(current_user_id, ['audio'], 10)]
+
         return {
             'recordings': results,
             'total': len(results)
@@ -425,22 +524,15 @@ class DashboardRecentVideos(Resource):
     def get(self):
         """Get user's recent video recordings"""
         current_user_id = int(get_jwt_identity())
-        
-        recordings = db.session.query(VideoRecording, Show)\
-            .join(Show, VideoRecording.show_id == Show.id)\
-            .filter(VideoRecording.user_id == current_user_id)\
-            .order_by(VideoRecording.created_at.desc())\
-            .limit(10)\
-            .all()
-        
+
         results = [{
-            'id': video.id,
-            'show_id': video.show_id,
-            'title': video.title,
-            'uploaded_at': video.created_at.isoformat(),
-            'show_name': f"{show.artist.name} at {show.venue.name}" if show.artist and show.venue else 'Unknown Show'
-        } for video, show in recordings]
-        
+            'id': item['id'],
+            'show_id': item['show_id'],
+            'title': item['text'],
+            'uploaded_at': item['created_at'],
+            'show_name': item['show_name']
+        } for item in _activity_items(current_user_id, ['video'], 10)]
+
         return {
             'recordings': results,
             'total': len(results)
@@ -455,24 +547,16 @@ class DashboardRecentComments(Resource):
     def get(self):
         """Get user's recent comments"""
         current_user_id = int(get_jwt_identity())
-        
-        comments = db.session.query(Comment, Show)\
-            .join(Show, Comment.show_id == Show.id)\
-            .filter(Comment.user_id == current_user_id)\
-            .order_by(Comment.created_at.desc())\
-            .limit(10)\
-            .all()
-        
+
         results = [{
-            'id': comment.id,
-            'show_id': comment.show_id,
-            'content': comment.text,
-            'created_at': comment.created_at.isoformat(),
-            'show_name': f"{show.artist.name} at {show.venue.name}" if show.artist and show.venue else 'Unknown Show'
-        } for comment, show in comments]
-        
+            'id': item['id'],
+            'show_id': item['show_id'],
+            'content': item['text'],
+            'created_at': item['created_at'],
+            'show_name': item['show_name']
+        } for item in _activity_items(current_user_id, ['comment'], 10)]
+
         return {
             'comments': results,
             'total': len(results)
         }
-
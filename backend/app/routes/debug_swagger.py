@@ -0,0 +1,110 @@
+"""
+Debug API Routes - Flask-RESTX Implementation
+Exposes per-request SQL instrumentation, live-location, chat, typing, presence and media stats to admins
+"""
+from flask import request, current_app
+from flask_restx import Namespace, Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from app.utils.sql_profiler import sql_profiler
+from app.utils.live_locations import live_locations
+from app.utils.presence import presence
+from app.utils.chat_history import chat_history
+from app.utils.chat_writer import chat_writer
+from app.utils.typing_indicators import typing_indicators, conversation_members
+from app.utils.media_pipeline import media_pipeline
+from app.utils.media_files import media_files
+from app.utils.resumable_uploads import resumable_uploads
+
+api = Namespace('debug', description='Admin-only diagnostics')
+
+requests_parser = api.parser()
+requests_parser.add_argument('limit', type=int, location='args', default=50, help='Number of requests to return')
+requests_parser.add_argument('n_plus_one', type=int, location='args', help='1 to return only requests with N+1 suspects')
+
+
+def _is_admin(user_id):
+    return user_id in current_app.config.get('ADMIN_USER_IDS', [])
+
+
+@api.route('/requests')
+class DebugRequests(Resource):
+    @api.doc('get_debug_requests', security='jwt')
+    @api.expect(requests_parser)
+    @jwt_required()
+    def get(self):
+        """Recent requests with query count, DB time and N+1 suspects, newest first"""
+        if not _is_admin(int(get_jwt_identity())):
+            return {'error': 'Admin access required'}, 403
+        if not sql_profiler.enabled:
+            return {'error': 'SQL profiling is disabled (set SQL_PROFILING=true)'}, 404
+
+        limit = request.args.get('limit', 50, type=int)
+        entries = sql_profiler.recent()
+        if request.args.get('n_plus_one', type=int):
+            entries = [e for e in entries if e['n_plus_one']]
+        return {'requests': entries[:limit], 'total': len(entries)}
+
+    @api.doc('clear_debug_requests', security='jwt')
+    @jwt_required()
+    def delete(self):
+        """Clear the request ring buffer"""
+        if not _is_admin(int(get_jwt_identity())):
+            return {'error': 'Admin access required'}, 403
+        sql_profiler.clear()
+        return {'message': 'Cleared'}
+
+
+@api.route('/live-locations')
+class DebugLiveLocations(Resource):
+    @api.doc('get_live_location_stats', security='jwt')
+    @jwt_required()
+    def get(self):
+        """Live location store size and flushed vs coalesced update counters"""
+        if not _is_admin(int(get_jwt_identity())):
+            return {'error': 'Admin access required'}, 403
+        return live_locations.stats()
+
+
+@api.route('/presence')
+class DebugPresence(Resource):
+    @api.doc('get_presence_stats', security='jwt')
+    @jwt_required()
+    def get(self):
+        """Presence registry backend and, for the in-memory one, its sizes"""
+        if not _is_admin(int(get_jwt_identity())):
+            return {'error': 'Admin access required'}, 403
+        return presence.stats()
+
+
+@api.route('/chat-history')
+class DebugChatHistory(Resource):
+    @api.doc('get_chat_history_stats', security='jwt')
+    @jwt_required()
+    def get(self):
+        """Chat ring buffer size, warm/resume counters and group commit counters"""
+        if not _is_admin(int(get_jwt_identity())):
+            return {'error': 'Admin access required'}, 403
+        return {**chat_history.stats(), 'writer': chat_writer.stats()}
+
+
+@api.route('/typing')
+class DebugTyping(Resource):
+    @api.doc('get_typing_stats', security='jwt')
+    @jwt_required()
+    def get(self):
+        """Typing indicator states, received vs broadcast counters and DM membership cache"""
+        if not _is_admin(int(get_jwt_identity())):
+            return {'error': 'Admin access required'}, 403
+        return {**typing_indicators.stats(), 'conversations': conversation_members.stats()}
+
+
+@api.route('/media')
+class DebugMedia(Resource):
+    @api.doc('get_media_stats', security='jwt')
+    @jwt_required()
+    def get(self):
+        """Photo processing pool size and job counters, media responses served and resumable uploads"""
+        if not _is_admin(int(get_jwt_identity())):
+            return {'error': 'Admin access required'}, 403
+        return {**media_pipeline.stats(), 'files': media_files.stats(), 'uploads': resumable_uploads.stats()}
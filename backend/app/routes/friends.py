@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, User, Friendship
+from app.utils.friend_cache import friend_cache
+from app.utils import feed
 from sqlalchemy import or_, and_
 
 friends_bp = Blueprint('friends', __name__, url_prefix='/api/friends')
@@ -93,7 +95,9 @@ def accept_friend_request(request_id):
     friendship.status = 'accepted'
     
     try:
+        feed.backfill_friendship(friendship.user_id, friendship.friend_id)
         db.session.commit()
+        friend_cache.invalidate(friendship.user_id, friendship.friend_id)
         return jsonify(friendship.to_dict()), 200
     except Exception as e:
         db.session.rollback()
@@ -116,6 +120,7 @@ def reject_friend_request(request_id):
     try:
         db.session.delete(friendship)
         db.session.commit()
+        friend_cache.invalidate(friendship.user_id, friendship.friend_id)
         return jsonify({'message': 'Friend request rejected'}), 200
     except Exception as e:
         db.session.rollback()
@@ -197,8 +202,10 @@ def remove_friend(friend_id):
         return jsonify({'error': 'Friendship not found'}), 404
     
     try:
+        feed.remove_friendship(friendship.user_id, friendship.friend_id)
         db.session.delete(friendship)
         db.session.commit()
+        friend_cache.invalidate(friendship.user_id, friendship.friend_id)
         return jsonify({'message': 'Friend removed successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -8,6 +8,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 
 from app.models import db, User, Friendship, Show, get_friend_ids
+from app.utils.friend_cache import friend_cache
+from app.utils import feed
+from app.utils.presence import presence
 
 # Create namespace
 api = Namespace('friends', description='Friend management operations')
@@ -67,11 +70,9 @@ class OnlineFriends(Resource):
     @jwt_required()
     def get(self):
         """Get IDs of friends currently online"""
-        from app.socket_events import online_users
-
         current_user_id = int(get_jwt_identity())
         friend_ids = get_friend_ids(current_user_id)
-        online_ids = [fid for fid in friend_ids if online_users.get(fid)]
+        online_ids = presence.online_ids(friend_ids)
         return {'online_ids': online_ids}
 
 
@@ -180,7 +181,9 @@ class FriendRequestAccept(Resource):
             return {'error': 'Already accepted'}, 400
         
         friendship.status = 'accepted'
+        feed.backfill_friendship(friendship.user_id, friendship.friend_id)
         db.session.commit()
+        friend_cache.invalidate(friendship.user_id, friendship.friend_id)
         
         # Get friend info
         friend = User.query.get(friendship.user_id)
@@ -211,6 +214,7 @@ class FriendRequestReject(Resource):
         
         db.session.delete(friendship)
         db.session.commit()
+        friend_cache.invalidate(friendship.user_id, friendship.friend_id)
         
         return {'message': 'Friend request rejected'}
 
@@ -235,14 +239,15 @@ class FriendList(Resource):
             )
         ).all()
         
+        # Determine which user is the friend, then load them all in one query
+        friend_ids = [friendship.friend_id if friendship.user_id == current_user_id else friendship.user_id
+                      for friendship in friendships]
+        friends = {user.id: user for user in User.query.filter(User.id.in_(friend_ids))} if friend_ids else {}
+
         results = []
-        for friendship in friendships:
-            # Determine which user is the friend
-            friend_id = friendship.friend_id if friendship.user_id == current_user_id else friendship.user_id
-            friend = User.query.get(friend_id)
-            
+        for friendship, friend_id in zip(friendships, friend_ids):
             friend_dict = friendship.to_dict()
-            friend_dict['friend'] = friend.to_dict()
+            friend_dict['friend'] = friends[friend_id].to_dict()
             results.append(friend_dict)
         
         return {
@@ -266,11 +271,13 @@ class FriendRequestList(Resource):
             status='pending'
         ).all()
         
+        requester_ids = [friendship.user_id for friendship in friendships]
+        requesters = {user.id: user for user in User.query.filter(User.id.in_(requester_ids))} if requester_ids else {}
+
         results = []
         for friendship in friendships:
-            requester = User.query.get(friendship.user_id)
             friend_dict = friendship.to_dict()
-            friend_dict['friend'] = requester.to_dict()
+            friend_dict['friend'] = requesters[friendship.user_id].to_dict()
             results.append(friend_dict)
         
         return {
@@ -298,8 +305,10 @@ class FriendshipDelete(Resource):
         if friendship.user_id != current_user_id and friendship.friend_id != current_user_id:
             return {'error': 'Not authorized'}, 403
         
+        feed.remove_friendship(friendship.user_id, friendship.friend_id)
         db.session.delete(friendship)
         db.session.commit()
+        friend_cache.invalidate(friendship.user_id, friendship.friend_id)
 
         return {'message': 'Friend removed'}
 
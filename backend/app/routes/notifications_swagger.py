@@ -5,6 +5,7 @@ Handles in-app notification CRUD operations
 from flask import request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 
 from app.models import db, Notification
 
@@ -21,7 +22,9 @@ class NotificationList(Resource):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
 
-        pagination = Notification.query.filter_by(user_id=current_user_id)\
+        # Senders are joined in, since to_dict reads every notification's sender
+        pagination = Notification.query.options(joinedload(Notification.sender))\
+            .filter_by(user_id=current_user_id)\
             .order_by(Notification.created_at.desc())\
             .paginate(page=page, per_page=per_page, error_out=False)
 
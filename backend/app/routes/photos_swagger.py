@@ -2,15 +2,17 @@
 Photos API Routes - Flask-RESTX Implementation
 Handles photo uploads, retrieval, thumbnails, updates, and deletion
 """
-from flask import request, send_file
+from flask import request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 import os
-from PIL import Image
 
 from app.models import db, Photo, Show, Artist, Venue
+from app.utils.media_pipeline import (media_pipeline, choose_variant, remove_derivatives, variant_path,
+                                      PHOTO_DIR, THUMBNAIL_DIR, VARIANT_MIMETYPES)
+from app.utils.media_files import media_files, mimetype_for
 
 # Create namespace
 api = Namespace('photos', description='Photo management operations')
@@ -21,19 +23,27 @@ upload_parser.add_argument('file', location='files', type=FileStorage, required=
 upload_parser.add_argument('show_id', type=int, required=True, help='Show ID')
 upload_parser.add_argument('caption', type=str, required=False, help='Photo caption')
 
+# Resized copy selection
+variant_parser = api.parser()
+variant_parser.add_argument('w', type=int, location='args', help='Display width in px; the closest variant at least this wide is served')
+variant_parser.add_argument('format', type=str, location='args', choices=('webp', 'avif', 'auto', 'original'),
+                            help="Variant format; 'auto' picks from the Accept header, 'original' the uploaded file")
+
 # Models
 photo_model = api.model('Photo', {
     'id': fields.Integer(description='Photo ID'),
     'show_id': fields.Integer(description='Show ID'),
     'user_id': fields.Integer(description='User ID'),
-    'filename': fields.String(description='Original filename'),
-    'file_path': fields.String(description='File path'),
-    'thumbnail_path': fields.String(description='Thumbnail path'),
+    'filename': fields.String(description='Stored filename'),
+    'original_filename': fields.String(description='Original filename'),
+    'thumbnail_filename': fields.String(description='Thumbnail filename'),
     'caption': fields.String(description='Caption'),
-    'uploaded_at': fields.DateTime(description='Upload time'),
-    'file_size': fields.Integer(description='File size in bytes'),
-    'width': fields.Integer(description='Width in pixels'),
-    'height': fields.Integer(description='Height in pixels')
+    'processing_status': fields.String(description='Derivative rendering: pending, processing, ready or failed'),
+    'created_at': fields.DateTime(description='Upload time'),
+    'url': fields.String(description='Full-size image URL'),
+    'thumbnail_url': fields.String(description='Thumbnail URL, once rendered'),
+    'srcset': fields.String(description='WebP variants as an <img srcset> value, once rendered'),
+    'avif_srcset': fields.String(description='AVIF variants as a srcset value, when the server can encode AVIF')
 })
 
 photo_list_model = api.model('PhotoList', {
@@ -115,45 +125,27 @@ class PhotoList(Resource):
         if not allowed_file(file.filename, {'png', 'jpg', 'jpeg', 'gif', 'webp'}):
             return {'error': 'Invalid file type'}, 400
         
-        upload_dir = os.path.join('uploads', 'photos')
-        thumbnail_dir = os.path.join('uploads', 'thumbnails')
-        os.makedirs(upload_dir, exist_ok=True)
-        os.makedirs(thumbnail_dir, exist_ok=True)
+        os.makedirs(PHOTO_DIR, exist_ok=True)
         
         filename = secure_filename(file.filename)
         extension = filename.rsplit('.', 1)[1].lower()
         unique_filename = f"{current_user_id}_{show_id}_{os.urandom(8).hex()}.{extension}"
         
-        file_path = os.path.join(upload_dir, unique_filename)
-        file.save(file_path)
-        
-        try:
-            with Image.open(file_path) as img:
-                width, height = img.size
-                img.thumbnail((300, 300), Image.Resampling.LANCZOS)
-                thumbnail_filename = f"thumb_{unique_filename}"
-                thumbnail_path = os.path.join(thumbnail_dir, thumbnail_filename)
-                img.save(thumbnail_path)
-        except Exception:
-            width = height = None
-            thumbnail_path = None
-        
-        file_size = os.path.getsize(file_path)
+        # Save the original; the thumbnail is rendered off the request
+        file.save(os.path.join(PHOTO_DIR, unique_filename))
         
         photo = Photo(
             show_id=show_id,
             user_id=current_user_id,
-            filename=filename,
-            file_path=file_path,
-            thumbnail_path=thumbnail_path,
+            filename=unique_filename,
+            original_filename=filename,
             caption=caption,
-            file_size=file_size,
-            width=width,
-            height=height
+            processing_status='pending'
         )
         
         db.session.add(photo)
         db.session.commit()
+        media_pipeline.enqueue(photo)
         
         return photo.to_dict(), 201
 
@@ -161,26 +153,36 @@ class PhotoList(Resource):
 @api.route('/<int:photo_id>')
 class PhotoDetail(Resource):
     @api.doc('get_photo')
+    @api.expect(variant_parser)
     @api.response(200, 'Success - Returns image')
     @api.response(404, 'Not found', error_response)
     def get(self, photo_id):
-        """Get full-size photo"""
+        """Get full-size photo, or with ?w= / ?format= the closest resized WebP/AVIF copy"""
         photo = Photo.query.get(photo_id)
         if not photo:
             return {'error': 'Photo not found'}, 404
 
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        file_path = os.path.join(base_dir, 'uploads', 'photos', photo.filename)
+        args = variant_parser.parse_args()
+        cache = 'public'
+        if args['w'] is not None or args['format'] is not None:
+            negotiated = args['format'] in (None, 'auto')
+            variant = choose_variant(photo.get_variants(), args['w'], args['format'],
+                                     request.accept_mimetypes if negotiated else None)
+            response = None
+            if variant is not None:
+                response = media_files.serve(variant_path(variant), VARIANT_MIMETYPES[variant['format']], 'immutable')
+            if response is not None:
+                if negotiated:
+                    response.vary.add('Accept')
+                return response
+            # Not rendered yet (or no acceptable format): the original stands in until it is
+            cache = 'no-cache'
 
-        if not os.path.exists(file_path):
+        response = media_files.serve(os.path.join(PHOTO_DIR, photo.filename),
+                                     mimetype_for(photo.filename, 'image/jpeg'), cache)
+        if response is None:
             return {'error': 'File not found'}, 404
-
-        # Detect mimetype from extension
-        ext = photo.filename.rsplit('.', 1)[-1].lower() if '.' in photo.filename else 'jpeg'
-        mimetypes = {'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'gif': 'image/gif', 'webp': 'image/webp'}
-        mimetype = mimetypes.get(ext, 'image/jpeg')
-
-        return send_file(file_path, mimetype=mimetype)
+        return response
     
     @api.doc('update_photo_caption', security='jwt')
     @api.expect(caption_update_model)
@@ -226,10 +228,7 @@ class PhotoDetail(Resource):
             file_path = os.path.join(base_dir, 'uploads', 'photos', photo.filename)
             if os.path.exists(file_path):
                 os.remove(file_path)
-            if photo.thumbnail_filename:
-                thumb_path = os.path.join(base_dir, 'uploads', 'thumbnails', photo.thumbnail_filename)
-                if os.path.exists(thumb_path):
-                    os.remove(thumb_path)
+            remove_derivatives(photo.thumbnail_filename, photo.get_variants())
         except Exception:
             pass
         
@@ -250,25 +249,19 @@ class PhotoThumbnail(Resource):
         if not photo:
             return {'error': 'Photo not found'}, 404
 
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-        # Detect mimetype from extension
-        ext = photo.filename.rsplit('.', 1)[-1].lower() if '.' in photo.filename else 'jpeg'
-        mimetypes = {'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'gif': 'image/gif', 'webp': 'image/webp'}
-        mimetype = mimetypes.get(ext, 'image/jpeg')
+        mimetype = mimetype_for(photo.filename, 'image/jpeg')
 
         # Try thumbnail first
         if photo.thumbnail_filename:
-            thumb_path = os.path.join(base_dir, 'uploads', 'thumbnails', photo.thumbnail_filename)
-            if os.path.exists(thumb_path):
-                return send_file(thumb_path, mimetype=mimetype)
-
-        # Fall back to full image
-        file_path = os.path.join(base_dir, 'uploads', 'photos', photo.filename)
-        if os.path.exists(file_path):
-            return send_file(file_path, mimetype=mimetype)
+            response = media_files.serve(os.path.join(THUMBNAIL_DIR, photo.thumbnail_filename), mimetype)
+            if response is not None:
+                return response
 
-        return {'error': 'File not found'}, 404
+        # Fall back to full image, revalidated so the thumbnail replaces it once rendered
+        response = media_files.serve(os.path.join(PHOTO_DIR, photo.filename), mimetype, 'no-cache')
+        if response is None:
+            return {'error': 'File not found'}, 404
+        return response
 
 
 @api.route('/show/<int:show_id>')
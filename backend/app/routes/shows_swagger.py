@@ -8,34 +8,17 @@ from flask import request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, date
-from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 
-from app.models import db, Show, Artist, Venue, SetlistSong, ShowCheckin, User, Photo, AudioRecording, VideoRecording, Comment, Notification, get_friend_ids
+from app.models import db, Show, Artist, Venue, SetlistSong, ShowCheckin, User, Photo, AudioRecording, VideoRecording, Comment, Notification, FeedEntry, get_friend_ids
 from app.utils.concert_archives import fetch_setlist_from_concert_archives
+from app.utils import feed
+from app.utils.live_locations import live_locations
+from app.utils.presence import presence
+from app.utils.media_pipeline import media_pipeline, PHOTO_DIR
+from app.utils.tagged_cache import invalidate_user
 
 
-def _batch_counts(show_ids):
-    """Pre-compute media/comment/song counts for a list of shows in 5 queries instead of 5*N."""
-    if not show_ids:
-        return {}
-    photo_counts = dict(db.session.query(Photo.show_id, func.count(Photo.id))
-        .filter(Photo.show_id.in_(show_ids)).group_by(Photo.show_id).all())
-    audio_counts = dict(db.session.query(AudioRecording.show_id, func.count(AudioRecording.id))
-        .filter(AudioRecording.show_id.in_(show_ids)).group_by(AudioRecording.show_id).all())
-    video_counts = dict(db.session.query(VideoRecording.show_id, func.count(VideoRecording.id))
-        .filter(VideoRecording.show_id.in_(show_ids)).group_by(VideoRecording.show_id).all())
-    comment_counts = dict(db.session.query(Comment.show_id, func.count(Comment.id))
-        .filter(Comment.show_id.in_(show_ids)).group_by(Comment.show_id).all())
-    song_counts = dict(db.session.query(SetlistSong.show_id, func.count(SetlistSong.id))
-        .filter(SetlistSong.show_id.in_(show_ids)).group_by(SetlistSong.show_id).all())
-    return {
-        sid: (photo_counts.get(sid, 0), audio_counts.get(sid, 0),
-              video_counts.get(sid, 0), comment_counts.get(sid, 0),
-              song_counts.get(sid, 0))
-        for sid in show_ids
-    }
-
 # Create namespace
 api = Namespace('shows', description='Show management operations')
 
@@ -84,6 +67,7 @@ show_model = api.model('Show', {
     'is_owner': fields.Boolean(description='Whether the current user owns this show'),
     'artist_id': fields.Integer(description='Artist ID'),
     'venue_id': fields.Integer(description='Venue ID'),
+    'concert_id': fields.Integer(description='Canonical concert ID shared by shows of the same artist/venue/date'),
     'date': fields.Date(description='Show date'),
     'notes': fields.String(description='Notes'),
     'rating': fields.Integer(description='Rating 1-5'),
@@ -145,6 +129,44 @@ show_list_parser.add_argument('year', type=int, location='args', help='Filter by
 show_list_parser.add_argument('filter', type=str, location='args', help='Filter: upcoming, past, or all (default)')
 show_list_parser.add_argument('limit', type=int, location='args', help='Limit number of results')
 
+# What ShowList marshals with show_model, selected as plain columns so no Show, User,
+# Artist or Venue entities are built; the details (setlist, media, comments) stay null
+SHOW_LIST_COLUMNS = (
+    Show.id, Show.user_id, Show.artist_id, Show.venue_id, Show.concert_id, Show.date, Show.notes,
+    Show.rating, Show.created_at, Show.song_count, Show.photo_count, Show.audio_count,
+    Show.video_count, Show.comment_count, User.username,
+    Artist.name.label('artist_name'), Artist.mbid.label('artist_mbid'),
+    Artist.image_url.label('artist_image_url'),
+    Venue.name.label('venue_name'), Venue.city, Venue.state, Venue.country, Venue.latitude, Venue.longitude,
+)
+
+
+def _show_list_item(row, viewer_id):
+    """show_model input for one SHOW_LIST_COLUMNS row. Dates are left as date objects, which
+    the marshaller formats directly instead of parsing an ISO string back first."""
+    return {
+        'id': row.id,
+        'user_id': row.user_id,
+        'owner': {'id': row.user_id, 'username': row.username},
+        'is_owner': viewer_id == row.user_id,
+        'artist_id': row.artist_id,
+        'venue_id': row.venue_id,
+        'concert_id': row.concert_id,
+        'date': row.date,
+        'notes': row.notes,
+        'rating': row.rating,
+        'created_at': row.created_at,
+        'artist': {'id': row.artist_id, 'name': row.artist_name, 'mbid': row.artist_mbid,
+                   'image_url': row.artist_image_url},
+        'venue': {'id': row.venue_id, 'name': row.venue_name, 'city': row.city, 'state': row.state,
+                  'country': row.country, 'latitude': row.latitude, 'longitude': row.longitude},
+        'song_count': row.song_count,
+        'photo_count': row.photo_count,
+        'audio_count': row.audio_count,
+        'video_count': row.video_count,
+        'comment_count': row.comment_count,
+    }
+
 
 @api.route('')
 class ShowList(Resource):
@@ -156,12 +178,14 @@ class ShowList(Resource):
         """Get list of user's shows with optional filters"""
         current_user_id = int(get_jwt_identity())
 
-        # Eager-load user, artist, venue to eliminate N+1
-        query = Show.query.options(
-            joinedload(Show.user),
-            joinedload(Show.artist),
-            joinedload(Show.venue),
-        ).filter_by(user_id=current_user_id)
+        # Owner, artist and venue come from the same row, so one query serves the whole list
+        query = db.session.query(*SHOW_LIST_COLUMNS).join(
+            User, Show.user_id == User.id
+        ).join(
+            Artist, Show.artist_id == Artist.id
+        ).join(
+            Venue, Show.venue_id == Venue.id
+        ).filter(Show.user_id == current_user_id)
 
         # Apply filters
         artist_filter = request.args.get('artist')
@@ -173,11 +197,11 @@ class ShowList(Resource):
         if artist_id_filter:
             query = query.filter(Show.artist_id == artist_id_filter)
         elif artist_filter:
-            query = query.join(Artist).filter(Artist.name.ilike(f'%{artist_filter}%'))
+            query = query.filter(Artist.name.ilike(f'%{artist_filter}%'))
         if venue_id_filter:
             query = query.filter(Show.venue_id == venue_id_filter)
         elif venue_filter:
-            query = query.join(Venue).filter(Venue.name.ilike(f'%{venue_filter}%'))
+            query = query.filter(Venue.name.ilike(f'%{venue_filter}%'))
         if year_filter:
             query = query.filter(db.extract('year', Show.date) == year_filter)
 
@@ -193,15 +217,12 @@ class ShowList(Resource):
 
         limit = request.args.get('limit', type=int)
         if limit:
-            shows = query.limit(limit).all()
+            rows = query.limit(limit).all()
         else:
-            shows = query.all()
+            rows = query.all()
 
-        # Batch-compute counts (5 queries total instead of 5 per show)
-        show_ids = [s.id for s in shows]
-        counts_map = _batch_counts(show_ids)
-
-        return [show.to_dict(viewer_id=current_user_id, counts=counts_map.get(show.id)) for show in shows]
+        # Media/comment/song counts are denormalized on Show, so no extra queries here
+        return [_show_list_item(row, current_user_id) for row in rows]
     
     @api.doc('create_show', security='jwt')
     @api.expect(show_create_model)
@@ -258,7 +279,10 @@ class ShowList(Resource):
             show.set_visible_to(data['visible_to'])
 
         db.session.add(show)
+        db.session.flush()
+        feed.fan_out_show(show)
         db.session.commit()
+        invalidate_user(current_user_id, 'shows')
 
         return show.to_dict(viewer_id=current_user_id), 201
 
@@ -267,6 +291,16 @@ class ShowList(Resource):
 feed_parser = api.parser()
 feed_parser.add_argument('page', type=int, location='args', default=1, help='Page number')
 feed_parser.add_argument('per_page', type=int, location='args', default=20, help='Items per page')
+feed_parser.add_argument('after', type=str, location='args', help='Keyset cursor from next_cursor; pass empty for the first page')
+
+
+def _feed_cursor(entry):
+    return f'{entry.show_date.isoformat()}:{entry.show_id}'
+
+
+def _parse_feed_cursor(cursor):
+    show_date, show_id = cursor.split(':', 1)
+    return datetime.strptime(show_date, '%Y-%m-%d').date(), int(show_id)
 
 
 @api.route('/feed')
@@ -275,44 +309,54 @@ class ShowFeed(Resource):
     @api.expect(feed_parser)
     @jwt_required()
     def get(self):
-        """Get shows from accepted friends, ordered by date desc"""
+        """Get shows from accepted friends, ordered by date desc.
+        Served from the viewer's feed_entries timeline; pass ?after= for keyset pagination."""
         current_user_id = int(get_jwt_identity())
-        friend_ids = get_friend_ids(current_user_id)
-
-        if not friend_ids:
-            return {'shows': [], 'total': 0, 'page': 1, 'pages': 0}
-
-        page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
 
-        query = Show.query.options(
+        # Timeline rows already encode friendship + visibility; hide owners appearing offline
+        query = db.session.query(FeedEntry, Show).join(
+            Show, FeedEntry.show_id == Show.id
+        ).join(
+            User, FeedEntry.owner_id == User.id
+        ).options(
             joinedload(Show.user),
             joinedload(Show.artist),
             joinedload(Show.venue),
-        ).filter(Show.user_id.in_(friend_ids)).order_by(Show.date.desc())
-        total = query.count()
-        shows = query.offset((page - 1) * per_page).limit(per_page).all()
-
-        # Filter out shows where visible_to is set and current user is NOT in the list
-        visible_shows = []
-        for s in shows:
-            vto = s.get_visible_to_ids()
-            if vto is not None and current_user_id not in vto:
-                continue
-            # Also hide shows from users who are appearing offline
-            owner = User.query.get(s.user_id)
-            if owner and getattr(owner, 'appear_offline', False):
-                continue
-            visible_shows.append(s)
+        ).filter(
+            FeedEntry.viewer_id == current_user_id,
+            db.or_(User.appear_offline.is_(False), User.appear_offline.is_(None))
+        ).order_by(FeedEntry.show_date.desc(), FeedEntry.show_id.desc())
+
+        if 'after' in request.args:
+            cursor = request.args.get('after')
+            if cursor:
+                try:
+                    after_date, after_id = _parse_feed_cursor(cursor)
+                except ValueError:
+                    return {'error': 'Invalid cursor'}, 400
+                query = query.filter(db.or_(
+                    FeedEntry.show_date < after_date,
+                    db.and_(FeedEntry.show_date == after_date, FeedEntry.show_id < after_id)
+                ))
+            rows = query.limit(per_page + 1).all()
+            has_more = len(rows) > per_page
+            rows = rows[:per_page]
+            return {
+                'shows': [s.to_dict(viewer_id=current_user_id) for _, s in rows],
+                'next_cursor': _feed_cursor(rows[-1][0]) if has_more else None,
+                'has_more': has_more
+            }
 
-        show_ids = [s.id for s in visible_shows]
-        counts_map = _batch_counts(show_ids)
+        page = request.args.get('page', 1, type=int)
+        total = query.count()
+        rows = query.offset((page - 1) * per_page).limit(per_page).all()
 
         return {
-            'shows': [s.to_dict(viewer_id=current_user_id, counts=counts_map.get(s.id)) for s in visible_shows],
-            'total': len(visible_shows),
+            'shows': [s.to_dict(viewer_id=current_user_id) for _, s in rows],
+            'total': total,
             'page': page,
-            'pages': (len(visible_shows) + per_page - 1) // per_page if visible_shows else 0
+            'pages': (total + per_page - 1) // per_page if total else 0
         }
 
 
@@ -330,6 +374,8 @@ class ShowVisibility(Resource):
 
         data = request.get_json()
         show.set_visible_to(data.get('visible_to'))
+        db.session.flush()
+        feed.rebuild_show(show)
         db.session.commit()
 
         vto = show.get_visible_to_ids()
@@ -427,8 +473,10 @@ class ShowDetail(Resource):
         if show.user_id != current_user_id:
             return {'error': 'Not authorized'}, 403
         
+        feed.remove_show(show.id)
         db.session.delete(show)
         db.session.commit()
+        invalidate_user(current_user_id, 'shows')
         
         return {'message': 'Show deleted'}
 
@@ -871,6 +919,7 @@ class ShowCheckoutEndpoint(Resource):
         if not checkin:
             return {'error': 'Not checked in'}, 400
         
+        live_locations.remove(show_id, current_user_id)
         db.session.delete(checkin)
         db.session.commit()
         
@@ -887,55 +936,25 @@ class ShowPresence(Resource):
         current_user_id = int(get_jwt_identity())
         show = Show.query.get_or_404(show_id)
 
-        # Find all shows for the same concert (same artist, venue, date)
-        sibling_show_ids = [s.id for s in Show.query.filter_by(
-            artist_id=show.artist_id,
-            venue_id=show.venue_id,
-            date=show.date
-        ).all()]
-
-        # Get active checkins with location across all sibling shows
-        checkins = ShowCheckin.query.filter(
-            ShowCheckin.show_id.in_(sibling_show_ids),
-            ShowCheckin.is_active == True,
-            ShowCheckin.latitude.isnot(None),
-            ShowCheckin.longitude.isnot(None)
-        ).all()
-        
         # Get current user's friends for friend status
-        from app.models import Friendship
-        friends = Friendship.query.filter(
-            db.or_(
-                Friendship.user_id == current_user_id,
-                Friendship.friend_id == current_user_id
-            ),
-            Friendship.status == 'accepted'
-        ).all()
-        
-        friend_ids = set()
-        for f in friends:
-            friend_ids.add(f.user_id if f.friend_id == current_user_id else f.friend_id)
-        
+        friend_ids = get_friend_ids(current_user_id)
+
+        # Positions shared across all shows for the same concert, from the live store,
+        # respecting friends' share_with lists
         users = []
-        for checkin in checkins:
-            if checkin.user_id != current_user_id:
-                checkin_user = checkin.user or User.query.get(checkin.user_id)
-                if not checkin_user:
-                    continue
-                # Respect share_with filtering
-                if checkin.user_id in friend_ids:
-                    share_ids = checkin.get_share_with_ids()
-                    if share_ids is not None and current_user_id not in share_ids:
-                        continue
-                user_data = {
-                    'id': checkin.user_id,
-                    'username': checkin_user.username,
-                    'is_friend': checkin.user_id in friend_ids,
-                    'last_seen': checkin.last_location_update.isoformat() if checkin.last_location_update else checkin.checked_in_at.isoformat(),
-                    'latitude': checkin.latitude,
-                    'longitude': checkin.longitude,
-                }
-                users.append(user_data)
+        for loc in live_locations.locations(show.id):
+            if loc.user_id == current_user_id:
+                continue
+            if loc.user_id in friend_ids and not loc.visible_to(current_user_id):
+                continue
+            users.append({
+                'id': loc.user_id,
+                'username': loc.username,
+                'is_friend': loc.user_id in friend_ids,
+                'last_seen': loc.updated_at.isoformat() if loc.updated_at else None,
+                'latitude': loc.latitude,
+                'longitude': loc.longitude,
+            })
 
         return {'users': users}
     
@@ -949,6 +968,12 @@ class ShowPresence(Resource):
         
         latitude = data.get('latitude')
         longitude = data.get('longitude')
+
+        # Already tracked and no sharing change: the live store persists it in batches
+        location = live_locations.get(show_id, current_user_id)
+        if location is not None and location.show_id == show_id and 'share_with' not in data:
+            live_locations.move(location, latitude, longitude)
+            return {'message': 'Location updated'}
         
         # Find active checkin first, then fall back to any checkin (to reactivate)
         checkin = ShowCheckin.query.filter_by(
@@ -971,9 +996,6 @@ class ShowPresence(Resource):
         
         # Explicitly sharing location overrides appear_offline —
         # the user clicked "Share My Location" which is an active choice.
-        checkin.latitude = latitude
-        checkin.longitude = longitude
-        checkin.last_location_update = datetime.utcnow()
         checkin.is_active = True
 
         # Set selective sharing list if provided
@@ -982,6 +1004,12 @@ class ShowPresence(Resource):
 
         db.session.commit()
 
+        if location is None or location.show_id != show_id:
+            location = live_locations.track(checkin)
+        else:
+            location.share_ids = checkin.get_share_with_ids()
+        live_locations.move(location, latitude, longitude)
+
         return {'message': 'Location updated'}
     
     @api.doc('stop_presence', security='jwt')
@@ -990,6 +1018,7 @@ class ShowPresence(Resource):
         """Stop sharing location"""
         current_user_id = int(get_jwt_identity())
         
+        live_locations.remove(show_id, current_user_id)
         checkin = ShowCheckin.query.filter_by(
             user_id=current_user_id,
             show_id=show_id
@@ -999,7 +1028,7 @@ class ShowPresence(Resource):
             checkin.is_active = False
             checkin.latitude = None
             checkin.longitude = None
-            checkin.share_with = None
+            checkin.set_share_with(None)
             db.session.commit()
 
         return {'message': 'Location sharing stopped'}
@@ -1043,6 +1072,7 @@ class ShowShareWith(Resource):
         db.session.commit()
 
         share_ids = checkin.get_share_with_ids()
+        live_locations.set_share(show_id, current_user_id, share_ids)
         return {'share_with': list(share_ids) if share_ids is not None else None}
 
 
@@ -1052,8 +1082,6 @@ class FriendsGoing(Resource):
     @jwt_required()
     def get(self, show_id):
         """Get friends who have the same show (same artist/venue/date) with presence status"""
-        from app.socket_events import online_users
-
         current_user_id = int(get_jwt_identity())
         show = Show.query.get_or_404(show_id)
         friend_ids = get_friend_ids(current_user_id)
@@ -1061,20 +1089,20 @@ class FriendsGoing(Resource):
         if not friend_ids:
             return {'friends': []}
 
-        # Find friends who have a show with same artist, venue, date
-        friend_shows = Show.query.filter(
-            Show.artist_id == show.artist_id,
-            Show.venue_id == show.venue_id,
-            Show.date == show.date,
-            Show.user_id.in_(friend_ids)
+        # Find friends who have a show for the same concert that is visible to us
+        friend_shows = Show.query.options(joinedload(Show.user)).filter(
+            show.same_concert_clause(),
+            Show.user_id.in_(friend_ids),
+            Show.visible_to_clause(current_user_id)
         ).all()
 
-        # Collect sibling show IDs once for location lookups
-        sibling_show_ids = [s.id for s in Show.query.filter_by(
-            artist_id=show.artist_id,
-            venue_id=show.venue_id,
-            date=show.date,
-        ).with_entities(Show.id).all()]
+        # Locations friends are sharing with us at this concert, from the live store
+        sharing = {
+            loc.user_id: loc for loc in live_locations.locations(show.id)
+            if loc.user_id in friend_ids and loc.visible_to(current_user_id)
+        }
+
+        online = set(presence.online_ids({fs.user_id for fs in friend_shows}))
 
         friends = []
         seen = set()
@@ -1082,35 +1110,22 @@ class FriendsGoing(Resource):
             if fs.user_id in seen:
                 continue
             seen.add(fs.user_id)
-            user = User.query.get(fs.user_id)
+            user = fs.user
             if not user:
                 continue
 
-            # Skip if this friend's show has visible_to set and we're not in the list
-            vto = fs.get_visible_to_ids()
-            if vto is not None and current_user_id not in vto:
-                continue
-
-            is_online = fs.user_id in online_users and len(online_users[fs.user_id]) > 0
+            is_online = fs.user_id in online
             appear_offline = getattr(user, 'appear_offline', False)
 
-            # Check if this friend is actively sharing location
+            # Check if this friend is actively sharing location with us
             is_sharing = False
             lat = None
             lng = None
-            checkin = ShowCheckin.query.filter(
-                ShowCheckin.user_id == fs.user_id,
-                ShowCheckin.is_active == True,
-                ShowCheckin.latitude.isnot(None),
-                ShowCheckin.longitude.isnot(None),
-                ShowCheckin.show_id.in_(sibling_show_ids),
-            ).first()
+            checkin = sharing.get(fs.user_id)
             if checkin:
-                share_ids = checkin.get_share_with_ids()
-                if share_ids is None or current_user_id in share_ids:
-                    is_sharing = True
-                    lat = checkin.latitude
-                    lng = checkin.longitude
+                is_sharing = True
+                lat = checkin.latitude
+                lng = checkin.longitude
 
             # Skip appear_offline users unless they're actively sharing location
             # (explicit "Share My Location" overrides passive offline status)
@@ -1118,7 +1133,7 @@ class FriendsGoing(Resource):
                 continue
 
             # Actively sharing location implies online at this show,
-            # even if appear_offline keeps them out of the global online_users dict
+            # even if appear_offline keeps them out of the online presence set
             status = 'online' if (is_online or is_sharing) else 'offline'
 
             friends.append({
@@ -1147,12 +1162,11 @@ class FriendsAtShow(Resource):
         if not friend_ids:
             return {'friends': []}
 
-        # Find friends who have a show with same artist, venue, date
-        friend_shows = Show.query.filter(
-            Show.artist_id == show.artist_id,
-            Show.venue_id == show.venue_id,
-            Show.date == show.date,
-            Show.user_id.in_(friend_ids)
+        # Find friends who have a show for the same concert that is visible to us
+        friend_shows = Show.query.options(joinedload(Show.user)).filter(
+            show.same_concert_clause(),
+            Show.user_id.in_(friend_ids),
+            Show.visible_to_clause(current_user_id)
         ).all()
 
         seen = set()
@@ -1161,15 +1175,10 @@ class FriendsAtShow(Resource):
             if fs.user_id in seen:
                 continue
             seen.add(fs.user_id)
-            user = User.query.get(fs.user_id)
+            user = fs.user
             if not user:
                 continue
 
-            # Skip if friend's show has visible_to set and we're not in the list
-            vto = fs.get_visible_to_ids()
-            if vto is not None and current_user_id not in vto:
-                continue
-
             friends.append({
                 'id': user.id,
                 'username': user.username,
@@ -1184,8 +1193,7 @@ class NotifyFriends(Resource):
     @jwt_required()
     def post(self, show_id):
         """Notify selected friends about this show"""
-        from app.socket_events import user_sids
-        from flask_socketio import emit
+        from app.socket_events import user_room
         from app import socketio
 
         current_user_id = int(get_jwt_identity())
@@ -1233,11 +1241,9 @@ class NotifyFriends(Resource):
 
         db.session.commit()
 
-        # Emit socket event to each friend (reaches even appear-offline users)
+        # Emit socket event to each friend's user room (reaches even appear-offline users)
         for notif in notifications:
-            if notif.user_id in user_sids:
-                for sid in user_sids[notif.user_id]:
-                    socketio.emit('show_notification', notif.to_dict(), to=sid)
+            socketio.emit('show_notification', notif.to_dict(), to=user_room(notif.user_id))
 
         return {'message': f'Notified {len(valid_ids)} friends', 'notified_count': len(valid_ids)}, 201
 
@@ -1278,40 +1284,23 @@ class ShowPhotos(Resource):
         
         filename = f"{uuid.uuid4()}{ext}"
 
-        # Save file
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        upload_folder = os.path.join(base_dir, 'uploads', 'photos')
-        os.makedirs(upload_folder, exist_ok=True)
-        filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
-
-        # Generate thumbnail
-        thumbnail_filename = None
-        try:
-            from PIL import Image as PILImage
-            thumbnail_dir = os.path.join(base_dir, 'uploads', 'thumbnails')
-            os.makedirs(thumbnail_dir, exist_ok=True)
-            with PILImage.open(filepath) as img:
-                img.thumbnail((300, 300), PILImage.Resampling.LANCZOS)
-                thumbnail_filename = f"thumb_{filename}"
-                img.save(os.path.join(thumbnail_dir, thumbnail_filename))
-        except Exception as e:
-            print(f'Thumbnail generation failed: {e}')
-            thumbnail_filename = None
+        # Save the original; the thumbnail is rendered off the request
+        os.makedirs(PHOTO_DIR, exist_ok=True)
+        file.save(os.path.join(PHOTO_DIR, filename))
 
         # Create photo record
-        from app.models import Photo
         photo = Photo(
             user_id=current_user_id,
             show_id=show_id,
             filename=filename,
             original_filename=secure_filename(file.filename),
-            thumbnail_filename=thumbnail_filename,
-            caption=request.form.get('caption', '')
+            caption=request.form.get('caption', ''),
+            processing_status='pending'
         )
         
         db.session.add(photo)
         db.session.commit()
+        media_pipeline.enqueue(photo)
         
         return photo.to_dict(), 201
 
@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from app.models import db, VideoRecording, Show
+from app.utils.media_files import media_files, mimetype_for
 from PIL import Image
 import os
 import uuid
@@ -76,11 +77,10 @@ def get_video(video_id):
         return jsonify({'error': 'Video not found'}), 404
     
     filepath = os.path.join(UPLOAD_FOLDER, video.filename)
-    
-    if not os.path.exists(filepath):
+    response = media_files.serve(filepath, mimetype_for(video.filename, 'video/mp4'), 'private')
+    if response is None:
         return jsonify({'error': 'Video file not found'}), 404
-    
-    return send_file(filepath, mimetype='video/*')
+    return response
 
 @videos_bp.route('/<int:video_id>', methods=['PUT'])
 @jwt_required()
@@ -2,14 +2,16 @@
 Videos API Routes - Flask-RESTX Implementation
 Handles video uploads, streaming, updates, and deletion
 """
-from flask import request, send_file
+from flask import request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 import os
 
-from app.models import db, VideoRecording, Show
+from app.models import db, VideoRecording, Show, UploadSession
+from app.utils.media_files import media_files, mimetype_for
+from app.utils.resumable_uploads import resumable_uploads, UploadRejected
 
 # Create namespace
 api = Namespace('videos', description='Video recording management operations')
@@ -53,6 +55,32 @@ error_response = api.model('ErrorResponse', {
     'error': fields.String(description='Error message')
 })
 
+upload_create_model = api.model('UploadSessionCreate', {
+    'show_id': fields.Integer(required=True, description='Show ID'),
+    'filename': fields.String(required=True, description='Original filename'),
+    'length': fields.Integer(required=True, description='Total size in bytes'),
+    'title': fields.String(required=False, description='Video title'),
+    'description': fields.String(required=False, description='Description')
+})
+
+upload_session_model = api.model('UploadSession', {
+    'id': fields.String(description='Upload ID'),
+    'show_id': fields.Integer(description='Show ID'),
+    'filename': fields.String(description='Original filename'),
+    'length': fields.Integer(description='Total size in bytes'),
+    'offset': fields.Integer(description='Bytes received; the next chunk starts here'),
+    'video_id': fields.Integer(description='Video created by completing the upload'),
+    'created_at': fields.DateTime(description='Session start'),
+    'expires_at': fields.DateTime(description='Deleted if not continued by then'),
+    'url': fields.String(description='Session URL for PATCH, GET and DELETE')
+})
+
+chunk_parser = api.parser()
+chunk_parser.add_argument('Upload-Offset', location='headers', type=int, required=True,
+                          help='Bytes already received (the offset this chunk starts at)')
+chunk_parser.add_argument('Upload-Checksum', location='headers', required=False,
+                          help='Checksum of this chunk: "sha256 <base64 digest>" (or sha1, md5)')
+
 
 def allowed_video_file(filename):
     """Check if video file extension is allowed"""
@@ -150,6 +178,145 @@ class VideoUpload(Resource):
         return video.to_dict(), 201
 
 
+def _upload_headers(session, offset):
+    return {'Upload-Offset': str(offset), 'Upload-Length': str(session.length), 'Cache-Control': 'no-store'}
+
+
+def _rejected(error):
+    body = {'error': str(error)}
+    headers = {}
+    if error.offset is not None:
+        body['offset'] = error.offset
+        headers['Upload-Offset'] = str(error.offset)
+    return body, error.status, headers
+
+
+def _get_upload(upload_id):
+    """The current user's upload session, or None."""
+    session = db.session.get(UploadSession, upload_id)
+    if session is None or session.user_id != int(get_jwt_identity()):
+        return None
+    return session
+
+
+@api.route('/uploads')
+class VideoUploadSessions(Resource):
+    @api.doc('create_video_upload', security='jwt')
+    @api.expect(upload_create_model)
+    @api.response(201, 'Upload session created', upload_session_model)
+    @api.response(400, 'Bad request', error_response)
+    @api.response(404, 'Show not found', error_response)
+    @api.response(413, 'Too large', error_response)
+    @jwt_required()
+    def post(self):
+        """Start a resumable upload; send the file with PATCH to the returned url"""
+        current_user_id = int(get_jwt_identity())
+        data = request.get_json() or {}
+
+        show_id = data.get('show_id')
+        filename = secure_filename(data.get('filename') or '')
+        length = data.get('length')
+
+        if not show_id:
+            return {'error': 'show_id is required'}, 400
+        if not isinstance(length, int):
+            return {'error': 'length is required'}, 400
+
+        show = Show.query.get(show_id)
+        if not show:
+            return {'error': 'Show not found'}, 404
+
+        if not allowed_video_file(filename):
+            return {'error': 'Invalid file type. Allowed: mp4, mov, avi, mkv, webm, flv'}, 400
+
+        try:
+            session = resumable_uploads.create(current_user_id, show_id, filename, length,
+                                               data.get('title'), data.get('description'))
+        except UploadRejected as e:
+            return _rejected(e)
+
+        headers = _upload_headers(session, 0)
+        headers['Location'] = session.to_dict(0)['url']
+        return session.to_dict(0), 201, headers
+
+
+@api.route('/uploads/<string:upload_id>')
+class VideoUploadSession(Resource):
+    @api.doc('get_video_upload', security='jwt')
+    @api.response(200, 'Upload progress (also as Upload-Offset on HEAD)', upload_session_model)
+    @api.response(404, 'Not found', error_response)
+    @jwt_required()
+    def get(self, upload_id):
+        """Offset to resume an upload from"""
+        session = _get_upload(upload_id)
+        if not session:
+            return {'error': 'Upload not found'}, 404
+        offset = resumable_uploads.offset(session)
+        return session.to_dict(offset), 200, _upload_headers(session, offset)
+
+    @api.doc('append_video_upload', security='jwt')
+    @api.expect(chunk_parser)
+    @api.response(204, 'Chunk stored; Upload-Offset is the new offset')
+    @api.response(409, 'Offset does not match, or another request is writing', error_response)
+    @api.response(411, 'Content-Length is required', error_response)
+    @api.response(413, 'Chunk runs past the upload length', error_response)
+    @api.response(415, 'Body must be application/offset+octet-stream', error_response)
+    @api.response(460, 'Checksum mismatch; the chunk was discarded', error_response)
+    @jwt_required()
+    def patch(self, upload_id):
+        """Append the request body at Upload-Offset"""
+        session = _get_upload(upload_id)
+        if not session:
+            return {'error': 'Upload not found'}, 404
+        if request.mimetype != 'application/offset+octet-stream':
+            return {'error': 'Content-Type must be application/offset+octet-stream'}, 415
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            return {'error': 'Upload-Offset header is required'}, 400
+        if request.content_length is None:
+            # Without a length a chunked body reads as empty here
+            return {'error': 'Content-Length is required'}, 411
+
+        try:
+            offset = resumable_uploads.append(session, offset, request.stream, request.content_length,
+                                              request.headers.get('Upload-Checksum'))
+        except UploadRejected as e:
+            return _rejected(e)
+        return '', 204, _upload_headers(session, offset)
+
+    @api.doc('cancel_video_upload', security='jwt')
+    @api.response(204, 'Upload cancelled')
+    @api.response(404, 'Not found', error_response)
+    @jwt_required()
+    def delete(self, upload_id):
+        """Cancel an upload and delete what it received"""
+        session = _get_upload(upload_id)
+        if not session:
+            return {'error': 'Upload not found'}, 404
+        resumable_uploads.discard(session)
+        return '', 204
+
+
+@api.route('/uploads/<string:upload_id>/complete')
+class VideoUploadComplete(Resource):
+    @api.doc('complete_video_upload', security='jwt')
+    @api.response(201, 'Video created', video_model)
+    @api.response(404, 'Not found', error_response)
+    @api.response(409, 'Upload is not complete', error_response)
+    @jwt_required()
+    def post(self, upload_id):
+        """Turn a fully received upload into a video recording"""
+        session = _get_upload(upload_id)
+        if not session:
+            return {'error': 'Upload not found'}, 404
+        try:
+            video = resumable_uploads.finalize(session)
+        except UploadRejected as e:
+            return _rejected(e)
+        return video.to_dict(), 201
+
+
 @api.route('/<int:video_id>')
 class VideoDetail(Resource):
     @api.doc('stream_video', security='jwt')
@@ -162,22 +329,10 @@ class VideoDetail(Resource):
         if not video:
             return {'error': 'Video not found'}, 404
         
-        if not os.path.exists(video.file_path):
+        response = media_files.serve(video.file_path, mimetype_for(video.filename, 'video/mp4'), 'private')
+        if response is None:
             return {'error': 'File not found'}, 404
-        
-        # Determine mime type based on extension
-        extension = video.filename.rsplit('.', 1)[1].lower() if '.' in video.filename else ''
-        mime_types = {
-            'mp4': 'video/mp4',
-            'mov': 'video/quicktime',
-            'avi': 'video/x-msvideo',
-            'mkv': 'video/x-matroska',
-            'webm': 'video/webm',
-            'flv': 'video/x-flv'
-        }
-        mime_type = mime_types.get(extension, 'video/mp4')
-        
-        return send_file(video.file_path, mimetype=mime_type)
+        return response
     
     @api.doc('update_video_metadata', security='jwt')
     @api.expect(video_update_model)
@@ -3,48 +3,55 @@ WebSocket Integration with Flask-SocketIO
 Handles real-time chat and user presence for shows
 """
 
-from flask_socketio import emit, join_room, leave_room, rooms
+from flask_socketio import emit, join_room, leave_room, disconnect
 from flask import request
 from flask_jwt_extended import decode_token
-from app.models import db, ChatMessage, ShowCheckin, User, Show, Conversation, DirectMessage, get_friend_ids
+from app.models import db, ShowCheckin, User, Show, DirectMessage, get_friend_ids
+from app.utils.live_locations import live_locations
+from app.utils.presence import presence
+from app.utils.chat_history import chat_history
+from app.utils.chat_writer import chat_writer
+from app.utils.typing_indicators import typing_indicators, conversation_members
 from datetime import datetime
+import time
 
 # Use the single SocketIO instance from the app package
 from app import socketio
 
-# Store active users per show
-# Format: {show_id: {user_id: {'username': str, 'sid': str}}}
-active_users = {}
+# Presence shared with the REST routes (online users, show chat members, concert
+# attendance, DM page): see app.utils.presence. Everything below is per process.
 
-# Store DM-active users (users on the messages page)
-# Format: {user_id: {'sid': str, 'username': str}}
-dm_active_users = {}
+# Concert each joined show belongs to (None for shows without a concert)
+# Format: {show_id: concert_id}
+show_concerts = {}
 
-# Store globally online users (for friend presence)
-# Format: {user_id: set(sid, ...)}
-online_users = {}
+# Authenticated identity per connection, resolved once in handle_connect
+# Format: {sid: SocketUser}
+sessions = {}
 
-# Store ALL connected SIDs per user (regardless of appear_offline)
-# Used to restore online_users when toggling appear_offline back to false
-# Format: {user_id: set(sid, ...)}
-user_sids = {}
+# Shows each connection has joined (reverse index of show membership for disconnect)
+# Format: {sid: set(show_id, ...)}
+sid_shows = {}
 
 
-def get_sibling_show_ids(show_id):
-    """Get all show IDs for the same concert (same artist, venue, date)."""
-    show = Show.query.get(show_id)
-    if not show:
-        return [show_id]
-    siblings = Show.query.filter_by(
-        artist_id=show.artist_id,
-        venue_id=show.venue_id,
-        date=show.date
-    ).with_entities(Show.id).all()
-    return [s.id for s in siblings]
+class SocketUser:
+    """Compact per-connection session: who the socket belongs to and until when.
+    Only fields that cannot change while the connection is open are kept; settings such as
+    appear_offline can be changed through any worker, so they are read where they are used."""
+    __slots__ = ('id', 'username', 'expires_at')
+
+    def __init__(self, user_id, username, expires_at):
+        self.id = user_id
+        self.username = username
+        self.expires_at = expires_at  # epoch seconds from the token's exp claim, or None
+
+    def expired(self):
+        return self.expires_at is not None and time.time() >= self.expires_at
 
 
-def get_user_from_token():
-    """Extract user from JWT token in socket connection"""
+def authenticate_connection():
+    """Decode the connecting client's JWT and load its user (once per connection).
+    Returns (SocketUser, appear_offline) or (None, None)."""
     try:
         # Get token from cookie or query string
         token = None
@@ -58,7 +65,7 @@ def get_user_from_token():
             token = request.args.get('token')
         
         if not token:
-            return None
+            return None, None
         
         # Decode JWT token
         decoded_token = decode_token(token)
@@ -66,40 +73,128 @@ def get_user_from_token():
         
         # Get user from database
         user = User.query.get(user_id)
-        return user
+        if not user:
+            return None, None
+        return SocketUser(user.id, user.username, decoded_token.get('exp')), bool(user.appear_offline)
         
     except Exception as e:
         print(f"Error getting user from token: {e}")
+        return None, None
+
+
+def get_session_user():
+    """Session of the current connection, or None if unauthenticated.
+    Connections whose token has expired are dropped without re-decoding it."""
+    user = sessions.get(request.sid)
+    if user is None:
         return None
+    if user.expired():
+        print(f"Token expired for {user.username} (sid: {request.sid})")
+        disconnect()
+        return None
+    return user
+
+
+def user_room(user_id):
+    """Room holding every connection of one user"""
+    return f'user_{user_id}'
+
+
+def concert_room(concert_id):
+    """Room holding every connection that joined any show of one concert"""
+    return f'concert_{concert_id}'
+
+
+def emit_to_users(event, payload, user_ids):
+    """One emit to the per-user rooms of user_ids (no-op when there is nobody to tell)"""
+    if user_ids:
+        socketio.emit(event, payload, to=[user_room(uid) for uid in user_ids])
+
+
+def online_friends(friend_ids):
+    """Friends with at least one connection that is not appearing offline"""
+    return presence.online_ids(friend_ids)
+
+
+def connected_friends(friend_ids):
+    """Friends with any open connection, including those appearing offline"""
+    return presence.connected_ids(friend_ids)
+
+
+def location_audience(user_id, show_id, share_ids=None, friend_ids=None):
+    """Friends present at show_id's concert who may see user_id's location.
+    Computed from the friend, share-with and concert presence sets, with no per-show loops."""
+    if friend_ids is None:
+        friend_ids = get_friend_ids(user_id)
+    candidates = friend_ids if share_ids is None else friend_ids & share_ids
+    if not candidates:
+        return set()
+    concert_id = show_concerts.get(show_id)
+    if concert_id is not None:
+        return presence.concert_present(concert_id, candidates)
+    return presence.show_present(show_id, candidates)
+
+
+def location_event(show_id, payload):
+    """A location_update/location_stopped payload tagged with the show and its concert.
+    These go to the per-user rooms, which every tab of a friend is in, so the client uses
+    the tags to drop positions from concerts other than the one it is showing."""
+    if show_id in show_concerts:
+        concert_id = show_concerts[show_id]
+    else:
+        concert_id = db.session.query(Show.concert_id).filter(Show.id == show_id).scalar()
+    return {**payload, 'show_id': show_id, 'concert_id': concert_id}
+
+
+def _enter_concert(user_id, show):
+    """Record the user at the show's concert and join its concert-wide room"""
+    show_concerts[show.id] = show.concert_id
+    if show.concert_id is None:
+        return
+    join_room(concert_room(show.concert_id))
+    presence.enter_concert(show.concert_id, user_id, show.id, request.sid)
+
+
+def _leave_concert(user_id, show_id):
+    """Forget this connection's show at its concert; leave the concert room after the last sibling"""
+    concert_id = show_concerts.get(show_id)
+    if concert_id is not None and presence.leave_concert(concert_id, user_id, show_id, request.sid):
+        leave_room(concert_room(concert_id))
+
+
+def chat_room(show_id, data):
+    """Chat room for an event: the show's own room, or the concert-wide room when the
+    client opts in with chat_scope='concert' (friends on sibling shows share one chat)"""
+    if data.get('chat_scope') == 'concert':
+        concert_id = show_concerts.get(show_id)
+        if concert_id is not None:
+            return concert_room(concert_id)
+    return f'show_{show_id}'
 
 
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
-    user = get_user_from_token()
+    user, appear_offline = authenticate_connection()
 
     if not user:
         print("Unauthorized connection attempt")
         return False  # Reject connection
 
-    # Always track this SID (regardless of appear_offline)
-    user_sids.setdefault(user.id, set()).add(request.sid)
+    sessions[request.sid] = user
+
+    join_room(user_room(user.id))
 
-    # Track online presence (unless appearing offline)
+    # Track this SID (regardless of appear_offline) and online presence (unless appearing offline)
     try:
-        if not getattr(user, 'appear_offline', False):
-            was_empty = user.id not in online_users or len(online_users.get(user.id, set())) == 0
-            online_users.setdefault(user.id, set()).add(request.sid)
-            # Only notify friends on the *first* connection (not additional tabs)
-            if was_empty:
-                friend_ids = get_friend_ids(user.id)
-                for fid in friend_ids:
-                    if fid in online_users:
-                        for sid in online_users[fid]:
-                            emit('friend_online', {
-                                'user_id': user.id,
-                                'username': user.username
-                            }, to=sid)
+        first_online = presence.connect(user.id, request.sid, online=not appear_offline)
+        # Only notify friends on the *first* connection (not additional tabs)
+        if first_online:
+            friend_ids = get_friend_ids(user.id)
+            emit_to_users('friend_online', {
+                'user_id': user.id,
+                'username': user.username
+            }, online_friends(friend_ids))
     except Exception as e:
         print(f"Error tracking online presence on connect: {e}")
 
@@ -110,84 +205,57 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
-    user = get_user_from_token()
+    user = sessions.pop(request.sid, None)
+    typing_indicators.drop_connection(request.sid)
 
     if user:
-        # Clean up user_sids tracking
-        if user.id in user_sids:
-            user_sids[user.id].discard(request.sid)
-            if not user_sids[user.id]:
-                del user_sids[user.id]
-
-        # Clean up global online presence
+        # Clean up SID tracking and global online presence
         try:
-            if user.id in online_users:
-                online_users[user.id].discard(request.sid)
-                if not online_users[user.id]:
-                    # Last online connection gone — user is truly offline
-                    del online_users[user.id]
-                    friend_ids = get_friend_ids(user.id)
-                    for fid in friend_ids:
-                        if fid in online_users:
-                            for sid in online_users[fid]:
-                                emit('friend_offline', {
-                                    'user_id': user.id,
-                                    'username': user.username
-                                }, to=sid)
+            if presence.disconnect(user.id, request.sid):
+                # Last online connection gone — user is truly offline
+                friend_ids = get_friend_ids(user.id)
+                emit_to_users('friend_offline', {
+                    'user_id': user.id,
+                    'username': user.username
+                }, online_friends(friend_ids))
         except Exception as e:
             print(f"Error tracking online presence on disconnect: {e}")
 
         # Clean up DM presence
-        if user.id in dm_active_users:
+        if presence.dm_leave(user.id):
             leave_room(f'dm_user_{user.id}')
-            del dm_active_users[user.id]
-
-        friend_ids = get_friend_ids(user.id)
 
-        # Remove user from all show rooms
-        for show_id in list(active_users.keys()):
-            if user.id in active_users[show_id]:
-                # Clear location in DB and notify friends before removing
-                try:
-                    checkin = ShowCheckin.query.filter_by(
-                        user_id=user.id,
-                        show_id=show_id,
-                        is_active=True
-                    ).first()
-                    if checkin and checkin.latitude is not None:
-                        share_ids = checkin.get_share_with_ids()
-                        checkin.latitude = None
-                        checkin.longitude = None
-                        checkin.last_location_update = None
-                        checkin.share_with = None
-                        db.session.commit()
-
-                        # Notify friends across sibling shows (same concert)
-                        sibling_ids = get_sibling_show_ids(show_id)
-                        for sid in sibling_ids:
-                            if sid in active_users:
-                                for friend_id, info in active_users[sid].items():
-                                    if friend_id in friend_ids and (share_ids is None or friend_id in share_ids):
-                                        emit('location_stopped', {
-                                            'user_id': user.id,
-                                            'username': user.username
-                                        }, to=info['sid'])
-                except Exception as e:
-                    db.session.rollback()
-                    print(f"Error clearing location on disconnect: {e}")
-
-                del active_users[show_id][user.id]
-
-                # Clean up empty show rooms
-                if not active_users[show_id]:
-                    del active_users[show_id]
-                else:
-                    # Notify other users in the room
-                    emit('user_left', {
-                        'user_id': user.id,
-                        'username': user.username,
-                        'active_users': list(active_users[show_id].values())
-                    }, room=f'show_{show_id}')
+        # Drop this connection from the shows it joined; the user has left those that no
+        # other connection of theirs, on any worker, is still in
+        left = {}
+        for show_id in sid_shows.pop(request.sid, set()):
+            members = presence.leave_show(show_id, user.id, request.sid)
+            _leave_concert(user.id, show_id)
+            if members is not None:
+                left[show_id] = members
+
+        # Clear shared locations in one batched statement and notify friends
+        if left:
+            try:
+                stopped = live_locations.stop_sharing(user.id, list(left))
+                if stopped:
+                    friend_ids = get_friend_ids(user.id)
+                    for location in stopped:
+                        emit_to_users('location_stopped', location_event(location.show_id, {
+                            'user_id': user.id,
+                            'username': user.username
+                        }), location_audience(user.id, location.show_id, location.share_ids, friend_ids))
+            except Exception as e:
+                print(f"Error clearing location on disconnect: {e}")
+
+        # Notify the other users in the show rooms they left
+        for show_id, members in left.items():
+            if members:
+                emit('user_left', {
+                    'user_id': user.id,
+                    'username': user.username,
+                    'active_users': members
+                }, room=f'show_{show_id}')
 
         print(f"Client disconnected: {user.username} (sid: {request.sid})")
 
@@ -195,7 +263,7 @@ def handle_disconnect():
 @socketio.on('join_show')
 def handle_join_show(data):
     """Handle user joining a show chat room"""
-    user = get_user_from_token()
+    user = get_session_user()
     
     if not user:
         emit('error', {'message': 'Unauthorized'})
@@ -213,19 +281,18 @@ def handle_join_show(data):
         emit('error', {'message': 'Show not found'})
         return
     
-    # Join the room
+    # Join the room, plus the concert-wide room shared with sibling shows
     room_name = f'show_{show_id}'
     join_room(room_name)
+    _enter_concert(user.id, show)
     
     # Add user to active users
-    if show_id not in active_users:
-        active_users[show_id] = {}
-    
-    active_users[show_id][user.id] = {
+    members = presence.join_show(show_id, user.id, {
         'user_id': user.id,
         'username': user.username,
         'sid': request.sid
-    }
+    })
+    sid_shows.setdefault(request.sid, set()).add(show_id)
     
     # Check in user to show (optional - tracks presence in database)
     existing_checkin = ShowCheckin.query.filter_by(
@@ -248,17 +315,21 @@ def handle_join_show(data):
         db.session.add(checkin)
         db.session.commit()
     
-    # Get recent chat messages (last 50)
-    recent_messages = ChatMessage.query.filter_by(show_id=show_id)\
-        .order_by(ChatMessage.created_at.desc())\
-        .limit(50)\
-        .all()
-    
-    recent_messages.reverse()  # Show oldest to newest
+    # Recent chat messages from the room's buffer, across sibling shows for concert-wide
+    # chat. A reconnecting client sends the last seq it saw and gets only the gap.
+    if chat_room(show_id, data) == room_name:
+        history_room = chat_history.room(show_id)
+    else:
+        history_room = chat_history.room(show_id, show.concert_id)
+    last_seq = data.get('last_seq')
+    messages, resumed = chat_history.history(
+        history_room, last_seq if isinstance(last_seq, int) else None
+    )
     
-    # Send recent messages to the user
+    # Send recent messages to the user (oldest to newest)
     emit('message_history', {
-        'messages': [msg.to_dict() for msg in recent_messages]
+        'messages': messages,
+        'resumed': resumed
     })
     
     # Notify other users in the room
@@ -266,42 +337,24 @@ def handle_join_show(data):
         'user_id': user.id,
         'username': user.username,
         'message': f'{user.username} joined the chat',
-        'active_users': list(active_users[show_id].values())
+        'active_users': members
     }, room=room_name, include_self=False)
     
     # Send active users list to the joining user
     emit('active_users', {
-        'active_users': list(active_users[show_id].values()),
-        'count': len(active_users[show_id])
+        'active_users': members,
+        'count': len(members)
     })
 
-    # Send current friends' locations to the joining user
+    # Send current friends' locations to the joining user (served from the live store)
     try:
         friend_ids = get_friend_ids(user.id)
-        sibling_ids = get_sibling_show_ids(show_id)
-        checkins = ShowCheckin.query.filter(
-            ShowCheckin.show_id.in_(sibling_ids),
-            ShowCheckin.is_active == True,
-            ShowCheckin.latitude.isnot(None),
-            ShowCheckin.longitude.isnot(None),
-            ShowCheckin.user_id.in_(friend_ids)
-        ).all()
-        friends_locs = []
-        for checkin in checkins:
-            share_ids = checkin.get_share_with_ids()
-            if share_ids is not None and user.id not in share_ids:
-                continue
-            friend = User.query.get(checkin.user_id)
-            # appear_offline doesn't block explicit location sharing —
-            # these checkins have lat/lng, so the user opted in.
-            if friend:
-                friends_locs.append({
-                    'user_id': friend.id,
-                    'username': friend.username,
-                    'latitude': checkin.latitude,
-                    'longitude': checkin.longitude,
-                    'updated_at': checkin.last_location_update.isoformat() if checkin.last_location_update else None
-                })
+        # appear_offline doesn't block explicit location sharing —
+        # these users are sharing a position, so they opted in.
+        friends_locs = [
+            loc.to_dict() for loc in live_locations.locations(show_id)
+            if loc.user_id in friend_ids and loc.visible_to(user.id)
+        ]
         if friends_locs:
             emit('friends_locations', {'friends': friends_locs})
     except Exception as e:
@@ -313,7 +366,7 @@ def handle_join_show(data):
 @socketio.on('leave_show')
 def handle_leave_show(data):
     """Handle user leaving a show chat room"""
-    user = get_user_from_token()
+    user = get_session_user()
     
     if not user:
         emit('error', {'message': 'Unauthorized'})
@@ -327,22 +380,24 @@ def handle_leave_show(data):
     
     room_name = f'show_{show_id}'
     leave_room(room_name)
+    sid_shows.get(request.sid, set()).discard(show_id)
     
-    # Remove user from active users
-    if show_id in active_users and user.id in active_users[show_id]:
-        del active_users[show_id][user.id]
-        
-        # Clean up empty show rooms
-        if not active_users[show_id]:
-            del active_users[show_id]
-        else:
-            # Notify other users
-            emit('user_left', {
-                'user_id': user.id,
-                'username': user.username,
-                'message': f'{user.username} left the chat',
-                'active_users': list(active_users[show_id].values())
-            }, room=room_name)
+    # Remove this connection from active users
+    members = presence.leave_show(show_id, user.id, request.sid)
+    _leave_concert(user.id, show_id)
+    if members is None:
+        # Still in the show from another tab
+        print(f"{user.username} left show {show_id} chat in one tab")
+        return
+    
+    # Notify other users
+    if members:
+        emit('user_left', {
+            'user_id': user.id,
+            'username': user.username,
+            'message': f'{user.username} left the chat',
+            'active_users': members
+        }, room=room_name)
     
     # Check out user from show
     checkin = ShowCheckin.query.filter_by(
@@ -352,6 +407,7 @@ def handle_leave_show(data):
     ).first()
     
     if checkin:
+        live_locations.remove(show_id, user.id)
         checkin.checked_out_at = datetime.utcnow()
         checkin.is_active = False
         db.session.commit()
@@ -362,7 +418,7 @@ def handle_leave_show(data):
 @socketio.on('send_message')
 def handle_send_message(data):
     """Handle sending a chat message"""
-    user = get_user_from_token()
+    user = get_session_user()
     
     if not user:
         emit('error', {'message': 'Unauthorized'})
@@ -375,43 +431,28 @@ def handle_send_message(data):
         emit('error', {'message': 'Missing show_id or message'})
         return
     
-    # Verify show exists
-    show = Show.query.get(show_id)
-    if not show:
-        emit('error', {'message': 'Show not found'})
-        return
-    
-    # Verify user is in the room
-    room_name = f'show_{show_id}'
-    if room_name not in rooms():
+    # Verify user is in the room (join_show checked that the show exists)
+    if show_id not in sid_shows.get(request.sid, ()):
         emit('error', {'message': 'Not in show chat room'})
         return
-    
-    # Create chat message in database
-    message = ChatMessage(
-        show_id=show_id,
-        user_id=user.id,
-        message=message_text
-    )
+    room_name = chat_room(show_id, data)
+    concert_id = show_concerts.get(show_id)
     
     try:
-        db.session.add(message)
-        db.session.commit()
+        # Broadcast now; the row is written with the next group commit
+        message = chat_writer.submit(show_id, user.id, message_text, request.sid, room_name, concert_id)
         
-        # Broadcast message to all users in the room
-        emit('new_message', {
-            'id': message.id,
-            'show_id': show_id,
-            'user_id': user.id,
-            'username': user.username,
-            'message': message_text,
-            'created_at': message.created_at.isoformat()
-        }, room=room_name)
+        # Buffer the serialized message, then broadcast it to all users in the room
+        entry = chat_history.record(message, user.username, concert_id)
+        typing_indicators.message_sent(user.id, room_name)
+        emit('new_message', dict(
+            entry,
+            chat_scope='concert' if room_name != f'show_{show_id}' else 'show'
+        ), room=room_name)
         
         print(f"Message from {user.username} in show {show_id}: {message_text[:50]}...")
         
     except Exception as e:
-        db.session.rollback()
         emit('error', {'message': 'Failed to send message', 'details': str(e)})
         print(f"Error sending message: {e}")
 
@@ -419,7 +460,7 @@ def handle_send_message(data):
 @socketio.on('new_comment')
 def handle_new_comment(data):
     """Broadcast a new comment to all users viewing the same show"""
-    user = get_user_from_token()
+    user = get_session_user()
 
     if not user:
         emit('error', {'message': 'Unauthorized'})
@@ -444,32 +485,34 @@ def handle_new_comment(data):
 
 @socketio.on('typing')
 def handle_typing(data):
-    """Handle user typing indicator"""
-    user = get_user_from_token()
+    """Handle user typing indicator (broadcast only when typing starts or stops)"""
+    if not typing_indicators.allow(request.sid):
+        return
+
+    user = get_session_user()
     
     if not user:
         return
     
     show_id = data.get('show_id')
-    is_typing = data.get('is_typing', False)
+    is_typing = bool(data.get('is_typing', False))
     
-    if not show_id:
+    if not show_id or show_id not in sid_shows.get(request.sid, ()):
         return
     
-    room_name = f'show_{show_id}'
+    room_name = chat_room(show_id, data)
     
-    # Broadcast typing indicator to other users in the room
-    emit('user_typing', {
+    # Tell the other users in the room on start and stop; repeats only extend the timeout
+    typing_indicators.update(user.id, room_name, is_typing, 'user_typing', {
         'user_id': user.id,
-        'username': user.username,
-        'is_typing': is_typing
-    }, room=room_name, include_self=False)
+        'username': user.username
+    }, request.sid)
 
 
 @socketio.on('get_active_users')
 def handle_get_active_users(data):
     """Get list of active users in a show"""
-    user = get_user_from_token()
+    user = get_session_user()
     
     if not user:
         emit('error', {'message': 'Unauthorized'})
@@ -481,9 +524,7 @@ def handle_get_active_users(data):
         emit('error', {'message': 'Missing show_id'})
         return
     
-    users = []
-    if show_id in active_users:
-        users = list(active_users[show_id].values())
+    users = presence.show_members(show_id)
     
     emit('active_users', {
         'show_id': show_id,
@@ -495,7 +536,7 @@ def handle_get_active_users(data):
 @socketio.on('update_location')
 def handle_update_location(data):
     """Handle user sharing their live location at a show"""
-    user = get_user_from_token()
+    user = get_session_user()
 
     if not user:
         emit('error', {'message': 'Unauthorized'})
@@ -510,42 +551,45 @@ def handle_update_location(data):
         return
 
     try:
-        checkin = ShowCheckin.query.filter_by(
-            user_id=user.id,
-            show_id=show_id,
-            is_active=True
-        ).first()
-
-        if not checkin:
-            emit('error', {'message': 'Not checked in to this show'})
-            return
-
-        # Update share_with if provided
+        # Pings for an already-tracked checkin stay in memory; the live store
+        # writes them to show_checkins in batches
+        location = live_locations.get(show_id, user.id)
+        checkin = None
+        if location is None or location.show_id != show_id:
+            checkin = ShowCheckin.query.filter_by(
+                user_id=user.id,
+                show_id=show_id,
+                is_active=True
+            ).first()
+
+            if not checkin:
+                emit('error', {'message': 'Not checked in to this show'})
+                return
+
+            location = live_locations.track(checkin, user.username)
+
+        # Update share_with if provided (the client resends it with every ping)
         if 'share_with' in data:
-            checkin.set_share_with(data['share_with'])
+            wanted = data['share_with']
+            wanted = {int(fid) for fid in wanted} if wanted is not None else None
+            if wanted != location.share_ids:
+                checkin = checkin or ShowCheckin.query.get(location.checkin_id)
+                checkin.set_share_with(wanted)
+                db.session.commit()
+                location.share_ids = checkin.get_share_with_ids()
 
         # Explicitly sharing location overrides appear_offline —
         # the user clicked "Share My Location" which is an active choice.
-        checkin.latitude = latitude
-        checkin.longitude = longitude
-        checkin.last_location_update = datetime.utcnow()
-        db.session.commit()
+        live_locations.move(location, latitude, longitude)
 
-        # Broadcast location to accepted friends
-        friend_ids = get_friend_ids(user.id)
-        share_ids = checkin.get_share_with_ids()  # None = all friends
-        sibling_ids = get_sibling_show_ids(show_id)
-        for sid in sibling_ids:
-            if sid in active_users:
-                for friend_id, info in active_users[sid].items():
-                    if friend_id in friend_ids and (share_ids is None or friend_id in share_ids):
-                        emit('location_update', {
-                            'user_id': user.id,
-                            'username': user.username,
-                            'latitude': latitude,
-                            'longitude': longitude,
-                            'updated_at': checkin.last_location_update.isoformat()
-                        }, to=info['sid'])
+        # Broadcast location to accepted friends at this concert in one emit
+        emit_to_users('location_update', location_event(show_id, {
+            'user_id': user.id,
+            'username': user.username,
+            'latitude': latitude,
+            'longitude': longitude,
+            'updated_at': location.updated_at.isoformat()
+        }), location_audience(user.id, show_id, location.share_ids))
 
     except Exception as e:
         db.session.rollback()
@@ -556,7 +600,7 @@ def handle_update_location(data):
 @socketio.on('stop_location')
 def handle_stop_location(data):
     """Handle user stopping location sharing"""
-    user = get_user_from_token()
+    user = get_session_user()
 
     if not user:
         emit('error', {'message': 'Unauthorized'})
@@ -569,6 +613,7 @@ def handle_stop_location(data):
         return
 
     try:
+        live_locations.remove(show_id, user.id)
         checkin = ShowCheckin.query.filter_by(
             user_id=user.id,
             show_id=show_id,
@@ -582,20 +627,14 @@ def handle_stop_location(data):
             checkin.latitude = None
             checkin.longitude = None
             checkin.last_location_update = None
-            checkin.share_with = None
+            checkin.set_share_with(None)
             db.session.commit()
 
         # Notify friends across all sibling shows (same concert)
-        friend_ids = get_friend_ids(user.id)
-        sibling_ids = get_sibling_show_ids(show_id)
-        for sid in sibling_ids:
-            if sid in active_users:
-                for friend_id, info in active_users[sid].items():
-                    if friend_id in friend_ids and (share_ids is None or friend_id in share_ids):
-                        emit('location_stopped', {
-                            'user_id': user.id,
-                            'username': user.username
-                        }, to=info['sid'])
+        emit_to_users('location_stopped', location_event(show_id, {
+            'user_id': user.id,
+            'username': user.username
+        }), location_audience(user.id, show_id, share_ids))
 
     except Exception as e:
         db.session.rollback()
@@ -606,7 +645,7 @@ def handle_stop_location(data):
 @socketio.on('get_friends_locations')
 def handle_get_friends_locations(data):
     """Get locations of friends checked into the same show"""
-    user = get_user_from_token()
+    user = get_session_user()
 
     if not user:
         emit('error', {'message': 'Unauthorized'})
@@ -619,34 +658,14 @@ def handle_get_friends_locations(data):
         return
 
     friend_ids = get_friend_ids(user.id)
-    sibling_ids = get_sibling_show_ids(show_id)
-
-    # Query active checkins with location data for friends at this concert
-    checkins = ShowCheckin.query.filter(
-        ShowCheckin.show_id.in_(sibling_ids),
-        ShowCheckin.is_active == True,
-        ShowCheckin.latitude.isnot(None),
-        ShowCheckin.longitude.isnot(None),
-        ShowCheckin.user_id.in_(friend_ids)
-    ).all()
-
-    friends = []
-    for checkin in checkins:
-        # Check if this friend's share_with list includes the requesting user
-        share_ids = checkin.get_share_with_ids()
-        if share_ids is not None and user.id not in share_ids:
-            continue
-        friend = User.query.get(checkin.user_id)
-        # appear_offline doesn't block explicit location sharing —
-        # these checkins have lat/lng, so the user opted in.
-        if friend:
-            friends.append({
-                'user_id': friend.id,
-                'username': friend.username,
-                'latitude': checkin.latitude,
-                'longitude': checkin.longitude,
-                'updated_at': checkin.last_location_update.isoformat() if checkin.last_location_update else None
-            })
+
+    # Friends sharing a position at this concert, from the live store
+    # appear_offline doesn't block explicit location sharing —
+    # these users are sharing a position, so they opted in.
+    friends = [
+        loc.to_dict() for loc in live_locations.locations(show_id)
+        if loc.user_id in friend_ids and loc.visible_to(user.id)
+    ]
 
     emit('friends_locations', {'friends': friends})
 
@@ -655,7 +674,7 @@ def handle_get_friends_locations(data):
 def handle_update_share_with(data):
     """Update the share_with list on an active checkin without a location update.
     Emits location_stopped to removed friends and location_update to newly-added friends."""
-    user = get_user_from_token()
+    user = get_session_user()
 
     if not user:
         emit('error', {'message': 'Unauthorized'})
@@ -683,9 +702,24 @@ def handle_update_share_with(data):
         checkin.set_share_with(new_share_with)
         db.session.commit()
         new_ids = checkin.get_share_with_ids()
+        live_locations.set_share(show_id, user.id, new_ids)
+
+        # Latest position for newly-added friends: the live store, else the stored row
+        location = live_locations.get(show_id, user.id)
+        if location is not None and location.show_id == show_id and location.latitude is not None:
+            position = location.to_dict()
+        elif checkin.latitude is not None:
+            position = {
+                'user_id': user.id,
+                'username': user.username,
+                'latitude': checkin.latitude,
+                'longitude': checkin.longitude,
+                'updated_at': checkin.last_location_update.isoformat() if checkin.last_location_update else None
+            }
+        else:
+            position = None
 
         friend_ids = get_friend_ids(user.id)
-        sibling_ids = get_sibling_show_ids(show_id)
 
         # Determine who was removed and who was added
         if old_ids is None:
@@ -701,22 +735,14 @@ def handle_update_share_with(data):
         removed = old_visible - new_visible
         added = new_visible - old_visible
 
-        for sid in sibling_ids:
-            if sid in active_users:
-                for fid, info in active_users[sid].items():
-                    if fid in removed:
-                        emit('location_stopped', {
-                            'user_id': user.id,
-                            'username': user.username
-                        }, to=info['sid'])
-                    elif fid in added and checkin.latitude is not None:
-                        emit('location_update', {
-                            'user_id': user.id,
-                            'username': user.username,
-                            'latitude': checkin.latitude,
-                            'longitude': checkin.longitude,
-                            'updated_at': checkin.last_location_update.isoformat() if checkin.last_location_update else None
-                        }, to=info['sid'])
+        # Friends present at the concert, then one emit per audience
+        present = location_audience(user.id, show_id, friend_ids=friend_ids)
+        emit_to_users('location_stopped', location_event(show_id, {
+            'user_id': user.id,
+            'username': user.username
+        }), removed & present)
+        if position:
+            emit_to_users('location_update', location_event(show_id, position), added & present)
 
     except Exception as e:
         db.session.rollback()
@@ -729,34 +755,34 @@ def handle_update_share_with(data):
 @socketio.on('join_dm')
 def handle_join_dm():
     """User opens the messages page — join their personal DM room"""
-    user = get_user_from_token()
+    user = get_session_user()
     if not user:
         emit('error', {'message': 'Unauthorized'})
         return
 
     room = f'dm_user_{user.id}'
     join_room(room)
-    dm_active_users[user.id] = {'sid': request.sid, 'username': user.username}
+    presence.dm_join(user.id, {'sid': request.sid, 'username': user.username})
     print(f"{user.username} joined DM room {room}")
 
 
 @socketio.on('leave_dm')
 def handle_leave_dm():
     """User leaves the messages page"""
-    user = get_user_from_token()
+    user = get_session_user()
     if not user:
         return
 
     room = f'dm_user_{user.id}'
     leave_room(room)
-    dm_active_users.pop(user.id, None)
+    presence.dm_leave(user.id)
     print(f"{user.username} left DM room {room}")
 
 
 @socketio.on('notify_dm')
 def handle_notify_dm(data):
     """Broadcast a new DM to the other user (message already saved via REST)"""
-    user = get_user_from_token()
+    user = get_session_user()
     if not user:
         return
 
@@ -766,46 +792,47 @@ def handle_notify_dm(data):
     if not conversation_id or not message:
         return
 
-    conv = Conversation.query.get(conversation_id)
-    if not conv or user.id not in (conv.user1_id, conv.user2_id):
+    other_id = conversation_members.other(conversation_id, user.id)
+    if other_id is None:
         return
 
-    # Send to the OTHER user's personal room only (sender already has it)
-    other_id = conv.user2_id if user.id == conv.user1_id else conv.user1_id
+    # Send to the OTHER user's personal room only (sender already has it); it also ends
+    # the sender's typing there
+    typing_indicators.message_sent(user.id, f'dm_user_{other_id}')
     emit('new_dm', message, room=f'dm_user_{other_id}')
 
 
 @socketio.on('dm_typing')
 def handle_dm_typing(data):
-    """Forward typing indicator to the other user"""
-    user = get_user_from_token()
+    """Forward typing indicator to the other user (only when typing starts or stops)"""
+    if not typing_indicators.allow(request.sid):
+        return
+
+    user = get_session_user()
     if not user:
         return
 
     conversation_id = data.get('conversation_id')
-    is_typing = data.get('is_typing', False)
+    is_typing = bool(data.get('is_typing', False))
 
     if not conversation_id:
         return
 
-    conv = Conversation.query.get(conversation_id)
-    if not conv or user.id not in (conv.user1_id, conv.user2_id):
+    other_id = conversation_members.other(conversation_id, user.id)
+    if other_id is None:
         return
 
-    other_id = conv.user2_id if user.id == conv.user1_id else conv.user1_id
-
-    emit('dm_user_typing', {
+    typing_indicators.update(user.id, f'dm_user_{other_id}', is_typing, 'dm_user_typing', {
         'conversation_id': conversation_id,
         'user_id': user.id,
         'username': user.username,
-        'is_typing': is_typing,
-    }, room=f'dm_user_{other_id}')
+    }, request.sid)
 
 
 @socketio.on('dm_read')
 def handle_dm_read(data):
     """Mark messages as read and notify sender"""
-    user = get_user_from_token()
+    user = get_session_user()
     if not user:
         return
 
@@ -813,8 +840,8 @@ def handle_dm_read(data):
     if not conversation_id:
         return
 
-    conv = Conversation.query.get(conversation_id)
-    if not conv or user.id not in (conv.user1_id, conv.user2_id):
+    other_id = conversation_members.other(conversation_id, user.id)
+    if other_id is None:
         return
 
     now = datetime.utcnow()
@@ -825,7 +852,6 @@ def handle_dm_read(data):
     ).update({'read_at': now}, synchronize_session='fetch')
     db.session.commit()
 
-    other_id = conv.user2_id if user.id == conv.user1_id else conv.user1_id
     emit('dm_messages_read', {
         'conversation_id': conversation_id,
         'read_by': user.id,
@@ -838,36 +864,27 @@ def handle_dm_read(data):
 @socketio.on('set_appear_offline')
 def handle_set_appear_offline(data):
     """Toggle appear-offline status. Updates DB and broadcasts presence change."""
-    user = get_user_from_token()
+    user = get_session_user()
     if not user:
         emit('error', {'message': 'Unauthorized'})
         return
 
     appear_offline = bool(data.get('appear_offline', False))
-    user.appear_offline = appear_offline
+    User.query.filter_by(id=user.id).update({'appear_offline': appear_offline})
     db.session.commit()
 
     friend_ids = get_friend_ids(user.id)
 
     if appear_offline:
         # Remove all SIDs and tell friends we went offline
-        if user.id in online_users:
-            online_users.pop(user.id, None)
-            for fid in friend_ids:
-                if fid in online_users:
-                    for sid in online_users[fid]:
-                        emit('friend_offline', {
-                            'user_id': user.id,
-                            'username': user.username
-                        }, to=sid)
-                # Hide from friends-going lists
-                for sid in user_sids.get(fid, set()):
-                    emit('friend_hide_from_show', {
-                        'user_id': user.id,
-                        'username': user.username
-                    }, to=sid)
+        if presence.go_offline(user.id):
+            status = {'user_id': user.id, 'username': user.username}
+            emit_to_users('friend_offline', status, online_friends(friend_ids))
+            # Hide from friends-going lists
+            emit_to_users('friend_hide_from_show', status, connected_friends(friend_ids))
 
         # Also stop any active location sharing so friends don't see us in "Friends Here"
+        live_locations.remove_user(user.id)
         active_checkins = ShowCheckin.query.filter_by(
             user_id=user.id,
             is_active=True
@@ -877,35 +894,21 @@ def handle_set_appear_offline(data):
             checkin.latitude = None
             checkin.longitude = None
             checkin.last_location_update = None
-            checkin.share_with = None
+            checkin.set_share_with(None)
             db.session.commit()
 
             # Notify friends in sibling shows that location stopped
-            sibling_ids = get_sibling_show_ids(checkin.show_id)
-            for sid in sibling_ids:
-                if sid in active_users:
-                    for friend_id, info in active_users[sid].items():
-                        if friend_id in friend_ids and (share_ids is None or friend_id in share_ids):
-                            emit('location_stopped', {
-                                'user_id': user.id,
-                                'username': user.username
-                            }, to=info['sid'])
+            emit_to_users('location_stopped', location_event(checkin.show_id, {
+                'user_id': user.id,
+                'username': user.username
+            }), location_audience(user.id, checkin.show_id, share_ids, friend_ids))
     else:
         # Add current SID and tell friends we came online
-        online_users.setdefault(user.id, set()).add(request.sid)
-        for fid in friend_ids:
-            if fid in online_users:
-                for sid in online_users[fid]:
-                    emit('friend_online', {
-                        'user_id': user.id,
-                        'username': user.username
-                    }, to=sid)
-            # Re-show on friends-going lists
-            for sid in user_sids.get(fid, set()):
-                emit('friend_show_at_show', {
-                    'user_id': user.id,
-                    'username': user.username
-                }, to=sid)
+        presence.go_online(user.id, [request.sid])
+        status = {'user_id': user.id, 'username': user.username}
+        emit_to_users('friend_online', status, online_friends(friend_ids))
+        # Re-show on friends-going lists
+        emit_to_users('friend_show_at_show', status, connected_friends(friend_ids))
 
     emit('appear_offline_updated', {'appear_offline': appear_offline})
 
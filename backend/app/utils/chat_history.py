@@ -0,0 +1,227 @@
+"""
+Recent chat history per room, kept in memory and serialized once
+Each show chat room, and each concert-wide room shared by sibling shows, keeps its last
+CHAT_BUFFER_SIZE messages as ready-to-emit dicts. A room is warmed from the database with
+one query the first time it is read; after that, sent messages are appended as they are
+broadcast. Every message carries `seq`, its ChatMessage id: increasing within every room,
+and stable across restarts and workers, so a reconnecting client can send the last seq it
+saw and get only the messages after it. With several workers (SOCKETIO_MESSAGE_QUEUE set)
+reads first pull in messages other workers stored since the room was last read, with one
+query reaching back CATCH_UP_WINDOW (ids are taken before the group commit writes the row,
+so another worker's lower id can land after a higher one here).
+"""
+import bisect
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+from app.models import db, ChatMessage, Show, User
+
+
+CATCH_UP_WINDOW = timedelta(seconds=5)
+
+
+class RoomHistory:
+    """Newest messages of one room; holds every message of the room with seq > floor"""
+    __slots__ = ('messages', 'floor', 'synced_at')
+
+    def __init__(self, messages, floor, capacity, synced_at):
+        self.messages = deque(messages, maxlen=capacity)
+        self.floor = floor
+        self.synced_at = synced_at  # when the room was last read from the database
+
+    def add(self, entry):
+        seq = entry['seq']
+        if seq <= self.floor:
+            return False
+        if not self.messages or seq > self.messages[-1]['seq']:
+            position = len(self.messages)
+        else:
+            # Ids are taken before rows are written, so they can arrive out of order
+            seqs = [message['seq'] for message in self.messages]
+            position = bisect.bisect_left(seqs, seq)
+            if position < len(seqs) and seqs[position] == seq:
+                return False
+        if len(self.messages) == self.messages.maxlen:
+            if position == 0:
+                self.floor = seq  # older than everything kept
+                return False
+            self.floor = self.messages.popleft()['seq']
+            position -= 1
+        self.messages.insert(position, entry)
+        return True
+
+    def discard(self, seq):
+        for message in self.messages:
+            if message['seq'] == seq:
+                self.messages.remove(message)
+                return
+
+    def since(self, seq):
+        return [message for message in self.messages if message['seq'] > seq]
+
+
+def serialize(message_id, show_id, user_id, username, text, created_at):
+    return {
+        'id': message_id,
+        'seq': message_id,
+        'show_id': show_id,
+        'user_id': user_id,
+        'username': username,
+        'message': text,
+        'created_at': created_at.isoformat() if created_at else None
+    }
+
+
+class ChatHistoryBuffer:
+    """Bounded per-room ring buffers of pre-serialized chat messages"""
+
+    def __init__(self, capacity=200, history_limit=50, max_rooms=2000):
+        self.capacity = capacity
+        self.history_limit = history_limit
+        self.max_rooms = max_rooms
+        self.shared = False
+        self._rooms = OrderedDict()  # ('show' | 'concert', id) -> RoomHistory, least recently used first
+        self._warming = {}           # room -> entries recorded while its warm query runs
+        self._lock = threading.RLock()
+        self.warmed = 0
+        self.evicted = 0
+        self.resumed = 0
+        self.resume_misses = 0
+        self.caught_up = 0
+
+    def init_app(self, app):
+        self.capacity = app.config.get('CHAT_BUFFER_SIZE', self.capacity)
+        self.history_limit = min(app.config.get('CHAT_HISTORY_LIMIT', self.history_limit), self.capacity)
+        self.max_rooms = app.config.get('CHAT_BUFFER_MAX_ROOMS', self.max_rooms)
+        self.shared = bool(app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+
+    @staticmethod
+    def room(show_id, concert_id=None):
+        """Buffer key: the concert-wide room when concert_id is given, else the show's room."""
+        return ('concert', concert_id) if concert_id is not None else ('show', show_id)
+
+    def history(self, room, last_seq=None):
+        """Messages for a client joining room: (messages, resumed). With last_seq, only the
+        messages after it if the buffer still covers the gap; otherwise the latest page."""
+        history = self._load(room)
+        with self._lock:
+            if last_seq is not None:
+                if last_seq >= history.floor:
+                    self.resumed += 1
+                    return history.since(last_seq), True
+                self.resume_misses += 1
+            return list(history.messages)[-self.history_limit:], False
+
+    def record(self, message, username, concert_id=None):
+        """Serialize a broadcast message (a chat_writer PendingMessage, possibly not written
+        yet) once and add it to the show's and concert's rooms."""
+        entry = serialize(message.id, message.show_id, message.user_id, username,
+                          message.message, message.created_at)
+        rooms = [self.room(message.show_id)]
+        if concert_id is not None:
+            rooms.append(self.room(message.show_id, concert_id))
+        with self._lock:
+            for room in rooms:
+                if room in self._warming:
+                    self._warming[room].append(entry)
+                elif room in self._rooms:
+                    self._rooms[room].add(entry)
+        return entry
+
+    def discard(self, message_id, show_id, concert_id=None):
+        """Drop a message that was broadcast but could not be stored."""
+        rooms = [self.room(show_id)]
+        if concert_id is not None:
+            rooms.append(self.room(show_id, concert_id))
+        with self._lock:
+            for room in rooms:
+                history = self._rooms.get(room)
+                if history is not None:
+                    history.discard(message_id)
+
+    def clear(self):
+        with self._lock:
+            self._rooms.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rooms': len(self._rooms),
+                'messages': sum(len(history.messages) for history in self._rooms.values()),
+                'capacity': self.capacity,
+                'shared': self.shared,
+                'warmed': self.warmed,
+                'evicted': self.evicted,
+                'resumed': self.resumed,
+                'resume_misses': self.resume_misses,
+                'caught_up': self.caught_up,
+            }
+
+    # ── Internals ──
+
+    def _query(self, room):
+        query = db.session.query(
+            ChatMessage.id, ChatMessage.show_id, ChatMessage.user_id, User.username,
+            ChatMessage.message, ChatMessage.created_at
+        ).join(User, User.id == ChatMessage.user_id)
+        if room[0] == 'concert':
+            return query.join(Show, Show.id == ChatMessage.show_id).filter(Show.concert_id == room[1])
+        return query.filter(ChatMessage.show_id == room[1])
+
+    def _load(self, room):
+        with self._lock:
+            history = self._rooms.get(room)
+            if history is not None:
+                self._rooms.move_to_end(room)
+        if history is None:
+            return self._warm(room)
+        if self.shared:
+            return self._catch_up(room, history)
+        return history
+
+    def _warm(self, room):
+        with self._lock:
+            self._warming.setdefault(room, [])
+        synced_at = datetime.utcnow()
+        try:
+            rows = self._query(room).order_by(ChatMessage.id.desc()).limit(self.capacity).all()
+        except Exception:
+            with self._lock:
+                self._warming.pop(room, None)
+            raise
+        rows.reverse()
+        # A full page may have older messages behind it; a short one is the whole room
+        floor = rows[0][0] - 1 if len(rows) == self.capacity else 0
+        history = RoomHistory([serialize(*row) for row in rows], floor, self.capacity, synced_at)
+        with self._lock:
+            for entry in self._warming.pop(room, ()):
+                history.add(entry)
+            current = self._rooms.get(room)
+            if current is not None:
+                return current
+            self._rooms[room] = history
+            self.warmed += 1
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+                self.evicted += 1
+        return history
+
+    def _catch_up(self, room, history):
+        """Add messages stored by other workers since the room was last read; returns the
+        room's history, rebuilt if it fell a whole buffer behind."""
+        synced_at = datetime.utcnow()
+        rows = self._query(room).filter(ChatMessage.created_at >= history.synced_at - CATCH_UP_WINDOW)\
+            .order_by(ChatMessage.id.desc()).limit(self.capacity).all()
+        if len(rows) == self.capacity:
+            # Fell a whole buffer behind; start over from the newest page
+            with self._lock:
+                self._rooms.pop(room, None)
+            return self._warm(room)
+        with self._lock:
+            for row in reversed(rows):
+                self.caught_up += history.add(serialize(*row))
+            history.synced_at = synced_at
+        return history
+
+chat_history = ChatHistoryBuffer()
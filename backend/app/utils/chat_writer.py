@@ -0,0 +1,194 @@
+"""
+Group commit for show chat messages
+send_message takes an id for the message up front (from the presence registry's counter,
+so ids never repeat across workers) and broadcasts it right away; the row is queued here
+and written with other messages in one batched INSERT after at most CHAT_FLUSH_INTERVAL
+seconds, or sooner once CHAT_FLUSH_MAX_BATCH messages are waiting. Chat latency no longer
+includes the commit, and a burst of messages shares one transaction instead of queueing
+on the database write lock. If a batch fails it is retried row by row; messages that
+still cannot be written are taken out of the history buffer and reported to the room with
+`message_failed`. Queued messages are flushed at exit. CHAT_FLUSH_INTERVAL = 0 writes
+each message before it is broadcast. The REST chat routes store their messages through
+write(), so every chat_messages id comes from the same counter and none collides with a
+queued row.
+"""
+import atexit
+import threading
+from datetime import datetime
+
+from app.models import db, ChatMessage
+from app.utils.presence import presence
+
+
+class PendingMessage:
+    """A chat message that has been broadcast but may not be written yet"""
+    __slots__ = ('id', 'show_id', 'user_id', 'message', 'created_at', 'sid', 'room', 'concert_id')
+
+    def __init__(self, message_id, show_id, user_id, message, created_at, sid, room, concert_id):
+        self.id = message_id
+        self.show_id = show_id
+        self.user_id = user_id
+        self.message = message
+        self.created_at = created_at
+        self.sid = sid
+        self.room = room
+        self.concert_id = concert_id
+
+    def row(self):
+        return {'id': self.id, 'show_id': self.show_id, 'user_id': self.user_id,
+                'message': self.message, 'created_at': self.created_at}
+
+
+class ChatWriter:
+    """Queue of broadcast chat messages written in batches by a background task"""
+
+    def __init__(self, flush_interval=0.01, max_batch=200):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._app = None
+        self._flusher_started = False
+        self.queued = 0
+        self.written = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.retried = 0
+        self.failed = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.flush_interval = app.config.get('CHAT_FLUSH_INTERVAL', self.flush_interval)
+        self.max_batch = app.config.get('CHAT_FLUSH_MAX_BATCH', self.max_batch)
+
+    def submit(self, show_id, user_id, text, sid=None, room=None, concert_id=None):
+        """Assign the message its id and queue it; returns the PendingMessage to broadcast.
+        In write-through mode the row is committed first and errors reach the caller."""
+        if self.flush_interval <= 0:
+            return self.write(show_id, user_id, text, sid, room, concert_id)
+        message = self._pending(show_id, user_id, text, sid, room, concert_id)
+        with self._lock:
+            self._queue.append(message)
+            self.queued += 1
+        self._start_flusher()
+        self._wake.set()
+        return message
+
+    def write(self, show_id, user_id, text, sid=None, room=None, concert_id=None):
+        """Assign the message its id and commit the row now; returns the PendingMessage.
+        Errors reach the caller."""
+        message = self._pending(show_id, user_id, text, sid, room, concert_id)
+        self._write([message.row()])
+        with self._lock:
+            self.written += 1
+        return message
+
+    def flush(self):
+        """Write everything queued so far; returns the number of messages written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._queue = self._queue, []
+            written = 0
+            for start in range(0, len(pending), self.max_batch):
+                written += self._write_batch(pending[start:start + self.max_batch])
+            return written
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._queue)
+        return {
+            'pending': pending,
+            'flush_interval': self.flush_interval,
+            'max_batch': self.max_batch,
+            'queued': self.queued,
+            'written': self.written,
+            'batches': self.batches,
+            'largest_batch': self.largest_batch,
+            'retried': self.retried,
+            'failed': self.failed,
+        }
+
+    # ── Internals ──
+
+    def _pending(self, show_id, user_id, text, sid, room, concert_id):
+        return PendingMessage(
+            presence.next_id('chat_message_id', self._max_id), show_id, user_id, text,
+            datetime.utcnow(), sid, room, concert_id
+        )
+
+    @staticmethod
+    def _max_id():
+        return db.session.query(db.func.max(ChatMessage.id)).scalar() or 0
+
+    @staticmethod
+    def _write(rows):
+        # A separate connection keeps the caller's session and transaction untouched
+        with db.engine.begin() as connection:
+            connection.execute(ChatMessage.__table__.insert(), rows)
+
+    def _write_batch(self, batch):
+        try:
+            self._write([message.row() for message in batch])
+        except Exception as e:
+            print(f"Error writing chat batch of {len(batch)}, retrying one by one: {e}")
+            self.retried += 1
+            return self._write_each(batch)
+        self.batches += 1
+        self.written += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        return len(batch)
+
+    def _write_each(self, batch):
+        written = 0
+        for message in batch:
+            try:
+                self._write([message.row()])
+                written += 1
+            except Exception as e:
+                self.failed += 1
+                self._report_failure(message, e)
+        self.written += written
+        return written
+
+    def _report_failure(self, message, error):
+        """Take a message that could not be stored back out of history and tell the room."""
+        print(f"Error writing chat message {message.id}: {error}")
+        from app import socketio
+        from app.utils.chat_history import chat_history
+        chat_history.discard(message.id, message.show_id, message.concert_id)
+        payload = {'id': message.id, 'show_id': message.show_id, 'user_id': message.user_id,
+                   'error': 'Message could not be saved'}
+        if message.room:
+            socketio.emit('message_failed', payload, to=message.room)
+        elif message.sid:
+            socketio.emit('message_failed', payload, to=message.sid)
+
+    def _start_flusher(self):
+        if self._flusher_started or self._app is None:
+            return
+        self._flusher_started = True
+        from app import socketio
+        socketio.start_background_task(self._run_flusher)
+        atexit.register(self._flush_in_context)
+
+    def _run_flusher(self):
+        from app import socketio
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            # Let the rest of the group arrive unless a full batch is already waiting
+            if len(self._queue) < self.max_batch:
+                socketio.sleep(self.flush_interval)
+            self._flush_in_context()
+
+    def _flush_in_context(self):
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception as e:
+            print(f"Error flushing chat messages: {e}")
+
+
+chat_writer = ChatWriter()
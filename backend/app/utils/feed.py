@@ -0,0 +1,89 @@
+"""
+Fan-out-on-write home feed
+Maintains feed_entries so each viewer's friends feed is a keyset read over their own rows.
+Entries are written when a show is created, rebuilt when its visibility changes, dropped
+when it is deleted, and backfilled/removed when a friendship is accepted/removed.
+All helpers run inside the caller's transaction; the caller commits.
+"""
+from sqlalchemy import insert, literal
+
+from app.models import db, Show, FeedEntry, Friendship, get_friend_ids
+
+
+def fan_out_show(show):
+    """Write a feed entry for every friend of the owner who can see this show.
+    Entries outlive the friendship check, so the audience is read from the database rather
+    than the friend cache, which may be stale on this worker."""
+    viewers = get_friend_ids(show.user_id, cached=False)
+    visible_to = show.get_visible_to_ids()
+    if visible_to is not None:
+        viewers = viewers & visible_to
+    if not viewers:
+        return 0
+    db.session.execute(insert(FeedEntry), [
+        {'viewer_id': viewer_id, 'show_id': show.id, 'owner_id': show.user_id, 'show_date': show.date}
+        for viewer_id in viewers
+    ])
+    return len(viewers)
+
+
+def remove_show(show_id):
+    """Drop every feed entry for a show (show deleted)."""
+    return FeedEntry.query.filter_by(show_id=show_id).delete(synchronize_session=False)
+
+
+def rebuild_show(show):
+    """Re-fan a show after its visibility list changed."""
+    remove_show(show.id)
+    return fan_out_show(show)
+
+
+def backfill_friendship(user_a_id, user_b_id):
+    """Copy each user's visible shows into the other's feed (friendship accepted)."""
+    remove_friendship(user_a_id, user_b_id)
+    added = 0
+    for owner_id, viewer_id in ((user_a_id, user_b_id), (user_b_id, user_a_id)):
+        rows = db.select(
+            literal(viewer_id), Show.id, Show.user_id, Show.date
+        ).where(
+            Show.user_id == owner_id,
+            Show.visible_to_clause(viewer_id)
+        )
+        result = db.session.execute(
+            insert(FeedEntry).from_select(['viewer_id', 'show_id', 'owner_id', 'show_date'], rows)
+        )
+        added += result.rowcount or 0
+    return added
+
+
+def remove_friendship(user_a_id, user_b_id):
+    """Drop each user's shows from the other's feed (friendship removed)."""
+    return FeedEntry.query.filter(
+        db.or_(
+            db.and_(FeedEntry.viewer_id == user_a_id, FeedEntry.owner_id == user_b_id),
+            db.and_(FeedEntry.viewer_id == user_b_id, FeedEntry.owner_id == user_a_id)
+        )
+    ).delete(synchronize_session=False)
+
+
+def rebuild_all():
+    """Rebuild every timeline from accepted friendships in one set-based INSERT.
+    Returns the number of entries written."""
+    FeedEntry.query.delete(synchronize_session=False)
+    accepted = Friendship.status == 'accepted'
+    pairs = db.union(
+        db.select(Friendship.user_id.label('viewer_id'), Friendship.friend_id.label('owner_id')).where(accepted),
+        db.select(Friendship.friend_id.label('viewer_id'), Friendship.user_id.label('owner_id')).where(accepted),
+    ).subquery()
+    rows = db.select(
+        pairs.c.viewer_id, Show.id, Show.user_id, Show.date
+    ).join(
+        Show, Show.user_id == pairs.c.owner_id
+    ).where(
+        Show.visible_to_clause(pairs.c.viewer_id)
+    )
+    result = db.session.execute(
+        insert(FeedEntry).from_select(['viewer_id', 'show_id', 'owner_id', 'show_date'], rows)
+    )
+    db.session.commit()
+    return result.rowcount or 0
@@ -0,0 +1,103 @@
+"""
+In-process friend adjacency cache for get_friend_ids()
+Holds one frozenset of friend IDs per user with LRU eviction and hit/miss counters.
+Entries are invalidated by the friends routes when a friendship changes, and expire
+after a TTL as a backstop for changes made by other worker processes. Loads run outside
+the lock, so each user has a generation that invalidate() bumps; a load only stores its
+result if the generation it started under is still current.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+
+class FriendGraphCache:
+    """Bounded LRU cache of user_id -> frozenset(friend_ids)"""
+
+    def __init__(self, max_users=10000, ttl=300):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (expires_at, frozenset)
+        self._generations = OrderedDict()  # user_id -> generation of the last invalidate
+        self._counter = itertools.count(1)
+        self._dropped_generation = 0  # newest generation pushed out of _generations
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def configure(self, max_users=None, ttl=None):
+        with self._lock:
+            if max_users is not None:
+                self.max_users = max_users
+            if ttl is not None:
+                self.ttl = ttl
+            self._evict_overflow()
+
+    def get(self, user_id, loader):
+        """Return cached friend IDs for user_id, calling loader(user_id) on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation(user_id)
+
+        friend_ids = frozenset(loader(user_id))
+
+        with self._lock:
+            # An invalidate() during the load may have come after the rows were read
+            if self._generation(user_id) == generation:
+                self._entries[user_id] = (now + self.ttl, friend_ids)
+                self._entries.move_to_end(user_id)
+                self._evict_overflow()
+        return friend_ids
+
+    def invalidate(self, *user_ids):
+        """Drop cached entries for the given users (both sides of a friendship change)."""
+        with self._lock:
+            for user_id in user_ids:
+                self._generations[user_id] = next(self._counter)
+                self._generations.move_to_end(user_id)
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+            self._evict_overflow()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._dropped_generation = next(self._counter)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_users': self.max_users,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def _evict_overflow(self):
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        while len(self._generations) > self.max_users:
+            _, generation = self._generations.popitem(last=False)
+            self._dropped_generation = max(self._dropped_generation, generation)
+
+    def _generation(self, user_id):
+        # Users whose generation was dropped report a newer one, so a load they raced skips its store
+        return self._generations.get(user_id, self._dropped_generation)
+
+
+friend_cache = FriendGraphCache()
@@ -0,0 +1,434 @@
+"""
+Write-behind store for live show locations
+GPS pings update one in-memory entry per (concert, user) and presence reads are served
+from memory. Dirty positions reach show_checkins in one batched UPDATE every
+LIVE_LOCATION_FLUSH_INTERVAL seconds, so the database is never more than that interval
+behind: a ping flushes inline if the oldest unflushed position has reached the bound or
+LIVE_LOCATION_MAX_PENDING positions are waiting. The first position of a sharing session
+is written through, so a non-null show_checkins.latitude still means "sharing" and the
+stop/appear-offline paths can keep clearing rows with one query. Entries are per
+process, so a concert is re-read from the database once its entries are older than the
+flush interval, which picks up positions other workers have flushed while keeping this
+worker's own unflushed or newer ones. Which concert a show belongs to is re-read on the
+same schedule (at once on the worker that moves it), and a moved show's entries follow it
+to its new concert. A concert nobody shares a position at is dropped from memory along
+with its shows.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, select
+
+from app.models import db, Show, ShowCheckin, CheckinShare, User
+
+
+class LiveLocation:
+    """Last known position of one user at one concert"""
+    __slots__ = ('checkin_id', 'show_id', 'user_id', 'username', 'latitude', 'longitude',
+                 'updated_at', 'share_ids', 'persisted')
+
+    def __init__(self, checkin_id, show_id, user_id, username, latitude, longitude,
+                 updated_at, share_ids, persisted):
+        self.checkin_id = checkin_id
+        self.show_id = show_id
+        self.user_id = user_id
+        self.username = username
+        self.latitude = latitude
+        self.longitude = longitude
+        self.updated_at = updated_at
+        self.share_ids = share_ids  # None = all friends
+        self.persisted = persisted
+
+    def refresh(self, other):
+        """Take the values of a newer entry for the same user, keeping this object (callers may hold it)."""
+        for name in self.__slots__:
+            setattr(self, name, getattr(other, name))
+
+    def visible_to(self, viewer_id):
+        return self.share_ids is None or viewer_id in self.share_ids
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'username': self.username,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+_FLUSH_STATEMENT = ShowCheckin.__table__.update().where(
+    ShowCheckin.id == bindparam('checkin_id'),
+    ShowCheckin.is_active == True
+).values(
+    latitude=bindparam('lat'),
+    longitude=bindparam('lng'),
+    last_location_update=bindparam('ts')
+)
+
+
+class LiveLocationStore:
+    """In-memory positions with batched, bounded-staleness persistence"""
+
+    def __init__(self, flush_interval=5.0, max_pending=1000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._entries = {}      # scope -> {user_id: LiveLocation}
+        self._show_scopes = {}  # show_id -> (scope, monotonic time resolved)
+        self._loaded = {}       # scope -> monotonic time last read from the database
+        self._dirty = {}        # (scope, user_id) -> monotonic time first dirtied, oldest first
+        self._moved = set()     # shows to re-resolve before the next lookup
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._app = None
+        self._flusher_started = False
+        self.updates = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.inline_flushes = 0
+        self.concerts_loaded = 0
+        self.evicted = 0
+        self.cleared = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.flush_interval = app.config.get('LIVE_LOCATION_FLUSH_INTERVAL', self.flush_interval)
+        self.max_pending = app.config.get('LIVE_LOCATION_MAX_PENDING', self.max_pending)
+
+    # ── Reads ──
+
+    def locations(self, show_id):
+        """Positions shared at the concert of show_id (any sibling show)."""
+        scope = self._scope(show_id)
+        if scope is None:
+            return []
+        self._ensure_loaded(scope)
+        with self._lock:
+            return [loc for loc in self._entries.get(scope, {}).values() if loc.latitude is not None]
+
+    def get(self, show_id, user_id):
+        """The user's entry at the concert of show_id, or None."""
+        scope = self._scope(show_id)
+        if scope is None:
+            return None
+        self._ensure_loaded(scope)
+        with self._lock:
+            return self._entries.get(scope, {}).get(user_id)
+
+    # ── Writes ──
+
+    def track(self, checkin, username=None):
+        """Start tracking an active checkin; its first move() is written through."""
+        scope = self._scope(checkin.show_id)
+        self._ensure_loaded(scope)
+        location = LiveLocation(
+            checkin.id, checkin.show_id, checkin.user_id,
+            username or (checkin.user.username if checkin.user else None),
+            None, None, None, checkin.get_share_with_ids(), persisted=False
+        )
+        with self._lock:
+            self._entries.setdefault(scope, {})[checkin.user_id] = location
+            self._dirty.pop((scope, checkin.user_id), None)
+        return location
+
+    def move(self, location, latitude, longitude):
+        """Record a GPS ping. Persisted later unless it is the first or staleness is due."""
+        scope = self._scope(location.show_id)
+        key = (scope, location.user_id)
+        now = time.monotonic()
+        with self._lock:
+            location.latitude = latitude
+            location.longitude = longitude
+            location.updated_at = datetime.utcnow()
+            self.updates += 1
+            if not location.persisted:
+                write_through = True
+            else:
+                write_through = False
+                if key in self._dirty:
+                    self.coalesced += 1
+                else:
+                    self._dirty[key] = now
+            due = self._dirty and (
+                self.flush_interval <= 0
+                or len(self._dirty) >= self.max_pending
+                or now - next(iter(self._dirty.values())) >= self.flush_interval
+            )
+
+        if write_through:
+            self._write([self._row(location)])
+            location.persisted = True
+        if due:
+            self.inline_flushes += 1
+            self.flush()
+        elif self.flush_interval > 0:
+            self._start_flusher()
+        return location
+
+    def set_share(self, show_id, user_id, share_ids):
+        """Mirror a committed share_with change onto the cached entry."""
+        location = self.get(show_id, user_id)
+        if location is not None and location.show_id == show_id:
+            location.share_ids = share_ids
+
+    def show_moved(self, show_id):
+        """Re-resolve show_id's concert before the next lookup (it is moving to another
+        concert), so its entries leave the old one even if only a sibling show is read."""
+        with self._lock:
+            cached = self._show_scopes.get(show_id)
+            if cached is not None:
+                self._show_scopes[show_id] = (cached[0], float('-inf'))
+                self._moved.add(show_id)
+
+    def remove(self, show_id, user_id):
+        """Stop tracking the user's position for show_id; returns the dropped entry.
+        Waits for an in-flight flush so it cannot rewrite a position the caller clears."""
+        scope = self._scope(show_id)
+        if scope is None:
+            return None
+        with self._flush_lock, self._lock:
+            location = self._entries.get(scope, {}).get(user_id)
+            if location is None or location.show_id != show_id:
+                return None
+            del self._entries[scope][user_id]
+            self._dirty.pop((scope, user_id), None)
+            self._evict(scope)
+            return location
+
+    def remove_user(self, user_id):
+        """Stop tracking the user at every concert; returns the dropped entries."""
+        removed = []
+        with self._flush_lock, self._lock:
+            for scope, users in list(self._entries.items()):
+                location = users.pop(user_id, None)
+                if location is not None:
+                    self._dirty.pop((scope, user_id), None)
+                    self._evict(scope)
+                    removed.append(location)
+        return removed
+
+    def stop_sharing(self, user_id, show_ids):
+        """Drop the user's positions at show_ids and clear them in the database with one
+        UPDATE (plus one DELETE of share rows if any were restricted); returns the dropped
+        entries. Every joined show's concert is loaded, so a checkin still holding a
+        position always has an entry here and nothing is cleared when none was dropped."""
+        removed = [loc for loc in (self.remove(show_id, user_id) for show_id in show_ids)
+                   if loc is not None]
+        if not removed:
+            return removed
+        checkins = ShowCheckin.__table__
+        sharing = (
+            checkins.c.user_id == user_id,
+            checkins.c.show_id.in_(list(show_ids)),
+            checkins.c.is_active == True,
+            checkins.c.latitude.isnot(None)
+        )
+        with db.engine.begin() as connection:
+            if any(loc.share_ids is not None for loc in removed):
+                connection.execute(CheckinShare.__table__.delete().where(
+                    CheckinShare.checkin_id.in_(select(checkins.c.id).where(*sharing))
+                ))
+            connection.execute(checkins.update().where(*sharing).values(
+                latitude=None, longitude=None, last_location_update=None, share_restricted=False
+            ))
+        self.cleared += len(removed)
+        return removed
+
+    def flush(self):
+        """Write every dirty position in one batched UPDATE; returns the number of rows."""
+        with self._flush_lock:
+            with self._lock:
+                batch = dict(self._dirty)
+                rows = []
+                for scope, user_id in batch:
+                    location = self._entries.get(scope, {}).get(user_id)
+                    if location is not None:
+                        rows.append(self._row(location))
+                self._dirty.clear()
+            if rows:
+                try:
+                    self._write(rows)
+                except Exception:
+                    # Keep the positions dirty so the next flush retries them
+                    with self._lock:
+                        self._dirty = {**batch, **self._dirty}
+                    raise
+                self.flushes += 1
+            return len(rows)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._show_scopes.clear()
+            self._moved.clear()
+            self._loaded.clear()
+            self._dirty.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'concerts': len(self._entries),
+                'shows': len(self._show_scopes),
+                'tracked': sum(len(users) for users in self._entries.values()),
+                'pending': len(self._dirty),
+                'flush_interval': self.flush_interval,
+                'updates': self.updates,
+                'coalesced': self.coalesced,
+                'flushed': self.flushed,
+                'flushes': self.flushes,
+                'inline_flushes': self.inline_flushes,
+                'concerts_loaded': self.concerts_loaded,
+                'evicted': self.evicted,
+                'cleared': self.cleared,
+            }
+
+    # ── Internals ──
+
+    @staticmethod
+    def _row(location):
+        return {'checkin_id': location.checkin_id, 'lat': location.latitude,
+                'lng': location.longitude, 'ts': location.updated_at}
+
+    def _write(self, rows):
+        # A separate connection keeps the caller's session and transaction untouched
+        with db.engine.begin() as connection:
+            connection.execute(_FLUSH_STATEMENT, rows)
+        self.flushed += len(rows)
+
+    def _scope(self, show_id):
+        """Concert a show belongs to; shows without one are their own scope. Re-read once
+        the cached answer is older than the flush interval or the show has moved."""
+        if self._moved:
+            with self._lock:
+                moved, self._moved = self._moved, set()
+            for moved_id in moved - {show_id}:
+                self._scope(moved_id)
+        now = time.monotonic()
+        cached = self._show_scopes.get(show_id)
+        if cached is not None and now - cached[1] < self.flush_interval:
+            return cached[0]
+        concert_id = db.session.query(Show.concert_id).filter(Show.id == show_id).first()
+        if concert_id is None:
+            return None
+        scope = ('concert', concert_id[0]) if concert_id[0] is not None else ('show', show_id)
+        with self._lock:
+            if cached is not None and cached[0] != scope:
+                self._move_entries(show_id, cached[0], scope)
+            self._show_scopes[show_id] = (scope, now)
+        return scope
+
+    def _move_entries(self, show_id, old, new):
+        """Carry the entries of a show that changed concerts over (caller holds _lock)."""
+        users = self._entries.get(old, {})
+        for user_id, location in list(users.items()):
+            if location.show_id != show_id:
+                continue
+            del users[user_id]
+            dirtied_at = self._dirty.pop((old, user_id), None)
+            current = self._entries.get(new, {}).get(user_id)
+            if current is not None and current.updated_at and location.updated_at \
+                    and current.updated_at > location.updated_at:
+                continue  # a newer position from a sibling show of the new concert
+            self._entries.setdefault(new, {})[user_id] = location
+            if dirtied_at is not None:
+                self._dirty[(new, user_id)] = dirtied_at
+        self._evict(old)
+
+    def _evict(self, scope):
+        """Forget a concert without entries and its shows (caller holds _lock)."""
+        if self._entries.get(scope):
+            return
+        if self._entries.pop(scope, None) is not None:
+            self.evicted += 1
+        self._loaded.pop(scope, None)
+        for show_id in [show_id for show_id, (mapped, _) in self._show_scopes.items() if mapped == scope]:
+            del self._show_scopes[show_id]
+
+    def _ensure_loaded(self, scope):
+        """Read the concert's sharers unless this worker did so within the flush interval."""
+        now = time.monotonic()
+        with self._lock:
+            loaded_at = self._loaded.get(scope)
+            if loaded_at is not None and now - loaded_at < self.flush_interval:
+                return
+        # Plain columns, not entities: a checkin already in the session's identity map
+        # would otherwise come back with the values it was loaded with
+        query = db.session.query(
+            ShowCheckin.id, ShowCheckin.show_id, ShowCheckin.user_id, ShowCheckin.latitude,
+            ShowCheckin.longitude, ShowCheckin.last_location_update, ShowCheckin.checked_in_at,
+            ShowCheckin.share_restricted, User.username
+        ).join(
+            User, User.id == ShowCheckin.user_id
+        ).filter(
+            ShowCheckin.is_active == True,
+            ShowCheckin.latitude.isnot(None),
+            ShowCheckin.longitude.isnot(None)
+        )
+        if scope[0] == 'concert':
+            query = query.join(Show, ShowCheckin.show_id == Show.id).filter(Show.concert_id == scope[1])
+        else:
+            query = query.filter(ShowCheckin.show_id == scope[1])
+        rows = query.all()
+
+        restricted = [row.id for row in rows if row.share_restricted]
+        shares = {}
+        if restricted:
+            for checkin_id, user_id in db.session.query(CheckinShare.checkin_id, CheckinShare.user_id)\
+                    .filter(CheckinShare.checkin_id.in_(restricted)):
+                shares.setdefault(checkin_id, set()).add(user_id)
+
+        users = {}
+        for row in rows:
+            updated_at = row.last_location_update or row.checked_in_at
+            current = users.get(row.user_id)
+            if current is not None and current.updated_at and updated_at and current.updated_at >= updated_at:
+                continue
+            users[row.user_id] = LiveLocation(
+                row.id, row.show_id, row.user_id, row.username,
+                row.latitude, row.longitude, updated_at,
+                frozenset(shares.get(row.id, ())) if row.share_restricted else None,
+                persisted=True
+            )
+        with self._lock:
+            # Positions this worker has not flushed yet, or that are newer than the row
+            # (a flush in flight), win; other tracked entries take the database's values
+            for user_id, location in self._entries.get(scope, {}).items():
+                stored = users.get(user_id)
+                if (scope, user_id) in self._dirty or not location.persisted or (
+                        stored is not None and location.updated_at and stored.updated_at
+                        and location.updated_at >= stored.updated_at):
+                    users[user_id] = location
+                elif stored is not None:
+                    location.refresh(stored)
+                    users[user_id] = location
+            self._entries[scope] = users
+            self._loaded[scope] = now
+            self.concerts_loaded += 1
+            self._evict(scope)
+
+    def _start_flusher(self):
+        if self._flusher_started or self._app is None:
+            return
+        self._flusher_started = True
+        from app import socketio
+        socketio.start_background_task(self._run_flusher)
+        atexit.register(self._flush_in_context)
+
+    def _run_flusher(self):
+        from app import socketio
+        while True:
+            socketio.sleep(self.flush_interval)
+            self._flush_in_context()
+
+    def _flush_in_context(self):
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception as e:
+            print(f"Error flushing live locations: {e}")
+
+
+live_locations = LiveLocationStore()
@@ -0,0 +1,222 @@
+"""
+Serving stored media files with validators and a cache policy
+Uploaded files are never rewritten under the same name, so a file's name, size and
+mtime identify its bytes: every response carries a strong ETag built from them and a
+Last-Modified, and a matching If-None-Match (or If-Modified-Since) gets 304 without
+touching the file. Each route picks a cache policy: 'immutable' for the resized photo
+copies (named after the upload and width, so a year with `immutable`), 'public' and
+'private' for MEDIA_MAX_AGE seconds (private for media behind a login), and 'no-cache'
+for a stand-in served until the real derivative exists.
+
+With MEDIA_ACCEL the bytes are handed to the front server instead of a Python worker:
+'x-accel-redirect' (nginx) sends `X-Accel-Redirect: MEDIA_ACCEL_PREFIX/<absolute path>`,
+to be matched by an internal location such as
+
+    location /_media/ { internal; alias /; }
+
+and 'x-sendfile' (Apache, lighttpd) sends the absolute path in `X-Sendfile`. Permission
+checks still happen here first; the front server only reads the file.
+
+Otherwise files are streamed from here with `Accept-Ranges: bytes`, so a player seeking
+into a long video asks for the part it needs and gets `206 Partial Content`. A range is
+cut to MEDIA_RANGE_CHUNK bytes (players ask again for the rest), a request for several
+ranges at once gets 416, and the bytes go out MEDIA_STREAM_BLOCK at a time, so a stream
+holds one block however large the file. Servers that offer `wsgi.file_wrapper` (gunicorn)
+are handed the open file positioned at the range, which they send with sendfile(2);
+eventlet's server never exposes its socket to the app, so there it is read in blocks.
+"""
+import os
+import threading
+import zlib
+
+from flask import request, Response
+
+MIMETYPES = {
+    'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'gif': 'image/gif',
+    'webp': 'image/webp', 'avif': 'image/avif',
+    'mp4': 'video/mp4', 'mov': 'video/quicktime', 'avi': 'video/x-msvideo', 'mkv': 'video/x-matroska',
+    'webm': 'video/webm', 'flv': 'video/x-flv',
+    'mp3': 'audio/mpeg', 'wav': 'audio/wav', 'ogg': 'audio/ogg', 'm4a': 'audio/mp4',
+    'flac': 'audio/flac', 'aac': 'audio/aac',
+}
+ONE_YEAR = 31536000
+
+
+class FileRange:
+    """Response body yielding bytes [start, start + length) of an open file, a block at a time"""
+
+    def __init__(self, file, start, length, block_size):
+        self.file = file
+        self.start = start
+        self.remaining = length
+        self.block_size = block_size
+
+    def __iter__(self):
+        self.file.seek(self.start)
+        while self.remaining > 0:
+            data = self.file.read(min(self.block_size, self.remaining))
+            if not data:
+                break
+            self.remaining -= len(data)
+            yield data
+
+    def close(self):
+        self.file.close()
+
+
+def mimetype_for(filename, default='application/octet-stream'):
+    """Content type from a stored file's extension."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return MIMETYPES.get(extension, default)
+
+
+def file_etag(path, stat):
+    return '%x-%x-%08x' % (stat.st_size, stat.st_mtime_ns, zlib.adler32(os.path.basename(path).encode()))
+
+
+class MediaFiles:
+    """Conditional, cacheable file responses, optionally offloaded to the front server"""
+
+    def __init__(self, max_age=86400, accel=None, accel_prefix='/_media', range_chunk=8 << 20, block_size=64 << 10):
+        self.max_age = max_age
+        self.accel = accel
+        self.accel_prefix = accel_prefix
+        self.range_chunk = range_chunk
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self.served = 0
+        self.not_modified = 0
+        self.accelerated = 0
+        self.missing = 0
+        self.partial = 0
+        self.unsatisfiable = 0
+
+    def init_app(self, app):
+        self.max_age = app.config.get('MEDIA_MAX_AGE', self.max_age)
+        self.accel = app.config.get('MEDIA_ACCEL') or None
+        self.accel_prefix = app.config.get('MEDIA_ACCEL_PREFIX', self.accel_prefix).rstrip('/')
+        self.range_chunk = app.config.get('MEDIA_RANGE_CHUNK', self.range_chunk)
+        self.block_size = app.config.get('MEDIA_STREAM_BLOCK', self.block_size)
+
+    def serve(self, path, mimetype, cache='public'):
+        """Response for a stored file under a cache policy ('immutable', 'public', 'private'
+        or 'no-cache'), or None if the file is gone so the route can report its own 404."""
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                self.missing += 1
+            return None
+        etag = file_etag(path, stat)
+
+        if self._is_fresh(etag, stat):
+            response = Response(status=304)
+            with self._lock:
+                self.not_modified += 1
+        elif self.accel:
+            response = Response(mimetype=mimetype)
+            if self.accel == 'x-sendfile':
+                response.headers['X-Sendfile'] = path
+            else:
+                response.headers['X-Accel-Redirect'] = self.accel_prefix + path
+            with self._lock:
+                self.accelerated += 1
+        else:
+            response = self._stream(path, stat, mimetype, etag)
+
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime
+        self._set_cache_control(response, cache)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                'accel': self.accel,
+                'max_age': self.max_age,
+                'served': self.served,
+                'not_modified': self.not_modified,
+                'accelerated': self.accelerated,
+                'missing': self.missing,
+                'partial': self.partial,
+                'unsatisfiable': self.unsatisfiable,
+                'range_chunk': self.range_chunk,
+            }
+
+    # ── Internals ──
+
+    @staticmethod
+    def _is_fresh(etag, stat):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(etag)
+        if request.if_modified_since:
+            return int(stat.st_mtime) <= request.if_modified_since.timestamp()
+        return False
+
+    @staticmethod
+    def _range_applies(etag, stat):
+        """False when If-Range names a different version of the file: send all of it."""
+        if_range = request.if_range
+        if if_range.etag is not None:
+            return if_range.etag == etag
+        if if_range.date is not None:
+            return int(stat.st_mtime) <= if_range.date.timestamp()
+        return True
+
+    def _stream(self, path, stat, mimetype, etag):
+        size = stat.st_size
+        start, length, status = 0, size, 200
+        if 'Range' in request.headers and self._range_applies(etag, stat):
+            requested = request.range  # None when malformed, which is ignored like no Range at all
+            if requested is not None:
+                bounds = requested.range_for_length(size) if len(requested.ranges) == 1 else None
+                if bounds is None:
+                    # Unsatisfiable, or several ranges (which would need a multipart body)
+                    with self._lock:
+                        self.unsatisfiable += 1
+                    response = Response(status=416)
+                    response.headers['Content-Range'] = f'bytes */{size}'
+                    response.accept_ranges = 'bytes'
+                    return response
+                start, stop = bounds[0], min(bounds[1], bounds[0] + self.range_chunk)
+                length, status = stop - start, 206
+
+        file = open(path, 'rb')
+        file_wrapper = request.environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None and start + length == size:
+            # The server sends from the current offset to the end of the file
+            file.seek(start)
+            body = file_wrapper(file, self.block_size)
+        else:
+            body = FileRange(file, start, length, self.block_size)
+        response = Response(body, status=status, mimetype=mimetype, direct_passthrough=True)
+        response.content_length = length
+        response.accept_ranges = 'bytes'
+        if status == 206:
+            response.headers['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+        with self._lock:
+            self.served += 1
+            self.partial += status == 206
+        return response
+
+    def _set_cache_control(self, response, cache):
+        cache_control = response.cache_control
+        cache_control.no_cache = None
+        if cache == 'immutable':
+            cache_control.public = True
+            cache_control.max_age = ONE_YEAR
+            cache_control.immutable = True
+        elif cache == 'private':
+            cache_control.private = True
+            cache_control.max_age = self.max_age
+        elif cache == 'no-cache':
+            cache_control.no_cache = True
+        else:
+            cache_control.public = True
+            cache_control.max_age = self.max_age
+
+
+media_files = MediaFiles()
@@ -0,0 +1,306 @@
+"""
+Photo derivatives rendered off the event loop
+Uploads store the original, commit the Photo with processing_status='pending' and return.
+Resizing a phone photo is CPU work that would stall the eventlet hub (and every socket on
+it), so derivatives are rendered by a ProcessPoolExecutor of MEDIA_WORKERS processes; a
+green thread per job waits for the result, retries failures up to MEDIA_MAX_ATTEMPTS
+times with a doubling delay, records 'ready' or 'failed' on the photo and emits
+`photo_processed` to the show's room and the uploader. Workers are spawned (not forked)
+so they start clean instead of inheriting the server's hub and database connections.
+MEDIA_WORKERS = 0 renders inside the request, as before. Jobs still pending when the
+server stops are picked up again by `flask process-photos`.
+
+Each photo gets the 300px thumbnail plus a ladder of MEDIA_WIDTHS-wide WebP variants
+(and AVIF when this Pillow build can write it), recorded on Photo.variants. Variant files
+are named after the upload's unique filename and width, so they never change once written.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.models import db, Photo
+
+UPLOAD_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+PHOTO_DIR = os.path.join(UPLOAD_ROOT, 'photos')
+THUMBNAIL_DIR = os.path.join(UPLOAD_ROOT, 'thumbnails')
+VARIANT_DIR = os.path.join(UPLOAD_ROOT, 'variants')
+THUMBNAIL_SIZE = (300, 300)
+VARIANT_MIMETYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+
+
+def variant_formats(avif=True):
+    """Formats the variant ladder is written in: WebP, plus AVIF if this Pillow build has an encoder."""
+    from PIL import Image
+    Image.init()
+    return ['webp'] + (['avif'] if avif and 'AVIF' in Image.SAVE else [])
+
+
+def render_derivatives(source_path, thumbnail_path, widths=(160, 480, 1080, 2048), quality=80, avif=True):
+    """Write the thumbnail and the variant ladder of an image. Runs in a worker process.
+    Returns the thumbnail filename and the variants as [{w, h, format, file, bytes}]."""
+    from PIL import Image, ImageOps
+    formats = variant_formats(avif)
+    os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+    os.makedirs(VARIANT_DIR, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+
+    with Image.open(source_path) as source:
+        # Let the JPEG decoder downscale by a power of two when even the largest step is smaller
+        source.draft('RGB', (max(widths), max(widths)))
+        img = ImageOps.exif_transpose(source)  # phones store rotation as EXIF, which re-encoding drops
+        width, height = img.size
+
+        thumbnail = img.copy()
+        thumbnail.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        if thumbnail_path.lower().endswith(('.jpg', '.jpeg')) and thumbnail.mode not in ('RGB', 'L'):
+            thumbnail = thumbnail.convert('RGB')
+        thumbnail.save(thumbnail_path)
+
+        # Never upscale; a photo narrower than the top step gets one variant at its own width
+        steps = sorted({w for w in widths if w < width} | ({width} if width < max(widths) else set()),
+                       reverse=True)
+        current = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        variants = []
+        for step in steps:
+            # Each step is resized from the one above it rather than from the full original
+            current = current.resize((step, max(1, round(height * step / width))), Image.Resampling.LANCZOS,
+                                     reducing_gap=3.0)
+            for fmt in formats:
+                filename = f'{stem}_{step}.{fmt}'
+                path = os.path.join(VARIANT_DIR, filename)
+                current.save(path, fmt.upper(), quality=quality)
+                variants.append({'w': step, 'h': current.height, 'format': fmt, 'file': filename,
+                                 'bytes': os.path.getsize(path)})
+    variants.sort(key=lambda v: (v['format'], v['w']))
+    return {'thumbnail': os.path.basename(thumbnail_path), 'variants': variants}
+
+
+def choose_variant(variants, width=None, fmt=None, accept=None):
+    """The variant to serve for ?w=&format=: the narrowest one at least `width` wide (else
+    the widest) in the requested format, falling back to WebP. Without a format the
+    browser's Accept header decides; None means serve the original."""
+    if fmt == 'original' or not variants:
+        return None
+    if fmt in VARIANT_MIMETYPES:
+        preferred = [fmt, 'webp']
+    elif accept is not None:
+        # Only formats the browser names itself; */* also covers clients that cannot decode them
+        named = dict(accept)
+        preferred = [f for f in ('avif', 'webp') if named.get(VARIANT_MIMETYPES[f], 0) > 0]
+    else:
+        preferred = ['webp']
+    for f in preferred:
+        ladder = [v for v in variants if v['format'] == f]
+        if ladder:
+            if width is None:
+                return ladder[-1]
+            return next((v for v in ladder if v['w'] >= width), ladder[-1])
+    return None
+
+
+def variant_path(variant):
+    return os.path.join(VARIANT_DIR, variant['file'])
+
+
+class PhotoJob:
+    """Derivatives still to be rendered for one uploaded photo"""
+    __slots__ = ('photo_id', 'show_id', 'user_id', 'filename', 'attempts')
+
+    def __init__(self, photo_id, show_id, user_id, filename):
+        self.photo_id = photo_id
+        self.show_id = show_id
+        self.user_id = user_id
+        self.filename = filename
+        self.attempts = 0
+
+    @property
+    def source_path(self):
+        return os.path.join(PHOTO_DIR, self.filename)
+
+    @property
+    def thumbnail_path(self):
+        return os.path.join(THUMBNAIL_DIR, f'thumb_{self.filename}')
+
+
+class MediaPipeline:
+    """Bounded process pool rendering photo derivatives, with retries and a ready event"""
+
+    def __init__(self, workers=2, max_attempts=3, retry_delay=2.0, job_timeout=120,
+                 widths=(160, 480, 1080, 2048), quality=80, avif=True):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.job_timeout = job_timeout
+        self.widths = tuple(widths)
+        self.quality = quality
+        self.avif = avif
+        self._pool = None
+        self._lock = threading.Lock()
+        self._app = None
+        self.running = 0
+        self.queued = 0
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self.pool_restarts = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.workers = app.config.get('MEDIA_WORKERS', self.workers)
+        self.max_attempts = app.config.get('MEDIA_MAX_ATTEMPTS', self.max_attempts)
+        self.retry_delay = app.config.get('MEDIA_RETRY_DELAY', self.retry_delay)
+        self.job_timeout = app.config.get('MEDIA_JOB_TIMEOUT', self.job_timeout)
+        self.widths = tuple(app.config.get('MEDIA_WIDTHS', self.widths))
+        self.quality = app.config.get('MEDIA_QUALITY', self.quality)
+        self.avif = app.config.get('MEDIA_AVIF', self.avif)
+
+    def enqueue(self, photo):
+        """Render a committed photo's derivatives in the background (inline when
+        MEDIA_WORKERS is 0, in which case the photo is updated and committed here)."""
+        job = PhotoJob(photo.id, photo.show_id, photo.user_id, photo.filename)
+        if self.workers <= 0 or self._app is None:
+            self._process_inline(job)
+            return
+        with self._lock:
+            self.queued += 1
+            self.running += 1
+        from app import socketio
+        socketio.start_background_task(self._run, job)
+
+    def process_pending(self, include_failed=True, missing_variants=False):
+        """Render, in this process, every photo a stopped server left unprocessed (and,
+        with missing_variants, photos uploaded before the variant ladder existed)."""
+        statuses = ['pending', 'processing'] + (['failed'] if include_failed else [])
+        condition = Photo.processing_status.in_(statuses)
+        if missing_variants:
+            condition = db.or_(condition, db.and_(Photo.processing_status == 'ready', Photo.variants.is_(None)))
+        photos = Photo.query.filter(condition).all()
+        for photo in photos:
+            self._process_inline(PhotoJob(photo.id, photo.show_id, photo.user_id, photo.filename))
+        return len(photos)
+
+    def shutdown(self):
+        """Stop the worker processes. Call before the server's main function returns: under
+        eventlet the executor's own exit hook cannot join them once shutdown has begun."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'pool_started': self._pool is not None,
+                'running': self.running,
+                'queued': self.queued,
+                'processed': self.processed,
+                'retried': self.retried,
+                'failed': self.failed,
+                'pool_restarts': self.pool_restarts,
+                'max_attempts': self.max_attempts,
+                'widths': list(self.widths),
+                'formats': variant_formats(self.avif),
+            }
+
+    # ── Internals ──
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _discard_pool(self, pool):
+        """Replace a pool whose worker died; the next job starts a fresh one."""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self.pool_restarts += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job):
+        from app import socketio
+        try:
+            with self._app.app_context():
+                self._set_status(job, 'processing')
+            while True:
+                job.attempts += 1
+                pool = self._get_pool()
+                try:
+                    result = pool.submit(render_derivatives, job.source_path, job.thumbnail_path,
+                                         self.widths, self.quality, self.avif).result(timeout=self.job_timeout)
+                    error = None
+                except BrokenProcessPool as e:
+                    self._discard_pool(pool)
+                    result, error = None, e
+                except Exception as e:
+                    result, error = None, e
+                if error is None:
+                    break
+                if job.attempts >= self.max_attempts or not os.path.exists(job.source_path):
+                    break
+                print(f"Photo {job.photo_id} processing failed (attempt {job.attempts}), retrying: {error}")
+                self.retried += 1
+                socketio.sleep(self.retry_delay * 2 ** (job.attempts - 1))
+            with self._app.app_context():
+                self._finish(job, result, error)
+        except Exception as e:
+            print(f"Error processing photo {job.photo_id}: {e}")
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _process_inline(self, job):
+        job.attempts = 1
+        try:
+            result = render_derivatives(job.source_path, job.thumbnail_path, self.widths, self.quality, self.avif)
+            error = None
+        except Exception as e:
+            result, error = None, e
+        self._finish(job, result, error, notify=False)
+
+    def _set_status(self, job, status):
+        Photo.query.filter_by(id=job.photo_id).update({'processing_status': status})
+        db.session.commit()
+
+    def _finish(self, job, result, error, notify=True):
+        """Record the outcome on the photo and tell the room."""
+        photo = db.session.get(Photo, job.photo_id)
+        if photo is None:
+            # Deleted while it was being processed
+            if result:
+                remove_derivatives(result['thumbnail'], result['variants'])
+            return
+        if error is None:
+            photo.thumbnail_filename = result['thumbnail']
+            photo.set_variants(result['variants'])
+            photo.processing_status = 'ready'
+            self.processed += 1
+        else:
+            print(f"Photo {job.photo_id} processing failed after {job.attempts} attempt(s): {error}")
+            photo.processing_status = 'failed'
+            self.failed += 1
+        db.session.commit()
+        if notify:
+            from app import socketio
+            socketio.emit('photo_processed', photo.to_dict(),
+                          to=[f'show_{job.show_id}', f'user_{job.user_id}'])
+
+
+def remove_derivatives(thumbnail_filename, variants):
+    """Delete a photo's thumbnail and variant files, ignoring ones already gone."""
+    paths = [variant_path(v) for v in variants or ()]
+    if thumbnail_filename:
+        paths.append(os.path.join(THUMBNAIL_DIR, thumbnail_filename))
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+media_pipeline = MediaPipeline()
@@ -0,0 +1,669 @@
+"""
+Presence registry for the Socket.IO handlers and the presence-aware REST routes
+Tracks which users are connected or online, who is in each show chat, which users are at
+each concert (through any sibling show) and who has the DM page open. Two implementations:
+
+- MemoryPresence: plain dicts, correct only while a single process serves every socket
+- SharedPresence: the same data in Redis sorted sets and hashes, so every worker behind the
+  load balancer (joined through Flask-SocketIO's message_queue) answers from one view
+
+PRESENCE_URL picks one: memory:// (default), redis://... for SharedPresence, or local://
+for SharedPresence over LocalRedis, an in-process stand-in used by tests. Entries are per
+connection (socket ID): a user is in a show or at a concert while any of their connections,
+on any worker, is. Only the connection's own worker adds or removes them, and it renews
+them with a heartbeat every PRESENCE_SID_TTL / 3 seconds, so a worker that dies without
+disconnecting its sockets stops keeping their users online, in shows or at concerts after
+PRESENCE_SID_TTL. The registry also hands out counters that must not repeat across workers
+(e.g. chat message ids).
+"""
+import fnmatch
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class PresenceRegistry(ABC):
+    """Interface shared by the presence implementations"""
+
+    # ── Connections ──
+
+    @abstractmethod
+    def connect(self, user_id, sid, online):
+        """Register a connection; returns True when it is the user's first online one."""
+
+    @abstractmethod
+    def disconnect(self, user_id, sid):
+        """Drop a connection; returns True when the user has no online connection left."""
+
+    @abstractmethod
+    def go_offline(self, user_id):
+        """Hide every connection of the user (appear offline); returns True if any was online."""
+
+    @abstractmethod
+    def go_online(self, user_id, sids):
+        """Show the given connections again; returns True if the user was offline before."""
+
+    @abstractmethod
+    def sids(self, user_id):
+        """Every connection of the user, including ones appearing offline."""
+
+    @abstractmethod
+    def online_sids(self, user_id):
+        """Connections of the user that are not appearing offline."""
+
+    @abstractmethod
+    def online_ids(self, user_ids):
+        """The users among user_ids with an online connection."""
+
+    @abstractmethod
+    def connected_ids(self, user_ids):
+        """The users among user_ids with any connection."""
+
+    @abstractmethod
+    def heartbeat(self):
+        """Keep the connections this process registered, and their show and concert
+        entries, from expiring."""
+
+    # ── Show chat rooms (one entry per connection) ──
+
+    @abstractmethod
+    def join_show(self, show_id, user_id, member):
+        """Add the connection's member entry (user_id, username, sid) to the show; returns
+        the show's members, one per user."""
+
+    @abstractmethod
+    def leave_show(self, show_id, user_id, sid):
+        """Remove the connection from the show; returns the remaining members, or None while
+        another connection of the user (on any worker) is still in it."""
+
+    @abstractmethod
+    def show_members(self, show_id):
+        """Members of the show's chat."""
+
+    @abstractmethod
+    def show_present(self, show_id, user_ids):
+        """The users among user_ids in the show's chat."""
+
+    # ── Concerts (sibling shows, one entry per connection and show) ──
+
+    @abstractmethod
+    def enter_concert(self, concert_id, user_id, show_id, sid):
+        """Record that the connection is at the concert through show_id."""
+
+    @abstractmethod
+    def leave_concert(self, concert_id, user_id, show_id, sid):
+        """Forget show_id for the connection; returns True when it holds none of the
+        concert's shows any more."""
+
+    @abstractmethod
+    def concert_present(self, concert_id, user_ids):
+        """The users among user_ids at the concert through any sibling show."""
+
+    # ── Direct messages page ──
+
+    @abstractmethod
+    def dm_join(self, user_id, entry):
+        """Mark the DM page open for the user; entry holds their sid and username."""
+
+    @abstractmethod
+    def dm_leave(self, user_id):
+        """Clear the user's DM page entry; returns True if there was one."""
+
+    # ── Counters ──
+
+    @abstractmethod
+    def next_id(self, name, seed):
+        """Next value of a counter shared by the workers; seed() gives the value it starts
+        after the first time it is used (and again after reset())."""
+
+    @abstractmethod
+    def reset(self):
+        """Forget everything (e.g. before the workers start after a deploy)."""
+
+    @abstractmethod
+    def stats(self):
+        """Registry counters for the debug endpoint."""
+
+
+class MemoryPresence(PresenceRegistry):
+    """Single-process registry backed by dicts"""
+
+    def __init__(self):
+        self.reset()
+
+    def connect(self, user_id, sid, online):
+        self._sids.setdefault(user_id, set()).add(sid)
+        if not online:
+            return False
+        first = not self._online.get(user_id)
+        self._online.setdefault(user_id, set()).add(sid)
+        return first
+
+    def disconnect(self, user_id, sid):
+        sids = self._sids.get(user_id)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self._sids[user_id]
+        online = self._online.get(user_id)
+        if online is None or sid not in online:
+            return False
+        online.discard(sid)
+        if online:
+            return False
+        del self._online[user_id]
+        return True
+
+    def go_offline(self, user_id):
+        return bool(self._online.pop(user_id, None))
+
+    def go_online(self, user_id, sids):
+        if not sids:
+            return False
+        was_offline = not self._online.get(user_id)
+        self._online.setdefault(user_id, set()).update(sids)
+        return was_offline
+
+    def sids(self, user_id):
+        return set(self._sids.get(user_id, ()))
+
+    def online_sids(self, user_id):
+        return set(self._online.get(user_id, ()))
+
+    def online_ids(self, user_ids):
+        return [uid for uid in user_ids if self._online.get(uid)]
+
+    def connected_ids(self, user_ids):
+        return [uid for uid in user_ids if uid in self._sids]
+
+    def heartbeat(self):
+        pass  # connections live and die with this process
+
+    def join_show(self, show_id, user_id, member):
+        members = self._shows.setdefault(show_id, {})
+        members[member['sid']] = member
+        return _per_user(members.values())
+
+    def leave_show(self, show_id, user_id, sid):
+        members = self._shows.get(show_id)
+        if not members:
+            return []
+        members.pop(sid, None)
+        if not members:
+            del self._shows[show_id]
+            return []
+        if any(member['user_id'] == user_id for member in members.values()):
+            return None
+        return _per_user(members.values())
+
+    def show_members(self, show_id):
+        return _per_user(self._shows.get(show_id, {}).values())
+
+    def show_present(self, show_id, user_ids):
+        members = self._shows.get(show_id)
+        if not members:
+            return set()
+        return set(user_ids).intersection(member['user_id'] for member in members.values())
+
+    def enter_concert(self, concert_id, user_id, show_id, sid):
+        self._concerts.setdefault(concert_id, {})[(sid, show_id)] = user_id
+
+    def leave_concert(self, concert_id, user_id, show_id, sid):
+        members = self._concerts.get(concert_id)
+        if not members or members.pop((sid, show_id), None) is None:
+            return False
+        if not members:
+            del self._concerts[concert_id]
+            return True
+        return not any(entry_sid == sid for entry_sid, _ in members)
+
+    def concert_present(self, concert_id, user_ids):
+        members = self._concerts.get(concert_id)
+        return set(user_ids).intersection(members.values()) if members else set()
+
+    def dm_join(self, user_id, entry):
+        self._dm[user_id] = entry
+
+    def dm_leave(self, user_id):
+        return self._dm.pop(user_id, None) is not None
+
+    def next_id(self, name, seed):
+        with self._counter_lock:
+            if name not in self._counters:
+                self._counters[name] = seed()
+            self._counters[name] += 1
+            return self._counters[name]
+
+    def reset(self):
+        self._sids = {}      # user_id -> set(sid), every connection
+        self._online = {}    # user_id -> set(sid), connections not appearing offline
+        self._shows = {}     # show_id -> {sid: member}
+        self._concerts = {}  # concert_id -> {(sid, show_id): user_id}
+        self._dm = {}        # user_id -> {'sid': str, 'username': str}
+        self._counters = {}  # name -> last value handed out
+        self._counter_lock = threading.Lock()
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'connected_users': len(self._sids),
+            'online_users': len(self._online),
+            'shows': len(self._shows),
+            'concerts': len(self._concerts),
+            'dm_users': len(self._dm),
+        }
+
+
+class SharedPresence(PresenceRegistry):
+    """Registry kept in Redis (or LocalRedis) so that all workers share it.
+    Multi-key updates run in MULTI pipelines, which keeps first-online and last-offline
+    answers exact when two workers handle the same user at once. A user's connections are
+    sorted sets scored by expiry time, and show and concert entries (hashes keyed by sid)
+    carry their expiry in the value. Each worker remembers the connections it registered
+    and its heartbeat pushes their expiry sid_ttl seconds ahead, so whatever a worker that
+    dies without disconnecting its sockets left behind stops counting once it lapses and
+    is pruned by the next write that comes across it."""
+
+    def __init__(self, client, prefix='presence:', sid_ttl=90):
+        self.client = client
+        self.prefix = prefix
+        self.sid_ttl = sid_ttl
+        self._connections = {}  # sid -> _Connection, the sockets this process registered
+
+    def _key(self, *parts):
+        return self.prefix + ':'.join(str(part) for part in parts)
+
+    def connect(self, user_id, sid, online):
+        self._connection(sid, user_id)
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(self._key('sids', user_id), '-inf', now)
+        pipe.zadd(self._key('sids', user_id), {sid: now + self.sid_ttl})
+        if online:
+            pipe.zremrangebyscore(self._key('online', user_id), '-inf', now)
+            pipe.zadd(self._key('online', user_id), {sid: now + self.sid_ttl})
+            pipe.zcard(self._key('online', user_id))
+        results = pipe.execute()
+        return bool(online and results[3] and results[4] == 1)
+
+    def disconnect(self, user_id, sid):
+        self._connections.pop(sid, None)
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.zrem(self._key('sids', user_id), sid)
+        pipe.zrem(self._key('online', user_id), sid)
+        pipe.zremrangebyscore(self._key('online', user_id), '-inf', now)
+        pipe.zcard(self._key('online', user_id))
+        _, removed, _, remaining = pipe.execute()
+        return bool(removed and remaining == 0)
+
+    def go_offline(self, user_id):
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(self._key('online', user_id), '-inf', time.time())
+        pipe.delete(self._key('online', user_id))
+        _, removed = pipe.execute()
+        return bool(removed)
+
+    def go_online(self, user_id, sids):
+        if not sids:
+            return False
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(self._key('online', user_id), '-inf', now)
+        pipe.exists(self._key('online', user_id))
+        pipe.zadd(self._key('online', user_id), {sid: now + self.sid_ttl for sid in sids})
+        _, was_online, _ = pipe.execute()
+        return not was_online
+
+    def sids(self, user_id):
+        return set(self.client.zrangebyscore(self._key('sids', user_id), time.time(), '+inf'))
+
+    def online_sids(self, user_id):
+        return set(self.client.zrangebyscore(self._key('online', user_id), time.time(), '+inf'))
+
+    def _existing(self, kind, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for uid in user_ids:
+            pipe.zcount(self._key(kind, uid), now, '+inf')
+        return [uid for uid, found in zip(user_ids, pipe.execute()) if found]
+
+    def online_ids(self, user_ids):
+        return self._existing('online', user_ids)
+
+    def connected_ids(self, user_ids):
+        return self._existing('sids', user_ids)
+
+    def heartbeat(self):
+        connections = list(self._connections.items())
+        if not connections:
+            return
+        expires = time.time() + self.sid_ttl
+        pipe = self.client.pipeline(transaction=False)
+        for sid, connection in connections:
+            # xx: only connections still registered (not disconnected or appearing offline)
+            pipe.zadd(self._key('sids', connection.user_id), {sid: expires}, xx=True)
+            pipe.zadd(self._key('online', connection.user_id), {sid: expires}, xx=True)
+            for show_id, member in list(connection.shows.items()):
+                pipe.hset(self._key('show', show_id), sid, self._entry(member, expires))
+            for concert_id, show_id in list(connection.concerts):
+                pipe.hset(self._key('concert', concert_id), f'{sid}:{show_id}',
+                          self._entry({'user_id': connection.user_id}, expires))
+        pipe.execute()
+
+    def join_show(self, show_id, user_id, member):
+        sid = member['sid']
+        self._connection(sid, user_id).shows[show_id] = member
+        now = time.time()
+        key = self._key('show', show_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, sid, self._entry(member, now + self.sid_ttl))
+        pipe.hgetall(key)
+        _, entries = pipe.execute()
+        return _per_user(self._live(key, entries, now).values())
+
+    def leave_show(self, show_id, user_id, sid):
+        connection = self._connections.get(sid)
+        if connection is not None:
+            connection.shows.pop(show_id, None)
+        key = self._key('show', show_id)
+        pipe = self.client.pipeline()
+        pipe.hdel(key, sid)
+        pipe.hgetall(key)
+        _, entries = pipe.execute()
+        members = self._live(key, entries, time.time()).values()
+        if any(member['user_id'] == user_id for member in members):
+            return None
+        return _per_user(members)
+
+    def show_members(self, show_id):
+        key = self._key('show', show_id)
+        return _per_user(self._live(key, self.client.hgetall(key), time.time()).values())
+
+    def show_present(self, show_id, user_ids):
+        user_ids = set(user_ids)
+        if not user_ids:
+            return set()
+        key = self._key('show', show_id)
+        members = self._live(key, self.client.hgetall(key), time.time()).values()
+        return user_ids.intersection(member['user_id'] for member in members)
+
+    def enter_concert(self, concert_id, user_id, show_id, sid):
+        self._connection(sid, user_id).concerts.add((concert_id, show_id))
+        self.client.hset(self._key('concert', concert_id), f'{sid}:{show_id}',
+                         self._entry({'user_id': user_id}, time.time() + self.sid_ttl))
+
+    def leave_concert(self, concert_id, user_id, show_id, sid):
+        connection = self._connections.get(sid)
+        if connection is not None:
+            connection.concerts.discard((concert_id, show_id))
+        key = self._key('concert', concert_id)
+        pipe = self.client.pipeline()
+        pipe.hdel(key, f'{sid}:{show_id}')
+        pipe.hgetall(key)
+        removed, entries = pipe.execute()
+        if not removed:
+            return False
+        return not any(field.startswith(f'{sid}:') for field in self._live(key, entries, time.time()))
+
+    def concert_present(self, concert_id, user_ids):
+        user_ids = set(user_ids)
+        if not user_ids:
+            return set()
+        key = self._key('concert', concert_id)
+        entries = self._live(key, self.client.hgetall(key), time.time()).values()
+        return user_ids.intersection(entry['user_id'] for entry in entries)
+
+    def dm_join(self, user_id, entry):
+        self.client.hset(self._key('dm'), user_id, json.dumps(entry))
+
+    def dm_leave(self, user_id):
+        return bool(self.client.hdel(self._key('dm'), user_id))
+
+    def next_id(self, name, seed):
+        key = self._key('counter', name)
+        if not self.client.exists(key):
+            self.client.set(key, seed(), nx=True)  # first worker to seed wins
+        return int(self.client.incr(key))
+
+    def reset(self):
+        self._connections.clear()
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        return {
+            'backend': type(self.client).__name__,
+            'prefix': self.prefix,
+            'sid_ttl': self.sid_ttl,
+            'local_connections': len(self._connections),
+        }
+
+    # ── Internals ──
+
+    def _connection(self, sid, user_id):
+        connection = self._connections.get(sid)
+        if connection is None:
+            connection = self._connections[sid] = _Connection(user_id)
+        return connection
+
+    @staticmethod
+    def _entry(fields, expires):
+        return json.dumps(dict(fields, expires=expires))
+
+    def _live(self, key, entries, now):
+        """{field: entry} for the unexpired entries of a show or concert hash. Expired ones
+        were left by a worker that stopped without cleaning up, and are deleted here."""
+        live, expired = {}, []
+        for field, value in entries.items():
+            entry = json.loads(value)
+            if entry.pop('expires') > now:
+                live[field] = entry
+            else:
+                expired.append(field)
+        if expired:
+            self.client.hdel(key, *expired)
+        return live
+
+
+class _Connection:
+    """A socket registered by this process, with the entries its heartbeat keeps alive"""
+    __slots__ = ('user_id', 'shows', 'concerts')
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.shows = {}        # show_id -> member entry
+        self.concerts = set()  # (concert_id, show_id)
+
+
+def _per_user(members):
+    """Member entries listed once per user (a user may be in a show from several tabs)"""
+    return list({member['user_id']: member for member in members}.values())
+
+
+class LocalRedis:
+    """In-process stand-in for the few Redis commands SharedPresence uses.
+    Values are stored as strings and empty sorted sets and hashes disappear, as in Redis."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.RLock()
+
+    def pipeline(self, transaction=True):
+        return _LocalPipeline(self)
+
+    def zadd(self, key, mapping, xx=False):
+        with self._lock:
+            values = self._data.get(key)
+            if values is None:
+                if xx:
+                    return 0
+                values = self._data[key] = {}
+            added = 0
+            for member, score in mapping.items():
+                member = str(member)
+                if member not in values:
+                    if xx:
+                        continue
+                    added += 1
+                values[member] = float(score)
+            return added
+
+    def zrem(self, key, *members):
+        with self._lock:
+            values = self._data.get(key)
+            if not values:
+                return 0
+            removed = sum(1 for member in members if values.pop(str(member), None) is not None)
+            if not values:
+                del self._data[key]
+            return removed
+
+    def zcard(self, key):
+        with self._lock:
+            return len(self._data.get(key, ()))
+
+    def zcount(self, key, low, high):
+        return len(self.zrangebyscore(key, low, high))
+
+    def zrangebyscore(self, key, low, high):
+        low, high = float(low), float(high)
+        with self._lock:
+            values = self._data.get(key, {})
+            return [member for member, score in sorted(values.items(), key=lambda item: item[1])
+                    if low <= score <= high]
+
+    def zremrangebyscore(self, key, low, high):
+        with self._lock:
+            members = self.zrangebyscore(key, low, high)
+            return self.zrem(key, *members) if members else 0
+
+    def hset(self, key, field, value):
+        with self._lock:
+            values = self._data.setdefault(key, {})
+            added = str(field) not in values
+            values[str(field)] = value
+            return int(added)
+
+    def hdel(self, key, *fields):
+        with self._lock:
+            values = self._data.get(key)
+            if not values:
+                return 0
+            removed = sum(1 for field in fields if values.pop(str(field), None) is not None)
+            if not values:
+                del self._data[key]
+            return removed
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._data.get(key, {}))
+
+    def set(self, key, value, nx=False):
+        with self._lock:
+            if nx and key in self._data:
+                return None
+            self._data[key] = str(value)
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._data.get(key, 0)) + 1
+            self._data[key] = str(value)
+            return value
+
+    def exists(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if key in self._data)
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def scan_iter(self, match='*'):
+        with self._lock:
+            keys = [key for key in self._data if fnmatch.fnmatchcase(key, match)]
+        return iter(keys)
+
+
+class _LocalPipeline:
+    """Queues commands and runs them under the store lock, like MULTI/EXEC"""
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        with self._client._lock:
+            results = [command(*args, **kwargs) for command, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+
+def create_registry(url, sid_ttl=90):
+    """Registry for a PRESENCE_URL: memory://, local://, or a redis:// URL."""
+    if not url or url.startswith('memory://'):
+        return MemoryPresence()
+    if url.startswith('local://'):
+        return SharedPresence(LocalRedis(), sid_ttl=sid_ttl)
+    import redis  # only needed when presence is shared through Redis
+    return SharedPresence(redis.Redis.from_url(url, decode_responses=True), sid_ttl=sid_ttl)
+
+
+class Presence:
+    """Module-level handle to the configured registry; init_app() picks the implementation.
+    For a shared registry, the first connection starts a background task that runs its
+    heartbeat every PRESENCE_SID_TTL / 3 seconds."""
+
+    def __init__(self):
+        self.registry = MemoryPresence()
+        self.heartbeat_interval = 30
+        self._app = None
+        self._heartbeat_started = False
+
+    def init_app(self, app):
+        self._app = app
+        sid_ttl = app.config.get('PRESENCE_SID_TTL', 90)
+        self.registry = create_registry(app.config.get('PRESENCE_URL'), sid_ttl=sid_ttl)
+        self.heartbeat_interval = sid_ttl / 3
+
+    def connect(self, user_id, sid, online):
+        self._start_heartbeat()
+        return self.registry.connect(user_id, sid, online)
+
+    def __getattr__(self, name):
+        return getattr(self.registry, name)
+
+    # ── Internals ──
+
+    def _start_heartbeat(self):
+        if self._heartbeat_started or self._app is None or not isinstance(self.registry, SharedPresence):
+            return
+        self._heartbeat_started = True
+        from app import socketio
+        socketio.start_background_task(self._run_heartbeat)
+
+    def _run_heartbeat(self):
+        from app import socketio
+        while True:
+            socketio.sleep(self.heartbeat_interval)
+            try:
+                self.registry.heartbeat()
+            except Exception as e:
+                print(f"Error refreshing presence: {e}")
+
+
+presence = Presence()
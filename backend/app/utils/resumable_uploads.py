@@ -0,0 +1,298 @@
+"""
+Resumable video uploads
+A large video is sent as a series of PATCH requests instead of one multipart body, so a
+dropped connection costs only the chunk in flight. POST /api/videos/uploads opens an
+UploadSession for a file of known length; each PATCH carries Upload-Offset, which must
+equal the bytes stored so far, and its body is appended straight to `<id>.part` under
+INCOMING_DIR MEDIA_UPLOAD_BLOCK bytes at a time. An optional Upload-Checksum header
+("sha256 <base64 digest>", or sha1 / md5) covers the chunk: on a mismatch, or when a
+checksummed chunk is cut off, the part file is truncated back to where the chunk began.
+A chunk without a checksum keeps whatever arrived before the connection dropped. GET (or
+HEAD) on the session reports the offset to resume from, and once every byte is there
+POST .../complete moves the file into VIDEO_DIR and creates the VideoRecording.
+
+The part file's size is the offset, so a session survives restarts and can be resumed
+through any worker; an exclusive flock on the part file keeps two requests from writing
+one session at once. Sessions untouched for MEDIA_UPLOAD_EXPIRY seconds are deleted with
+their part files by a background sweep every MEDIA_UPLOAD_SWEEP_INTERVAL seconds (started
+by the first request a worker serves, so sessions left behind before a restart are swept
+too; 0 turns it off), or by `flask expire-uploads`.
+"""
+import base64
+import binascii
+import fcntl
+import hashlib
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from app.models import db, UploadSession, VideoRecording
+
+# Relative to the working directory, like the files VideoUpload.post writes
+VIDEO_DIR = os.path.join('uploads', 'videos')
+INCOMING_DIR = os.path.join('uploads', 'incoming')
+CHECKSUM_ALGORITHMS = ('sha256', 'sha1', 'md5')
+
+
+class UploadRejected(Exception):
+    """A request the upload protocol refuses, with the HTTP status to answer it with"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def parse_checksum(header):
+    """(algorithm, digest bytes) from an Upload-Checksum header, or (None, None)."""
+    if not header:
+        return None, None
+    try:
+        algorithm, encoded = header.strip().split(' ', 1)
+        digest = base64.b64decode(encoded.strip(), validate=True)
+    except (ValueError, binascii.Error):
+        raise UploadRejected('Upload-Checksum must be "<algorithm> <base64 digest>"')
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadRejected(f"Unsupported checksum algorithm; use one of {', '.join(CHECKSUM_ALGORITHMS)}")
+    return algorithm, digest
+
+
+def part_path(session):
+    return os.path.join(INCOMING_DIR, f'{session.id}.part')
+
+
+class ResumableUploads:
+    """Upload sessions whose bytes are appended to part files chunk by chunk"""
+
+    def __init__(self, max_size=4 << 30, expiry=86400, block_size=1 << 20, sweep_interval=3600):
+        self.max_size = max_size
+        self.expiry = expiry
+        self.block_size = block_size
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._app = None
+        self._sweeper_started = False
+        self.created = 0
+        self.chunks = 0
+        self.bytes_received = 0
+        self.conflicts = 0
+        self.checksum_failures = 0
+        self.completed = 0
+        self.expired = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.max_size = app.config.get('MEDIA_UPLOAD_MAX_SIZE', self.max_size)
+        self.expiry = app.config.get('MEDIA_UPLOAD_EXPIRY', self.expiry)
+        self.block_size = app.config.get('MEDIA_UPLOAD_BLOCK', self.block_size)
+        self.sweep_interval = app.config.get('MEDIA_UPLOAD_SWEEP_INTERVAL', self.sweep_interval)
+        app.before_request(self._start_sweeper)
+
+    def create(self, user_id, show_id, filename, length, title=None, description=None):
+        """Open a session for a file of `length` bytes with an empty part file."""
+        if length <= 0:
+            raise UploadRejected('length must be positive')
+        if length > self.max_size:
+            raise UploadRejected(f'Uploads are limited to {self.max_size} bytes', 413)
+        session = UploadSession(
+            id=uuid.uuid4().hex, user_id=user_id, show_id=show_id, original_filename=filename,
+            title=title, description=description, length=length, expires_at=self._expires_at()
+        )
+        os.makedirs(INCOMING_DIR, exist_ok=True)
+        open(part_path(session), 'wb').close()
+        db.session.add(session)
+        db.session.commit()
+        with self._lock:
+            self.created += 1
+        return session
+
+    def offset(self, session):
+        """Bytes stored so far (the offset the next chunk must start at)."""
+        try:
+            return os.path.getsize(part_path(session))
+        except OSError:
+            return session.length if session.video_id else 0
+
+    def append(self, session, offset, stream, content_length=None, checksum=None):
+        """Append one chunk read from `stream` at `offset`; returns the new offset."""
+        if session.video_id:
+            raise UploadRejected('Upload is already complete', 409, session.length)
+        algorithm, expected = parse_checksum(checksum)
+        try:
+            file = open(part_path(session), 'r+b')
+        except OSError:
+            raise UploadRejected('Upload not found', 404)
+        with file:
+            self._lock_file(file)
+            start = os.fstat(file.fileno()).st_size
+            if offset != start:
+                with self._lock:
+                    self.conflicts += 1
+                raise UploadRejected('Upload-Offset does not match the bytes received', 409, start)
+            remaining = session.length - start
+            if content_length is not None and content_length > remaining:
+                raise UploadRejected('Chunk runs past the upload length', 413, start)
+
+            file.seek(start)
+            digest = hashlib.new(algorithm) if algorithm else None
+            received = 0
+            try:
+                while True:
+                    block = stream.read(self.block_size)
+                    if not block:
+                        break
+                    received += len(block)
+                    if received > remaining:
+                        raise UploadRejected('Chunk runs past the upload length', 413, start)
+                    file.write(block)
+                    if digest is not None:
+                        digest.update(block)
+                if digest is not None and digest.digest() != expected:
+                    with self._lock:
+                        self.checksum_failures += 1
+                    raise UploadRejected('Checksum mismatch', 460, start)
+                file.flush()
+                os.fsync(file.fileno())
+            except UploadRejected:
+                file.truncate(start)
+                raise
+            except BaseException:
+                # Connection dropped mid-chunk: keep what arrived, unless a checksum was to vouch for it
+                if digest is not None:
+                    file.truncate(start)
+                raise
+        session.expires_at = self._expires_at()
+        db.session.commit()
+        with self._lock:
+            self.chunks += 1
+            self.bytes_received += received
+        return start + received
+
+    def finalize(self, session):
+        """Move a fully received file into VIDEO_DIR and create its VideoRecording. Calling
+        it again for a finished session returns the same recording."""
+        if session.video_id:
+            return db.session.get(VideoRecording, session.video_id)
+        try:
+            file = open(part_path(session), 'rb')
+        except OSError:
+            raise UploadRejected('Upload not found', 404)
+        with file:
+            self._lock_file(file)
+            received = os.fstat(file.fileno()).st_size
+            if received != session.length:
+                raise UploadRejected('Upload is not complete', 409, received)
+            extension = session.original_filename.rsplit('.', 1)[1].lower()
+            filename = f"{session.user_id}_{session.show_id}_{os.urandom(8).hex()}.{extension}"
+            video = VideoRecording(
+                show_id=session.show_id,
+                user_id=session.user_id,
+                filename=filename,
+                original_filename=session.original_filename,
+                file_path=os.path.join(VIDEO_DIR, filename),
+                title=session.title or session.original_filename,
+                description=session.description,
+                file_size=received
+            )
+            db.session.add(video)
+            db.session.flush()
+            os.makedirs(VIDEO_DIR, exist_ok=True)
+            os.replace(part_path(session), video.file_path)
+            try:
+                # Kept until it expires so a client that lost this response can ask again
+                session.video_id = video.id
+                session.expires_at = self._expires_at()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                os.replace(video.file_path, part_path(session))
+                raise
+        with self._lock:
+            self.completed += 1
+        return video
+
+    def discard(self, session):
+        """Delete a session and whatever it has received."""
+        try:
+            os.remove(part_path(session))
+        except OSError:
+            pass
+        db.session.delete(session)
+        db.session.commit()
+
+    def expire(self, now=None):
+        """Delete sessions past their expiry and part files no session owns; returns how many."""
+        now = now or datetime.utcnow()
+        stale = UploadSession.query.filter(UploadSession.expires_at <= now).all()
+        for session in stale:
+            try:
+                os.remove(part_path(session))
+            except OSError:
+                pass
+            db.session.delete(session)
+        db.session.commit()
+
+        removed = len(stale)
+        if os.path.isdir(INCOMING_DIR):
+            cutoff = (now - timedelta(seconds=self.expiry)).timestamp()
+            for name in os.listdir(INCOMING_DIR):
+                path = os.path.join(INCOMING_DIR, name)
+                try:
+                    if os.path.getmtime(path) > cutoff or \
+                            db.session.get(UploadSession, name.rsplit('.', 1)[0]) is not None:
+                        continue
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        with self._lock:
+            self.expired += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'expiry': self.expiry,
+                'created': self.created,
+                'chunks': self.chunks,
+                'bytes_received': self.bytes_received,
+                'conflicts': self.conflicts,
+                'checksum_failures': self.checksum_failures,
+                'completed': self.completed,
+                'expired': self.expired,
+            }
+
+    # ── Internals ──
+
+    def _expires_at(self):
+        return datetime.utcnow() + timedelta(seconds=self.expiry)
+
+    @staticmethod
+    def _lock_file(file):
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadRejected('Another request is writing this upload', 409)
+
+    def _start_sweeper(self):
+        if self._sweeper_started or self._app is None or self.sweep_interval <= 0:
+            return
+        self._sweeper_started = True
+        from app import socketio
+        socketio.start_background_task(self._run_sweeper)
+
+    def _run_sweeper(self):
+        from app import socketio
+        while True:
+            try:
+                with self._app.app_context():
+                    self.expire()
+            except Exception as e:
+                print(f"Error expiring uploads: {e}")
+            socketio.sleep(self.sweep_interval)
+
+
+resumable_uploads = ResumableUploads()
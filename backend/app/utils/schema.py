@@ -0,0 +1,37 @@
+"""
+Schema helpers for the standalone backfill scripts.
+The migrations/ folder is local to each checkout, so these scripts bring an existing
+database up to date on their own before backfilling data.
+"""
+from sqlalchemy import inspect, text
+
+from app.models import db
+
+
+def create_table_if_missing(model):
+    """Create the table for a model (and its indexes) if it does not exist yet."""
+    model.__table__.create(bind=db.engine, checkfirst=True)
+
+
+def add_column_if_missing(table_name, column_name, ddl_type, default=None):
+    """Add a column via ALTER TABLE when an older database is missing it.
+    Returns True if the column was added."""
+    columns = {c['name'] for c in inspect(db.engine).get_columns(table_name)}
+    if column_name in columns:
+        return False
+    ddl = f'ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl_type}'
+    if default is not None:
+        ddl += f' NOT NULL DEFAULT {default}'
+    with db.engine.begin() as conn:
+        conn.execute(text(ddl))
+    return True
+
+
+def create_index_if_missing(index_name, table_name, column_names):
+    """Create a plain index if it does not exist yet."""
+    existing = {ix['name'] for ix in inspect(db.engine).get_indexes(table_name)}
+    if index_name in existing:
+        return False
+    with db.engine.begin() as conn:
+        conn.execute(text(f'CREATE INDEX {index_name} ON {table_name} ({", ".join(column_names)})'))
+    return True
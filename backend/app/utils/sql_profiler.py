@@ -0,0 +1,142 @@
+"""
+Per-request SQL instrumentation
+Counts and times every statement issued while handling a request, flags statements
+repeated with the same shape as N+1 suspects, reports the totals in a Server-Timing
+header, and keeps the last requests in a ring buffer for /api/_debug/requests.
+Enabled with SQL_PROFILING (on by default in development).
+"""
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Collapse literals and expanded IN lists so repeated lookups share one shape
+_IN_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+class RequestProfile:
+    """SQL totals for one request"""
+
+    def __init__(self):
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.shapes = {}  # shape -> [count, total seconds]
+
+    def record(self, statement, elapsed):
+        self.query_count += 1
+        self.db_time += elapsed
+        entry = self.shapes.setdefault(statement_shape(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def suspects(self, threshold):
+        """Statement shapes executed at least `threshold` times, most repeated first."""
+        repeated = [
+            {'statement': shape, 'count': count, 'total_ms': round(total * 1000, 2)}
+            for shape, (count, total) in self.shapes.items() if count >= threshold
+        ]
+        return sorted(repeated, key=lambda s: s['count'], reverse=True)
+
+
+class SQLProfiler:
+    """Hooks SQLAlchemy cursor events and Flask request hooks together"""
+
+    def __init__(self):
+        self.enabled = False
+        self.threshold = 5
+        self._requests = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SQL_PROFILING', False)
+        if not self.enabled:
+            return
+        self.threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 5)
+        self._requests = deque(maxlen=app.config.get('SQL_PROFILE_BUFFER_SIZE', 200))
+
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def recent(self, limit=None):
+        """Most recent request summaries, newest first."""
+        with self._lock:
+            entries = list(self._requests)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self._lock:
+            self._requests.clear()
+
+    def _start_request(self):
+        g.sql_profile = RequestProfile()
+
+    def _finish_request(self, response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        db_ms = profile.db_time * 1000
+        suspects = profile.suspects(self.threshold)
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.1f};desc="{profile.query_count} queries", app;dur={total_ms:.1f}'
+        )
+
+        for suspect in suspects:
+            print(f"[sql] N+1 suspect on {request.method} {request.path}: "
+                  f"{suspect['count']}x {suspect['statement'][:200]}")
+
+        with self._lock:
+            self._requests.append({
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'started_at': profile.started_at.isoformat(),
+                'duration_ms': round(total_ms, 2),
+                'query_count': profile.query_count,
+                'db_ms': round(db_ms, 2),
+                'n_plus_one': suspects,
+            })
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'sql_profile' in g:
+            conn.info.setdefault('sql_profiler_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('sql_profiler_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if has_request_context() and 'sql_profile' in g:
+            g.sql_profile.record(statement, elapsed)
+
+
+sql_profiler = SQLProfiler()
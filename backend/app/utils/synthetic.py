@@ -0,0 +1,276 @@
+"""
+Synthetic dataset generator for benchmarking (`flask seed-synthetic`)
+Builds users, power-law friendships, concerts shared by many shows, setlists, comments,
+chat, DMs, notifications and placeholder media rows with Core bulk inserts. The same
+seed and sizes always produce the same rows. Derived tables (show counters, user_stats,
+feed_entries) are rebuilt at the end with their set-based recompute helpers.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from app.models import (
+    db, User, Artist, Venue, Concert, Show, ShowVisibility, SetlistSong, Photo,
+    AudioRecording, VideoRecording, Comment, Friendship, Conversation, DirectMessage,
+    ChatMessage, Notification, recompute_show_counts, recompute_user_stats
+)
+from app.utils import feed
+
+SYNTHETIC_PASSWORD = 'password'
+
+# Dates are fixed rather than relative to today so a seed always yields the same rows
+FIRST_SHOW_DATE = date(2000, 1, 1)
+LAST_SHOW_DATE = date(2025, 12, 31)
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Austin', 'TX'),
+    ('Denver', 'CO'), ('Nashville', 'TN'), ('Seattle', 'WA'), ('Atlanta', 'GA'),
+    ('Boston', 'MA'), ('San Francisco', 'CA'), ('Philadelphia', 'PA'), ('Portland', 'OR'),
+]
+WORDS = [
+    'midnight', 'river', 'electric', 'ghost', 'golden', 'static', 'wild', 'velvet',
+    'north', 'fire', 'echo', 'glass', 'hollow', 'neon', 'paper', 'silver', 'thunder',
+    'summer', 'stone', 'radio', 'dream', 'broken', 'city', 'ocean', 'shadow', 'light',
+]
+
+
+def _skewed_index(rng, size, skew):
+    """Index in [0, size) biased towards 0; higher skew means a longer popularity tail."""
+    return min(int(size * rng.random() ** skew), size - 1)
+
+
+def _count(rng, mean):
+    """Small random count averaging roughly `mean` (rounded exponential)."""
+    return int(rng.expovariate(1 / mean) + 0.5) if mean > 0 else 0
+
+
+def _phrase(rng, words=2):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).title()
+
+
+def _next_id(model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+class _BulkWriter:
+    """Buffers rows per table and flushes them as executemany INSERTs."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, model, row):
+        buffer = self.buffers.setdefault(model, [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model=None):
+        for table_model in ([model] if model else list(self.buffers)):
+            rows = self.buffers.get(table_model)
+            if rows:
+                db.session.execute(table_model.__table__.insert(), rows)
+                self.counts[table_model.__tablename__] = self.counts.get(table_model.__tablename__, 0) + len(rows)
+                self.buffers[table_model] = []
+
+
+def _power_law_friendships(rng, user_ids, avg_friends):
+    """Preferential attachment: each new user befriends m existing users picked by degree."""
+    m = max(1, avg_friends // 2)
+    adjacency = {uid: set() for uid in user_ids}
+    endpoints = list(user_ids[:m + 1])  # seed clique members, repeated once per edge end
+    for i, a in enumerate(user_ids[:m + 1]):
+        for b in user_ids[i + 1:m + 1]:
+            adjacency[a].add(b)
+            adjacency[b].add(a)
+            endpoints += [a, b]
+    for uid in user_ids[m + 1:]:
+        targets = set()
+        while len(targets) < min(m, len(endpoints)):
+            targets.add(rng.choice(endpoints))
+        for friend in targets:
+            adjacency[uid].add(friend)
+            adjacency[friend].add(uid)
+            endpoints += [uid, friend]
+    return adjacency
+
+
+def seed_synthetic(users=1000, shows=100000, artists=2000, venues=500, avg_friends=20,
+                   shows_per_concert=3.0, songs_per_setlist=12, setlist_rate=0.6,
+                   comments_per_show=1.0, photos_per_show=1.0, recordings_per_show=0.2,
+                   chat_per_show=0.5, restricted_rate=0.05, seed=42, batch_size=10000, log=print):
+    """Generate a synthetic dataset and return {table: rows inserted}."""
+    rng = random.Random(seed)
+    writer = _BulkWriter(batch_size)
+    span_days = (LAST_SHOW_DATE - FIRST_SHOW_DATE).days
+
+    # Users: one shared password hash keeps generation fast
+    password_hash = generate_password_hash(SYNTHETIC_PASSWORD)
+    first_user = _next_id(User)
+    user_ids = list(range(first_user, first_user + users))
+    for uid in user_ids:
+        writer.add(User, {
+            'id': uid, 'username': f'synth_{seed}_{uid}', 'email': f'synth_{seed}_{uid}@example.com',
+            'password_hash': password_hash, 'email_verified': True, 'appear_offline': rng.random() < 0.05,
+        })
+    writer.flush()
+    log(f'users: {users}')
+
+    # Friendships: power-law degree distribution
+    adjacency = _power_law_friendships(rng, user_ids, avg_friends)
+    friend_lists = {uid: sorted(friends) for uid, friends in adjacency.items()}
+    friendship_id = _next_id(Friendship)
+    for uid in user_ids:
+        for friend in friend_lists[uid]:
+            if uid < friend:
+                status = 'accepted' if rng.random() < 0.95 else 'pending'
+                writer.add(Friendship, {'id': friendship_id, 'user_id': uid, 'friend_id': friend, 'status': status})
+                friendship_id += 1
+    writer.flush()
+    log(f'friendships: {writer.counts.get("friendships", 0)}')
+
+    # Catalog
+    first_artist = _next_id(Artist)
+    artist_ids = list(range(first_artist, first_artist + artists))
+    for aid in artist_ids:
+        writer.add(Artist, {'id': aid, 'name': f'The {_phrase(rng)} {aid}'})
+    first_venue = _next_id(Venue)
+    venue_ids = list(range(first_venue, first_venue + venues))
+    for vid in venue_ids:
+        city, state = rng.choice(CITIES)
+        writer.add(Venue, {
+            'id': vid, 'name': f'{_phrase(rng)} Hall {vid}', 'city': city, 'state': state,
+            'country': 'US', 'location': f'{city}, {state}',
+        })
+    writer.flush()
+
+    # Concerts: popular artists play more often; unique per (artist, venue, date)
+    concert_count = max(1, int(shows / shows_per_concert))
+    first_concert = _next_id(Concert)
+    concerts = []
+    seen = set()
+    while len(concerts) < concert_count:
+        key = (
+            artist_ids[_skewed_index(rng, artists, 2.0)],
+            rng.choice(venue_ids),
+            FIRST_SHOW_DATE + timedelta(days=rng.randrange(span_days)),
+        )
+        if key in seen:
+            continue
+        seen.add(key)
+        concert_id = first_concert + len(concerts)
+        concerts.append((concert_id,) + key)
+        writer.add(Concert, {'id': concert_id, 'artist_id': key[0], 'venue_id': key[1], 'date': key[2]})
+    writer.flush()
+    log(f'concerts: {len(concerts)}')
+
+    # Shows: a few active users log far more shows; each picks a skewed-popular concert.
+    # Activity rank is shuffled so the heaviest loggers are not also the friendship hubs.
+    by_activity = list(user_ids)
+    rng.shuffle(by_activity)
+    weights = [1.0 / (rank + 1) for rank in range(users)]
+    owners = rng.choices(by_activity, weights=weights, k=shows)
+    show_id = _next_id(Show)
+    song_id = _next_id(SetlistSong)
+    photo_id, audio_id, video_id = _next_id(Photo), _next_id(AudioRecording), _next_id(VideoRecording)
+    comment_id, chat_id = _next_id(Comment), _next_id(ChatMessage)
+    attended = set()
+    for owner in owners:
+        concert = concerts[_skewed_index(rng, len(concerts), 1.5)]
+        if (owner, concert[0]) in attended:
+            concert = rng.choice(concerts)
+        attended.add((owner, concert[0]))
+        concert_id, artist_id, venue_id, show_date = concert
+        show_time = datetime.combine(show_date, datetime.min.time()) + timedelta(hours=20)
+        friends = friend_lists[owner]
+
+        restricted = bool(friends) and rng.random() < restricted_rate
+        writer.add(Show, {
+            'id': show_id, 'user_id': owner, 'artist_id': artist_id, 'venue_id': venue_id,
+            'concert_id': concert_id, 'date': show_date, 'rating': rng.randint(1, 5),
+            'visibility_restricted': restricted, 'created_at': show_time + timedelta(days=1),
+        })
+        if restricted:
+            for viewer in rng.sample(friends, min(3, len(friends))):
+                writer.add(ShowVisibility, {'show_id': show_id, 'user_id': viewer})
+
+        if rng.random() < setlist_rate:
+            for order in range(1, rng.randint(songs_per_setlist // 2, songs_per_setlist * 3 // 2) + 1):
+                writer.add(SetlistSong, {
+                    'id': song_id, 'show_id': show_id, 'title': _phrase(rng, rng.randint(1, 3)), 'order': order,
+                })
+                song_id += 1
+
+        for _ in range(_count(rng, photos_per_show)):
+            writer.add(Photo, {
+                'id': photo_id, 'user_id': owner, 'show_id': show_id, 'filename': f'synthetic_{photo_id}.jpg',
+                'caption': _phrase(rng, 3), 'created_at': show_time + timedelta(minutes=rng.randrange(180)),
+            })
+            photo_id += 1
+        if rng.random() < recordings_per_show:
+            writer.add(AudioRecording, {
+                'id': audio_id, 'user_id': owner, 'show_id': show_id, 'filename': f'synthetic_{audio_id}.mp3',
+                'title': _phrase(rng), 'duration': rng.randrange(120, 600),
+                'created_at': show_time + timedelta(minutes=rng.randrange(180)),
+            })
+            audio_id += 1
+        if rng.random() < recordings_per_show:
+            writer.add(VideoRecording, {
+                'id': video_id, 'user_id': owner, 'show_id': show_id, 'filename': f'synthetic_{video_id}.mp4',
+                'title': _phrase(rng), 'duration': rng.randrange(30, 300),
+                'created_at': show_time + timedelta(minutes=rng.randrange(180)),
+            })
+            video_id += 1
+
+        commenters = [owner] + friends
+        for _ in range(_count(rng, comments_per_show)):
+            writer.add(Comment, {
+                'id': comment_id, 'user_id': rng.choice(commenters), 'show_id': show_id,
+                'text': _phrase(rng, 5), 'created_at': show_time + timedelta(days=1, minutes=rng.randrange(1440)),
+            })
+            comment_id += 1
+        for _ in range(_count(rng, chat_per_show)):
+            writer.add(ChatMessage, {
+                'id': chat_id, 'show_id': show_id, 'user_id': rng.choice(commenters),
+                'message': _phrase(rng, 4), 'created_at': show_time + timedelta(minutes=rng.randrange(180)),
+            })
+            chat_id += 1
+        show_id += 1
+    writer.flush()
+    log(f'shows: {shows}')
+
+    # DMs and notifications between friends
+    conversation_id = _next_id(Conversation)
+    message_id = _next_id(DirectMessage)
+    notification_id = _next_id(Notification)
+    base_time = datetime.combine(LAST_SHOW_DATE, datetime.min.time())
+    for uid in user_ids:
+        friends = friend_lists[uid]
+        for friend in rng.sample(friends, min(3, len(friends))):
+            if friend < uid:
+                continue  # the lower id starts the conversation, so each pair is generated once
+            writer.add(Conversation, {'id': conversation_id, 'user1_id': uid, 'user2_id': friend})
+            for i in range(rng.randint(1, 20)):
+                writer.add(DirectMessage, {
+                    'id': message_id, 'conversation_id': conversation_id, 'sender_id': rng.choice((uid, friend)),
+                    'body': _phrase(rng, 6), 'created_at': base_time - timedelta(minutes=rng.randrange(500000)),
+                })
+                message_id += 1
+            conversation_id += 1
+        for _ in range(rng.randint(0, 20) if friends else 0):
+            writer.add(Notification, {
+                'id': notification_id, 'user_id': uid, 'from_user_id': rng.choice(friends),
+                'type': 'show_added', 'message': f'added a show: {_phrase(rng)}', 'read': rng.random() < 0.7,
+                'created_at': base_time - timedelta(minutes=rng.randrange(500000)),
+            })
+            notification_id += 1
+    writer.flush()
+    db.session.commit()
+
+    log('rebuilding derived tables')
+    recompute_show_counts()
+    recompute_user_stats()
+    writer.counts['feed_entries'] = feed.rebuild_all()
+    return writer.counts
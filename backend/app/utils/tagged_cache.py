@@ -0,0 +1,53 @@
+"""
+Tag-invalidated caching on top of the shared Flask-Caching backend
+Every tag maps to a version token stored in the backend. Cached values remember the tag
+versions they were built from, so bumping a tag turns every dependent entry into a miss
+in all workers at once. That lets dashboard entries carry TTLs measured in hours.
+"""
+import uuid
+
+from app import cache
+
+
+def user_tag(user_id, kind):
+    """Tag for one slice of a user's data, e.g. 'shows'."""
+    return f'user:{user_id}:{kind}'
+
+
+def _tag_key(tag):
+    return f'tag_version:{tag}'
+
+
+def _tag_versions(tags):
+    """Current version token per tag, creating tokens for tags seen for the first time."""
+    keys = [_tag_key(tag) for tag in tags]
+    versions = dict(zip(keys, cache.get_many(*keys)))
+    for key, version in versions.items():
+        if version is None:
+            # add() keeps a token another worker created first
+            cache.add(key, uuid.uuid4().hex, timeout=0)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def get_or_set(key, tags, builder, timeout=None):
+    """Return the cached value for key if none of its tags changed, else build and store it.
+    Tag versions are read before building so a write racing the build invalidates the result."""
+    versions = _tag_versions(tags)
+    entry = cache.get(key)
+    if entry is not None and entry.get('tags') == versions:
+        return entry['value']
+
+    value = builder()
+    cache.set(key, {'tags': versions, 'value': value}, timeout=timeout)
+    return value
+
+
+def invalidate(*tags):
+    """Bump the given tags; every entry built against them becomes stale."""
+    cache.set_many({_tag_key(tag): uuid.uuid4().hex for tag in tags}, timeout=0)
+
+
+def invalidate_user(user_id, *kinds):
+    """Bump a user's tags after a write that changes their dashboard numbers."""
+    invalidate(*(user_tag(user_id, kind) for kind in kinds))
@@ -0,0 +1,248 @@
+"""
+Typing indicators coalesced on the server
+Clients repeat `typing` / `dm_typing` every couple of seconds while the user types and
+send is_typing=false on blur, whether or not they ever started. Each (user, room) here is
+a small state machine: only the start and stop transitions are broadcast, repeats just push
+the expiry back, and a background sweep broadcasts the stop for anyone who goes quiet for
+TYPING_TIMEOUT seconds or disconnects. Sending the message ends typing without a broadcast
+of its own, since receivers clear the indicator on the message. Each connection may send
+TYPING_BURST events at once and TYPING_RATE per second after that; the rest are dropped.
+DM conversations never change members, so who is on the other end of a conversation is
+cached instead of loaded for every event. State is per process: a connection's typing
+lives on the worker that holds it.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from app.models import Conversation
+
+
+class TypingState:
+    """One user typing in one room"""
+    __slots__ = ('event', 'room', 'payload', 'sid', 'expires_at')
+
+    def __init__(self, event, room, payload, sid, expires_at):
+        self.event = event
+        self.room = room
+        self.payload = payload  # broadcast body without is_typing
+        self.sid = sid
+        self.expires_at = expires_at
+
+
+class TokenBucket:
+    """Allows `burst` events at once, refilled at `rate` per second"""
+    __slots__ = ('tokens', 'updated_at')
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.updated_at = now
+
+    def take(self, rate, burst, now):
+        self.tokens = min(burst, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class TypingIndicators:
+    """Start/stop transitions per (user, room), expiry sweep and per-connection rate limit"""
+
+    def __init__(self, timeout=6.0, rate=1.0, burst=5):
+        self.timeout = timeout
+        self.rate = rate
+        self.burst = burst
+        self._states = {}   # (user_id, room) -> TypingState
+        self._buckets = {}  # sid -> TokenBucket
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._app = None
+        self._sweeper_started = False
+        self.received = 0
+        self.limited = 0
+        self.started = 0
+        self.refreshed = 0
+        self.stopped = 0
+        self.sent = 0
+        self.expired = 0
+        self.ignored = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.timeout = app.config.get('TYPING_TIMEOUT', self.timeout)
+        self.rate = app.config.get('TYPING_RATE', self.rate)
+        self.burst = app.config.get('TYPING_BURST', self.burst)
+
+    def allow(self, sid):
+        """Charge one typing event to a connection; False once it is over its rate."""
+        now = time.monotonic()
+        with self._lock:
+            self.received += 1
+            bucket = self._buckets.get(sid)
+            if bucket is None:
+                bucket = self._buckets[sid] = TokenBucket(self.burst, now)
+            if bucket.take(self.rate, self.burst, now):
+                return True
+            self.limited += 1
+            return False
+
+    def update(self, user_id, room, is_typing, event, payload, sid):
+        """Apply one typing event and broadcast it only if it starts or stops typing."""
+        key = (user_id, room)
+        with self._lock:
+            state = self._states.get(key)
+            if is_typing:
+                if state is not None:
+                    state.expires_at = time.monotonic() + self.timeout
+                    state.sid = sid
+                    self.refreshed += 1
+                    return False
+                self._states[key] = TypingState(event, room, payload, sid, time.monotonic() + self.timeout)
+                self.started += 1
+            else:
+                if state is None:
+                    self.ignored += 1
+                    return False
+                del self._states[key]
+                self.stopped += 1
+        self._broadcast(event, room, payload, is_typing, sid)
+        if is_typing:
+            self._start_sweeper()
+            self._wake.set()
+        return True
+
+    def message_sent(self, user_id, room):
+        """End typing in room without a broadcast: the user's message already tells the room."""
+        with self._lock:
+            if self._states.pop((user_id, room), None) is None:
+                return False
+            self.sent += 1
+        return True
+
+    def drop_connection(self, sid):
+        """Stop everything a disconnected connection was typing and forget its bucket."""
+        with self._lock:
+            self._buckets.pop(sid, None)
+            dropped = [key for key, state in self._states.items() if state.sid == sid]
+            states = [self._states.pop(key) for key in dropped]
+            self.stopped += len(states)
+        for state in states:
+            self._broadcast(state.event, state.room, state.payload, False, sid)
+
+    def expire(self, now=None):
+        """Broadcast the stop for every state past its expiry; returns how many expired."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            due = [key for key, state in self._states.items() if state.expires_at <= now]
+            states = [self._states.pop(key) for key in due]
+            self.expired += len(states)
+        for state in states:
+            self._broadcast(state.event, state.room, state.payload, False, state.sid)
+        return len(states)
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'typing': len(self._states),
+                'connections': len(self._buckets),
+                'timeout': self.timeout,
+                'rate': self.rate,
+                'burst': self.burst,
+                'received': self.received,
+                'limited': self.limited,
+                'started': self.started,
+                'refreshed': self.refreshed,
+                'stopped': self.stopped,
+                'sent': self.sent,
+                'expired': self.expired,
+                'ignored': self.ignored,
+                'broadcast': self.started + self.stopped + self.expired,
+            }
+
+    # ── Internals ──
+
+    @staticmethod
+    def _broadcast(event, room, payload, is_typing, sid):
+        from app import socketio
+        try:
+            socketio.emit(event, dict(payload, is_typing=is_typing), to=room, skip_sid=sid)
+        except Exception as e:
+            print(f"Error broadcasting {event} to {room}: {e}")
+
+    def _start_sweeper(self):
+        if self._sweeper_started or self._app is None:
+            return
+        self._sweeper_started = True
+        from app import socketio
+        socketio.start_background_task(self._run_sweeper)
+
+    def _run_sweeper(self):
+        from app import socketio
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while True:
+                with self._lock:
+                    if not self._states:
+                        break
+                    next_expiry = min(state.expires_at for state in self._states.values())
+                socketio.sleep(max(0.5, next_expiry - time.monotonic()))
+                self.expire()
+
+
+class ConversationMembers:
+    """LRU cache of the two members of each DM conversation"""
+
+    def __init__(self, max_conversations=10000):
+        self.max_conversations = max_conversations
+        self._members = OrderedDict()  # conversation_id -> (user1_id, user2_id)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_conversations = app.config.get('CONVERSATION_CACHE_SIZE', self.max_conversations)
+
+    def other(self, conversation_id, user_id):
+        """The other member of a conversation user_id belongs to, else None."""
+        members = self.get(conversation_id)
+        if members is None or user_id not in members:
+            return None
+        return members[1] if members[0] == user_id else members[0]
+
+    def get(self, conversation_id):
+        with self._lock:
+            members = self._members.get(conversation_id)
+            if members is not None:
+                self._members.move_to_end(conversation_id)
+                self.hits += 1
+                return members
+            self.misses += 1
+        conversation = Conversation.query.get(conversation_id)
+        if conversation is None:
+            return None  # not cached: it may be created later
+        members = (conversation.user1_id, conversation.user2_id)
+        with self._lock:
+            self._members[conversation_id] = members
+            while len(self._members) > self.max_conversations:
+                self._members.popitem(last=False)
+        return members
+
+    def clear(self):
+        with self._lock:
+            self._members.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'conversations': len(self._members), 'hits': self.hits, 'misses': self.misses}
+
+
+typing_indicators = TypingIndicators()
+conversation_members = ConversationMembers()
@@ -0,0 +1,23 @@
+"""
+Migration: add the (user_id, created_at) indexes used by /api/dashboard/activity
+to photos, audio_recordings, video_recordings and comments.
+Safe to re-run.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.utils.schema import create_index_if_missing
+
+ACTIVITY_TABLES = ('photos', 'audio_recordings', 'video_recordings', 'comments')
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        for table in ACTIVITY_TABLES:
+            if create_index_if_missing(f'ix_{table}_user_created', table, ['user_id', 'created_at']):
+                print(f'Added ix_{table}_user_created')
+    print('\nDone!')
@@ -0,0 +1,59 @@
+"""
+Migration + backfill: create the concerts table, add shows.concert_id, and link every
+existing show to its canonical concert (same artist, venue, date).
+Safe to re-run; only shows without a concert_id are touched.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.models import db, Concert, Show
+from app.utils.schema import create_table_if_missing, add_column_if_missing, create_index_if_missing
+
+
+def migrate_schema():
+    """Step 1: Create concerts table and shows.concert_id column."""
+    create_table_if_missing(Concert)
+    if add_column_if_missing('shows', 'concert_id', 'INTEGER REFERENCES concerts(id)'):
+        print('Added shows.concert_id')
+    create_index_if_missing('ix_shows_concert_id', 'shows', ['concert_id'])
+
+
+def backfill_concerts():
+    """Step 2: Create one Concert per distinct (artist, venue, date) and link shows."""
+    keys = db.session.query(Show.artist_id, Show.venue_id, Show.date)\
+        .filter(Show.concert_id.is_(None))\
+        .distinct().all()
+
+    print(f'\n=== Linking shows for {len(keys)} concerts ===\n')
+    created = 0
+    linked = 0
+    for artist_id, venue_id, show_date in keys:
+        concert = Concert.query.filter_by(
+            artist_id=artist_id, venue_id=venue_id, date=show_date
+        ).first()
+        if not concert:
+            concert = Concert(artist_id=artist_id, venue_id=venue_id, date=show_date)
+            db.session.add(concert)
+            db.session.flush()
+            created += 1
+
+        linked += Show.query.filter(
+            Show.artist_id == artist_id,
+            Show.venue_id == venue_id,
+            Show.date == show_date,
+            Show.concert_id.is_(None)
+        ).update({'concert_id': concert.id}, synchronize_session=False)
+
+    db.session.commit()
+    print(f'Created {created} concerts, linked {linked} shows')
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        migrate_schema()
+        backfill_concerts()
+    print('\nDone!')
@@ -0,0 +1,23 @@
+"""
+Migration + backfill: create the feed_entries timeline table and fan out every
+existing show to the friends who can see it.
+Afterwards use `flask rebuild-feed` to repair any drift.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.models import FeedEntry
+from app.utils import feed
+from app.utils.schema import create_table_if_missing
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        create_table_if_missing(FeedEntry)
+        written = feed.rebuild_all()
+        print(f'Backfilled {written} feed entries')
+    print('\nDone!')
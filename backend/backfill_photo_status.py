@@ -0,0 +1,23 @@
+"""
+Migration: add photos.processing_status (existing photos already have their thumbnail,
+so they start out 'ready') and photos.variants. Photos an upload left 'pending' are
+rendered with `flask process-photos`; `flask process-photos --variants` also renders
+the size ladder for photos uploaded before it existed.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.utils.schema import add_column_if_missing
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        if add_column_if_missing('photos', 'processing_status', 'VARCHAR(20)', default="'ready'"):
+            print('Added photos.processing_status')
+        if add_column_if_missing('photos', 'variants', 'TEXT'):
+            print('Added photos.variants')
+    print('\nDone!')
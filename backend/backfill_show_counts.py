@@ -0,0 +1,26 @@
+"""
+Migration + backfill: add the denormalized counter columns to shows
+(photo/audio/video/comment/song counts) and fill them from the child tables.
+Afterwards use `flask recount-shows` to repair any drift.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.models import recompute_show_counts
+from app.utils.schema import add_column_if_missing
+
+COUNTER_COLUMNS = ['photo_count', 'audio_count', 'video_count', 'comment_count', 'song_count']
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        for column in COUNTER_COLUMNS:
+            if add_column_if_missing('shows', column, 'INTEGER', default=0):
+                print(f'Added shows.{column}')
+        drifted = recompute_show_counts()
+        print(f'Backfilled counters ({drifted} shows updated)')
+    print('\nDone!')
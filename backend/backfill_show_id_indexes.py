@@ -0,0 +1,25 @@
+"""
+Migration: index show_id on the per-show child tables (setlist songs, media, comments,
+chat). Per-show listings and the counter/stat recomputes filter on these columns.
+Safe to re-run.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.utils.schema import create_index_if_missing
+
+SHOW_CHILD_TABLES = (
+    'setlist_songs', 'photos', 'audio_recordings', 'video_recordings', 'comments', 'chat_messages',
+)
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        for table in SHOW_CHILD_TABLES:
+            if create_index_if_missing(f'ix_{table}_show_id', table, ['show_id']):
+                print(f'Added ix_{table}_show_id')
+    print('\nDone!')
@@ -0,0 +1,20 @@
+"""
+Migration: create the upload_sessions table for resumable video uploads.
+Idle sessions are cleaned up by the server, or with `flask expire-uploads`.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.models import UploadSession
+from app.utils.schema import create_table_if_missing
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        create_table_if_missing(UploadSession)
+        print('Created upload_sessions (if missing)')
+    print('\nDone!')
@@ -0,0 +1,23 @@
+"""
+Migration + backfill: create user_stats and the per-user artist/venue reference tables,
+then compute every user's dashboard totals from shows and media.
+Afterwards use `flask rebuild-user-stats` to repair any drift.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.models import UserStats, UserArtistRef, UserVenueRef, recompute_user_stats
+from app.utils.schema import create_table_if_missing
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        for model in (UserStats, UserArtistRef, UserVenueRef):
+            create_table_if_missing(model)
+        drifted = recompute_user_stats()
+        print(f'Computed stats ({drifted} users changed)')
+    print('\nDone!')
@@ -0,0 +1,74 @@
+"""
+Migration + backfill: move the JSON visibility/share lists into indexed association tables.
+- shows.visible_to (JSON array)       -> show_visibility rows + shows.visibility_restricted
+- show_checkins.share_with (JSON array) -> checkin_share rows + show_checkins.share_restricted
+Converted JSON values are cleared so the script is safe to re-run.
+"""
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import inspect, text
+
+from app import create_app
+from app.models import db, ShowVisibility, CheckinShare
+from app.utils.schema import create_table_if_missing, add_column_if_missing
+
+
+def migrate_schema():
+    """Step 1: Create association tables and restriction flags."""
+    create_table_if_missing(ShowVisibility)
+    create_table_if_missing(CheckinShare)
+    if add_column_if_missing('shows', 'visibility_restricted', 'BOOLEAN', default=0):
+        print('Added shows.visibility_restricted')
+    if add_column_if_missing('show_checkins', 'share_restricted', 'BOOLEAN', default=0):
+        print('Added show_checkins.share_restricted')
+
+
+def convert_json_column(table, json_column, id_column, flag_column, assoc_table, assoc_key):
+    """Step 2: Expand one JSON id-list column into association rows."""
+    columns = {c['name'] for c in inspect(db.engine).get_columns(table)}
+    if json_column not in columns:
+        print(f'{table}.{json_column} not present, nothing to convert')
+        return
+
+    rows = db.session.execute(text(
+        f'SELECT {id_column}, {json_column} FROM {table} WHERE {json_column} IS NOT NULL'
+    )).fetchall()
+
+    converted = 0
+    for row_id, raw in rows:
+        try:
+            user_ids = {int(uid) for uid in json.loads(raw)}
+        except (json.JSONDecodeError, TypeError, ValueError):
+            print(f'  {table} {row_id}: unreadable {json_column} {raw!r}, treating as unrestricted')
+            user_ids = None
+
+        db.session.execute(text(f'DELETE FROM {assoc_table} WHERE {assoc_key} = :id'), {'id': row_id})
+        if user_ids is not None:
+            for uid in user_ids:
+                db.session.execute(
+                    text(f'INSERT INTO {assoc_table} ({assoc_key}, user_id) VALUES (:id, :uid)'),
+                    {'id': row_id, 'uid': uid}
+                )
+        db.session.execute(
+            text(f'UPDATE {table} SET {flag_column} = :flag, {json_column} = NULL WHERE {id_column} = :id'),
+            {'flag': user_ids is not None, 'id': row_id}
+        )
+        converted += 1
+
+    db.session.commit()
+    print(f'Converted {converted} {table}.{json_column} values')
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        migrate_schema()
+        convert_json_column('shows', 'visible_to', 'id', 'visibility_restricted',
+                            'show_visibility', 'show_id')
+        convert_json_column('show_checkins', 'share_with', 'id', 'share_restricted',
+                            'checkin_share', 'checkin_id')
+    print('\nDone!')
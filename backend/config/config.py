@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -20,6 +21,75 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///sharemyshows.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Shared response cache (Flask-Caching). FileSystemCache is shared by every worker on
+    # one host; set CACHE_TYPE=RedisCache and CACHE_REDIS_URL to share across hosts.
+    CACHE_TYPE = os.getenv('CACHE_TYPE', 'FileSystemCache')
+    CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'sharemyshows-cache'))
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+    CACHE_THRESHOLD = int(os.getenv('CACHE_THRESHOLD', 20000))
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 6 * 60 * 60))  # seconds
+
+    # Friend graph cache (per process)
+    FRIEND_CACHE_MAX_USERS = int(os.getenv('FRIEND_CACHE_MAX_USERS', 10000))
+    FRIEND_CACHE_TTL = int(os.getenv('FRIEND_CACHE_TTL', 300))  # seconds
+
+    # Live location write-behind (GPS pings are held in memory and flushed in batches)
+    LIVE_LOCATION_FLUSH_INTERVAL = float(os.getenv('LIVE_LOCATION_FLUSH_INTERVAL', 5))  # seconds; max DB staleness
+    LIVE_LOCATION_MAX_PENDING = int(os.getenv('LIVE_LOCATION_MAX_PENDING', 1000))  # flush early past this many
+
+    # Socket.IO across worker processes: a Redis URL here lets N eventlet workers behind a
+    # sticky load balancer deliver each other's emits. Presence (online users, show chat
+    # members, friends-going status) follows it unless PRESENCE_URL says otherwise:
+    # memory:// for one process, local:// for the in-process stand-in, or a redis:// URL.
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    PRESENCE_URL = os.getenv('PRESENCE_URL', SOCKETIO_MESSAGE_QUEUE or 'memory://')
+    PRESENCE_SID_TTL = int(os.getenv('PRESENCE_SID_TTL', 90))  # shared sids lapse unless their worker's heartbeat renews them
+
+    # Chat history ring buffers (per process): messages kept per room, sent on a fresh join
+    CHAT_BUFFER_SIZE = int(os.getenv('CHAT_BUFFER_SIZE', 200))
+    CHAT_HISTORY_LIMIT = int(os.getenv('CHAT_HISTORY_LIMIT', 50))
+    CHAT_BUFFER_MAX_ROOMS = int(os.getenv('CHAT_BUFFER_MAX_ROOMS', 2000))  # least recently read rooms go first
+
+    # Chat group commit: messages are broadcast at once and written in batches
+    CHAT_FLUSH_INTERVAL = float(os.getenv('CHAT_FLUSH_INTERVAL', 0.01))  # seconds; 0 writes before broadcasting
+    CHAT_FLUSH_MAX_BATCH = int(os.getenv('CHAT_FLUSH_MAX_BATCH', 200))
+
+    # Typing indicators: broadcast on start/stop only, stopped after this long without a repeat
+    TYPING_TIMEOUT = float(os.getenv('TYPING_TIMEOUT', 6))  # seconds; clients repeat every 2
+    TYPING_RATE = float(os.getenv('TYPING_RATE', 1))  # typing events per second per connection
+    TYPING_BURST = int(os.getenv('TYPING_BURST', 5))
+    CONVERSATION_CACHE_SIZE = int(os.getenv('CONVERSATION_CACHE_SIZE', 10000))  # DM members cached per process
+
+    # Photo derivatives are rendered by a process pool after the upload returns
+    MEDIA_WORKERS = int(os.getenv('MEDIA_WORKERS', 2))  # worker processes; 0 renders inside the request
+    MEDIA_MAX_ATTEMPTS = int(os.getenv('MEDIA_MAX_ATTEMPTS', 3))
+    MEDIA_RETRY_DELAY = float(os.getenv('MEDIA_RETRY_DELAY', 2))  # seconds before the first retry, doubling
+    MEDIA_JOB_TIMEOUT = float(os.getenv('MEDIA_JOB_TIMEOUT', 120))  # seconds per attempt
+    MEDIA_WIDTHS = [int(w) for w in os.getenv('MEDIA_WIDTHS', '160,480,1080,2048').split(',')]  # variant ladder, px
+    MEDIA_QUALITY = int(os.getenv('MEDIA_QUALITY', 80))
+    MEDIA_AVIF = os.getenv('MEDIA_AVIF', 'True').lower() in ['true', '1', 'yes']  # when Pillow can write AVIF
+
+    # Media responses: ETag/304, Cache-Control, and optional hand-off of the bytes to the front server
+    MEDIA_MAX_AGE = int(os.getenv('MEDIA_MAX_AGE', 86400))  # seconds; resized copies are cached for a year
+    MEDIA_ACCEL = os.getenv('MEDIA_ACCEL', '')  # '', 'x-accel-redirect' (nginx) or 'x-sendfile'
+    MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/_media')  # internal location for X-Accel-Redirect
+    MEDIA_RANGE_CHUNK = int(os.getenv('MEDIA_RANGE_CHUNK', 8 << 20))  # most bytes sent for one Range request
+    MEDIA_STREAM_BLOCK = int(os.getenv('MEDIA_STREAM_BLOCK', 64 << 10))  # read size while streaming a file
+
+    # Resumable video uploads (POST /api/videos/uploads, then PATCH chunks)
+    MEDIA_UPLOAD_MAX_SIZE = int(os.getenv('MEDIA_UPLOAD_MAX_SIZE', 4 << 30))  # bytes per video
+    MEDIA_UPLOAD_EXPIRY = int(os.getenv('MEDIA_UPLOAD_EXPIRY', 86400))  # seconds an idle upload is kept
+    MEDIA_UPLOAD_BLOCK = int(os.getenv('MEDIA_UPLOAD_BLOCK', 1 << 20))  # bytes read from a chunk at a time
+    MEDIA_UPLOAD_SWEEP_INTERVAL = int(os.getenv('MEDIA_UPLOAD_SWEEP_INTERVAL', 3600))  # seconds between sweeps; 0 disables
+
+    # Per-request SQL profiling (Server-Timing header + /api/_debug/requests)
+    SQL_PROFILING = os.getenv('SQL_PROFILING', 'False').lower() in ['true', '1', 'yes']
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', 5))  # same-shape statements per request
+    SQL_PROFILE_BUFFER_SIZE = int(os.getenv('SQL_PROFILE_BUFFER_SIZE', 200))
+
+    # Users allowed to call admin-only endpoints (comma-separated user IDs)
+    ADMIN_USER_IDS = [int(uid) for uid in os.getenv('ADMIN_USER_IDS', '').split(',') if uid.strip()]
+
     # CORS
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')
     
@@ -49,6 +119,7 @@ class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     TESTING = False
+    SQL_PROFILING = os.getenv('SQL_PROFILING', 'True').lower() in ['true', '1', 'yes']
 
 
 class ProductionConfig(Config):
@@ -61,7 +132,15 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
+    DEBUG = False  # debug mode pretty-prints every JSON response, which the benchmarks would time
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    CACHE_TYPE = 'SimpleCache'  # in-memory DB per run; never reuse entries from a shared dir
+    LIVE_LOCATION_FLUSH_INTERVAL = 0  # write through, so tests read back what they wrote
+    CHAT_FLUSH_INTERVAL = 0
+    MEDIA_WORKERS = 0
+    MEDIA_UPLOAD_SWEEP_INTERVAL = 0  # no background sweep of the working directory's uploads/
+    SOCKETIO_MESSAGE_QUEUE = None
+    PRESENCE_URL = 'local://'  # shared-registry code path without a Redis server
 
 
 # Configuration dictionary
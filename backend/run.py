@@ -6,6 +6,8 @@ import eventlet
 eventlet.monkey_patch()
 
 import logging
+import signal
+import sys
 
 # Suppress the known werkzeug 3.x + eventlet WebSocket upgrade error.
 # The socket.io client retries with polling transport and works fine.
@@ -19,10 +21,14 @@ class _SuppressWerkzeugWsError(logging.Filter):
 logging.getLogger('werkzeug').addFilter(_SuppressWerkzeugWsError())
 
 from app import create_app, socketio
+from app.utils.media_pipeline import media_pipeline
 
 # Create the Flask app
 app = create_app()
 
+# Exit normally on SIGTERM so the atexit flushes (queued chat messages, live locations) run
+signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
 if __name__ == '__main__':
     # Get configuration
     host = app.config.get('HOST', '0.0.0.0')
@@ -45,12 +51,16 @@ if __name__ == '__main__':
     """)
     
     # Run with SocketIO
-    socketio.run(
-        app,
-        host=host,
-        port=port,
-        debug=debug,
-        use_reloader=debug,
-        log_output=True,
-        allow_unsafe_werkzeug=True
-    )
+    try:
+        socketio.run(
+            app,
+            host=host,
+            port=port,
+            debug=debug,
+            use_reloader=debug,
+            log_output=True,
+            allow_unsafe_werkzeug=True
+        )
+    finally:
+        # Stop the photo processing workers while the event loop can still wait for them
+        media_pipeline.shutdown()
@@ -0,0 +1,60 @@
+"""
+Benchmark fixtures
+One synthetic dataset is seeded per session (sizes from BENCH_USERS / BENCH_SHOWS) and
+every test drives the API as its busiest user. Latency budget results (`pytest -m benchmark`)
+are collected and written to BENCH_RESULTS_DIR (default tests/benchmarks/results) at the
+end of the session.
+"""
+import os
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.models import db
+from app.utils.synthetic import seed_synthetic
+from tests.benchmarks.load_driver import pick_targets, write_results
+
+BENCH_USERS = int(os.getenv('BENCH_USERS', 300))
+BENCH_SHOWS = int(os.getenv('BENCH_SHOWS', 10000))
+BENCH_SEED = int(os.getenv('BENCH_SEED', 1))
+BENCH_REQUESTS = int(os.getenv('BENCH_REQUESTS', 50))
+BENCH_LATENCY_SCALE = float(os.getenv('BENCH_LATENCY_SCALE', 1.0))  # loosen p95 budgets on slow machines
+BENCH_RESULTS_DIR = os.getenv('BENCH_RESULTS_DIR', os.path.join(os.path.dirname(__file__), 'results'))
+
+
+@pytest.fixture(scope='session')
+def bench_app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        seed_synthetic(users=BENCH_USERS, shows=BENCH_SHOWS, seed=BENCH_SEED, log=lambda msg: None)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture(scope='session')
+def bench_targets(bench_app):
+    return pick_targets(db)
+
+
+@pytest.fixture(scope='session')
+def bench_client(bench_app):
+    return bench_app.test_client()
+
+
+@pytest.fixture(scope='session')
+def bench_headers(bench_targets):
+    return {'Authorization': f"Bearer {create_access_token(identity=str(bench_targets['user_id']))}"}
+
+
+@pytest.fixture(scope='session')
+def bench_results():
+    results = {}
+    yield results
+    if results:
+        path = write_results(results, BENCH_RESULTS_DIR, meta={
+            'users': BENCH_USERS, 'shows': BENCH_SHOWS, 'seed': BENCH_SEED, 'requests': BENCH_REQUESTS,
+        })
+        print(f'\nBenchmark results written to {path}')
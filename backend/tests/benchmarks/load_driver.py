@@ -0,0 +1,179 @@
+"""
+Pure-Python load driver for the REST API
+Replays requests against the Flask test client, recording per-request latency and SQL
+query count, and summarises them as percentiles. Used by the benchmark tests, and
+runnable on its own against a freshly seeded in-memory database:
+
+    python -m tests.benchmarks.load_driver --users 300 --shows 10000 --requests 100
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Hot REST paths with their budgets: (name, path template, max queries per request, p95 ms).
+# Paths are formatted with the ids returned by pick_targets(). /api/shows is unpaginated and
+# returns every show of the busiest user (~1600 at the default size), hence its larger budget.
+HOT_ENDPOINTS = [
+    ('shows_list', '/api/shows', 2, 400),
+    ('shows_feed_page', '/api/shows/feed', 3, 100),
+    ('shows_feed_cursor', '/api/shows/feed?after=', 2, 100),
+    ('show_detail', '/api/shows/{show_id}', 12, 100),
+    ('dashboard_stats', '/api/dashboard/stats', 1, 25),
+    ('dashboard_artists', '/api/dashboard/artists', 2, 100),
+    ('dashboard_venues', '/api/dashboard/venues', 2, 100),
+    ('dashboard_activity', '/api/dashboard/activity', 1, 100),
+    ('dashboard_recent_photos', '/api/dashboard/photos/recent', 1, 50),
+    ('dm_conversations', '/api/dm/conversations', 4, 100),
+    ('notifications', '/api/notifications', 3, 100),
+    ('friends', '/api/friends', 2, 100),
+]
+
+
+class QueryCounter:
+    """Counts statements sent to the database while active."""
+
+    def __init__(self):
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    @contextmanager
+    def counting(self):
+        self.count = 0
+        event.listen(Engine, 'before_cursor_execute', self._on_execute)
+        try:
+            yield self
+        finally:
+            event.remove(Engine, 'before_cursor_execute', self._on_execute)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def drive(client, path, headers=None, requests=50, warmup=5, method='GET'):
+    """Issue `requests` calls to one path and return a latency/query summary dict."""
+    for _ in range(warmup):
+        client.open(path, method=method, headers=headers)
+
+    counter = QueryCounter()
+    latencies = []
+    queries = []
+    statuses = {}
+    for _ in range(requests):
+        with counter.counting():
+            started = time.perf_counter()
+            response = client.open(path, method=method, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    return {
+        'path': path,
+        'method': method,
+        'requests': requests,
+        'statuses': {str(code): n for code, n in sorted(statuses.items())},
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(max(latencies), 3),
+        'queries_max': max(queries),
+        'queries_mean': round(sum(queries) / len(queries), 2),
+    }
+
+
+def pick_targets(db):
+    """The busiest user (most shows) and one of their shows, used as the benchmark subject."""
+    from app.models import Show
+    user_id, _ = db.session.query(Show.user_id, db.func.count(Show.id))\
+        .group_by(Show.user_id)\
+        .order_by(db.func.count(Show.id).desc())\
+        .first()
+    show_id = db.session.query(Show.id).filter(Show.user_id == user_id)\
+        .order_by(Show.date.desc()).limit(1).scalar()
+    return {'user_id': user_id, 'show_id': show_id}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def write_results(results, directory, meta=None):
+    """Write one JSON file per run, named by time and git revision, for cross-commit comparison."""
+    os.makedirs(directory, exist_ok=True)
+    revision = git_revision()
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    path = os.path.join(directory, f'{stamp}_{revision}.json')
+    with open(path, 'w') as f:
+        json.dump({
+            'revision': revision,
+            'created_at': stamp,
+            'meta': meta or {},
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Drive the hot REST endpoints and report latency/query budgets')
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(__file__), 'results'))
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.models import db
+    from app.utils.synthetic import seed_synthetic
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        seed_synthetic(users=args.users, shows=args.shows, seed=args.seed, log=lambda msg: None)
+        targets = pick_targets(db)
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(targets['user_id']))}"}
+        client = app.test_client()
+
+        results = {}
+        failed = False
+        print(f"{'endpoint':28} {'p50':>8} {'p95':>8} {'queries':>8}  budget")
+        for name, template, max_queries, p95_budget in HOT_ENDPOINTS:
+            summary = drive(client, template.format(**targets), headers, requests=args.requests)
+            summary['budget'] = {'queries': max_queries, 'p95_ms': p95_budget}
+            results[name] = summary
+            ok = summary['queries_max'] <= max_queries and summary['p95_ms'] <= p95_budget
+            failed = failed or not ok
+            print(f"{name:28} {summary['p50_ms']:8.1f} {summary['p95_ms']:8.1f} {summary['queries_max']:8}  "
+                  f"{'ok' if ok else 'OVER'} ({max_queries}q / {p95_budget}ms)")
+
+    path = write_results(results, args.output, meta={'users': args.users, 'shows': args.shows, 'seed': args.seed})
+    print(f'\nResults written to {path}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
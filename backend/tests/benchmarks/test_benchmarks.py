@@ -0,0 +1,21 @@
+"""
+pytest-benchmark timings for the hot REST paths
+Compare runs with `pytest tests/benchmarks -m benchmark --benchmark-autosave` and
+`pytest-benchmark compare`.
+"""
+import pytest
+
+from tests.benchmarks.load_driver import HOT_ENDPOINTS
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('template', [pytest.param(t, id=name) for name, t, _, _ in HOT_ENDPOINTS])
+def test_endpoint_timing(benchmark, bench_client, bench_headers, bench_targets, template):
+    path = template.format(**bench_targets)
+    response = benchmark.pedantic(
+        bench_client.get, args=(path,), kwargs={'headers': bench_headers},
+        rounds=20, warmup_rounds=2
+    )
+    assert response.status_code == 200
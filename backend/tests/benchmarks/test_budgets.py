@@ -0,0 +1,34 @@
+"""
+Per-endpoint SQL query and p95 latency budgets for the hot REST paths
+Query budgets are deterministic and run with the default suite; latency budgets depend
+on the machine, so they are marked `benchmark` and only run with `pytest -m benchmark`.
+"""
+import pytest
+
+from tests.benchmarks.conftest import BENCH_REQUESTS, BENCH_LATENCY_SCALE
+from tests.benchmarks.load_driver import HOT_ENDPOINTS, drive
+
+# Requests per endpoint for the query budgets; counts do not vary between requests
+QUERY_REQUESTS = 5
+
+
+@pytest.mark.parametrize('template, max_queries',
+                         [pytest.param(t, q, id=name) for name, t, q, _ in HOT_ENDPOINTS])
+def test_query_budget(bench_client, bench_headers, bench_targets, template, max_queries):
+    summary = drive(bench_client, template.format(**bench_targets), bench_headers, requests=QUERY_REQUESTS)
+
+    assert summary['statuses'] == {'200': QUERY_REQUESTS}
+    assert summary['queries_max'] <= max_queries, f"{summary['queries_max']} queries (budget {max_queries})"
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('template, max_queries, p95_ms',
+                         [pytest.param(t, q, ms, id=name) for name, t, q, ms in HOT_ENDPOINTS])
+def test_latency_budget(request, bench_client, bench_headers, bench_targets, bench_results,
+                        template, max_queries, p95_ms):
+    summary = drive(bench_client, template.format(**bench_targets), bench_headers, requests=BENCH_REQUESTS)
+    summary['budget'] = {'queries': max_queries, 'p95_ms': p95_ms * BENCH_LATENCY_SCALE}
+    bench_results[request.node.callspec.id] = summary
+
+    assert summary['statuses'] == {'200': BENCH_REQUESTS}
+    assert summary['p95_ms'] <= p95_ms * BENCH_LATENCY_SCALE, f"p95 {summary['p95_ms']}ms (budget {p95_ms}ms)"
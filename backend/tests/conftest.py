@@ -0,0 +1,57 @@
+"""
+Shared test fixtures
+One app is built per session; each test that asks for `database` gets fresh tables and
+empty per-process stores (friend cache, presence, live locations, chat buffers).
+"""
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.models import db, User, Friendship
+from app.utils.chat_history import chat_history
+from app.utils.friend_cache import friend_cache
+from app.utils.live_locations import live_locations
+from app.utils.presence import presence
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app('testing')
+
+
+@pytest.fixture
+def database(app):
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+        friend_cache.clear()
+        live_locations.clear()
+        chat_history.clear()
+        presence.reset()
+
+
+@pytest.fixture
+def client(app, database):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(database):
+    def make(username):
+        user = User(username=username, email=f'{username}@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+
+def befriend(user, friend):
+    db.session.add(Friendship(user_id=user.id, friend_id=friend.id, status='accepted'))
+    db.session.commit()
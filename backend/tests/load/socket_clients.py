@@ -0,0 +1,278 @@
+"""
+Socket.IO client worker for the load harness
+Runs one green thread per simulated concertgoer. Each client connects with its JWT,
+joins its own show (and sometimes a friend's sibling show), then until the deadline
+streams GPS updates on a fixed period, chats and toggles appear-offline at random
+(exponential) intervals; with --typing-time each message is preceded by that many seconds
+of `typing` events repeated every 2 seconds, as the frontend sends them. Round trips are
+timed from emit to the server's reply:
+
+    connect          -> 'connected'
+    join_show        -> 'active_users'
+    send_message     -> own 'new_message' echo
+    set_appear_offline -> 'appear_offline_updated'
+    update_location  -> 'location_update' at a friend handled by this same worker
+
+Started by tests.load.socket_load with a JSON plan; writes raw latencies as JSON.
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import json
+import random
+import time
+
+import socketio
+
+TYPING_REPEAT = 2  # seconds between repeated typing events, as the frontend sends them
+
+EVENTS = ('connect', 'join_show', 'send_message', 'set_appear_offline', 'location_fanout')
+
+
+class WorkerStats:
+    """Latencies and counters shared by every client in this worker."""
+
+    def __init__(self):
+        self.latencies = {name: [] for name in EVENTS}
+        self.sent = {'connect': 0}
+        self.errors = {}
+        self.location_sent_at = {}  # (user_id, latitude) -> send time
+        self.unmatched_locations = 0
+        self.received = 0
+        self.typing_received = 0
+        self.connect_failures = 0
+
+    def record(self, name, started):
+        self.latencies[name].append(round((time.perf_counter() - started) * 1000, 3))
+
+    def error(self, message):
+        self.errors[message] = self.errors.get(message, 0) + 1
+
+
+class LoadClient:
+    """One simulated user holding one Socket.IO connection."""
+
+    def __init__(self, spec, url, stats, args, rng):
+        self.user_id = spec['user_id']
+        self.token = spec['token']
+        self.show_id = spec['show_id']
+        self.visit_show_id = spec.get('visit_show_id')
+        self.latitude, self.longitude = spec['latitude'], spec['longitude']
+        self.url = url
+        self.stats = stats
+        self.args = args
+        self.rng = rng
+        self.sio = socketio.Client(reconnection=False)
+        self.pending = {}  # pending key -> send time
+        self.gps_seq = 0
+        self.chat_seq = 0
+        self.offline = False
+        self._register()
+
+    def _register(self):
+        sio, stats = self.sio, self.stats
+
+        @sio.on('connected')
+        def on_connected(data):
+            self._resolve('connect', 'connect')
+
+        @sio.on('active_users')
+        def on_active_users(data):
+            # join_show answers each join with one active_users event, in order
+            key = next((k for k in self.pending if k[0] == 'join_show'), None)
+            if key:
+                self._resolve(key, 'join_show')
+
+        @sio.on('new_message')
+        def on_new_message(data):
+            stats.received += 1
+            if data.get('user_id') == self.user_id:
+                self._resolve(('send_message', data.get('message')), 'send_message')
+
+        @sio.on('appear_offline_updated')
+        def on_appear_offline(data):
+            self._resolve(('set_appear_offline', data.get('appear_offline')), 'set_appear_offline')
+
+        @sio.on('location_update')
+        def on_location_update(data):
+            stats.received += 1
+            started = stats.location_sent_at.get((data.get('user_id'), data.get('latitude')))
+            if started is None:
+                stats.unmatched_locations += 1
+            else:
+                stats.record('location_fanout', started)
+
+        @sio.on('user_typing')
+        def on_user_typing(data):
+            stats.received += 1
+            stats.typing_received += 1
+
+        @sio.on('*')
+        def on_other(event, data=None):
+            stats.received += 1
+
+        @sio.on('error')
+        def on_error(data):
+            stats.error((data or {}).get('message', 'unknown'))
+
+    def _send(self, event, payload, key=None):
+        """Emit an event; with a key, its reply is awaited and timed."""
+        if key is not None:
+            self.pending[key] = time.perf_counter()
+        self.stats.sent[event] = self.stats.sent.get(event, 0) + 1
+        self.sio.emit(event, payload)
+
+    def _resolve(self, key, name):
+        started = self.pending.pop(key, None)
+        if started is not None:
+            self.stats.record(name, started)
+
+    def connect(self):
+        self.pending['connect'] = time.perf_counter()
+        self.stats.sent['connect'] += 1
+        try:
+            self.sio.connect(f'{self.url}?token={self.token}', transports=[self.args.transport],
+                             wait_timeout=self.args.timeout)
+        except Exception as e:
+            self.pending.pop('connect', None)
+            self.stats.connect_failures += 1
+            self.stats.error(f'connect failed: {type(e).__name__}')
+            return False
+        return True
+
+    def join(self, show_id):
+        self._send('join_show', {'show_id': show_id, 'chat_scope': self.args.chat_scope},
+                   key=('join_show', show_id))
+
+    def send_gps(self):
+        # A few metres of drift per update; the sequence makes each latitude unique
+        self.gps_seq += 1
+        latitude = round(self.latitude + self.rng.uniform(-5e-5, 5e-5), 6) + self.gps_seq * 1e-9
+        longitude = self.longitude + self.rng.uniform(-5e-5, 5e-5)
+        self.stats.location_sent_at[(self.user_id, latitude)] = time.perf_counter()
+        self._send('update_location', {'show_id': self.show_id, 'latitude': latitude, 'longitude': longitude})
+
+    def send_chat(self):
+        self.chat_seq += 1
+        message = f'load {self.user_id}-{self.chat_seq}'
+        self._send('send_message', {'show_id': self.show_id, 'message': message,
+                                    'chat_scope': self.args.chat_scope},
+                   key=('send_message', message))
+
+    def send_typing(self):
+        self._send('typing', {'show_id': self.show_id, 'is_typing': True,
+                              'chat_scope': self.args.chat_scope})
+
+    def toggle_offline(self):
+        self.offline = not self.offline
+        self._send('set_appear_offline', {'appear_offline': self.offline},
+                   key=('set_appear_offline', self.offline))
+
+    def _next(self, mean):
+        return time.time() + self.rng.expovariate(1 / mean) if mean > 0 else float('inf')
+
+    def _typing_start(self, chat_at, now):
+        # Typing fills the typing_time before each message, starting no earlier than now
+        if self.args.typing_time <= 0 or chat_at == float('inf'):
+            return float('inf')
+        return max(now, chat_at - self.args.typing_time)
+
+    def run(self, deadline):
+        if not self.connect():
+            return
+        self.join(self.show_id)
+        if self.visit_show_id:
+            self.join(self.visit_show_id)
+
+        args = self.args
+        now = time.time()
+        next_gps = now + self.rng.uniform(0, args.gps_interval) if args.gps_interval > 0 else float('inf')
+        next_chat = self._next(args.chat_interval)
+        next_toggle = self._next(args.offline_interval)
+        next_typing = self._typing_start(next_chat, now)
+        try:
+            while True:
+                wake = min(next_gps, next_chat, next_typing, next_toggle, deadline)
+                eventlet.sleep(max(0, wake - time.time()))
+                now = time.time()
+                if now >= deadline or not self.sio.connected:
+                    break
+                if now >= next_gps:
+                    self.send_gps()
+                    next_gps += args.gps_interval
+                if now >= next_typing:
+                    self.send_typing()
+                    next_typing += TYPING_REPEAT
+                    if next_typing >= next_chat:
+                        next_typing = float('inf')
+                if now >= next_chat:
+                    self.send_chat()
+                    next_chat = self._next(args.chat_interval)
+                    next_typing = self._typing_start(next_chat, now)
+                if now >= next_toggle:
+                    self.toggle_offline()
+                    # Come back online after a short while rather than waiting a full interval
+                    next_toggle = now + self.rng.uniform(5, 30) if self.offline else self._next(args.offline_interval)
+        finally:
+            # Give in-flight replies a moment before hanging up
+            eventlet.sleep(min(args.timeout, 1))
+            if self.sio.connected:
+                self.sio.disconnect()
+
+    def timed_out(self):
+        cutoff = time.perf_counter() - self.args.timeout
+        return sum(1 for started in self.pending.values() if started < cutoff)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Socket.IO load client worker')
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--plan', required=True, help='JSON list of client specs')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--start-at', type=float, default=0, help='Epoch time to begin connecting')
+    parser.add_argument('--ramp', type=float, default=30, help='Seconds over which clients connect')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds of traffic after the ramp')
+    parser.add_argument('--gps-interval', type=float, default=20)
+    parser.add_argument('--chat-interval', type=float, default=60)
+    parser.add_argument('--offline-interval', type=float, default=600)
+    parser.add_argument('--typing-time', type=float, default=0, help='Seconds of typing before each message')
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--transport', default='websocket', choices=['websocket', 'polling'])
+    parser.add_argument('--chat-scope', default='show', choices=['show', 'concert'])
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with open(args.plan) as f:
+        specs = json.load(f)
+
+    stats = WorkerStats()
+    rng = random.Random(args.seed)
+    start_at = max(args.start_at, time.time())
+    deadline = start_at + args.ramp + args.duration
+    clients = [LoadClient(spec, args.url, stats, args, random.Random(rng.random())) for spec in specs]
+
+    eventlet.sleep(max(0, start_at - time.time()))
+    pool = eventlet.GreenPool(len(clients) + 1)
+    step = args.ramp / max(1, len(clients))
+    for client in clients:
+        pool.spawn_n(client.run, deadline)
+        eventlet.sleep(step)
+    pool.waitall()
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'clients': len(clients),
+            'latencies_ms': stats.latencies,
+            'sent': stats.sent,
+            'timeouts': sum(client.timed_out() for client in clients),
+            'errors': stats.errors,
+            'connect_failures': stats.connect_failures,
+            'received': stats.received,
+            'typing_received': stats.typing_received,
+            'unmatched_locations': stats.unmatched_locations,
+        }, f)
+
+
+if __name__ == '__main__':
+    main()
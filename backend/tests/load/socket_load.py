@@ -0,0 +1,390 @@
+"""
+Socket.IO load harness for the live-show paths (join_show, update_location, send_message,
+set_appear_offline). Seeds a database with a few big concerts whose attendees each own a
+sibling show and have friends at the same concert, starts the eventlet server
+(tests.load.socket_server), then drives thousands of python-socketio clients from
+worker processes (tests.load.socket_clients) and reports:
+
+- event round-trip latency percentiles per event type
+- server CPU and resident memory, sampled every second
+- DB commit and statement rates
+
+    python -m tests.load.socket_load --clients 2000 --concerts 4 --duration 120
+
+GPS defaults to the frontend's 20 second cadence; pass --gps-interval 5 to stress it.
+Results are written as JSON to tests/load/results (one file per run, named by git revision).
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from tests.benchmarks.load_driver import percentile, write_results  # noqa: E402
+
+LATENCY_EVENTS = ('connect', 'join_show', 'send_message', 'set_appear_offline', 'location_fanout')
+
+# Concert venues are spread over a few real cities so GPS traffic looks plausible
+VENUE_COORDS = [
+    (40.7505, -73.9934), (34.0430, -118.2673), (41.8807, -87.6742), (30.2669, -97.7428),
+    (39.7487, -105.0077), (36.1593, -86.7785), (47.6221, -122.3540), (33.7573, -84.3963),
+]
+
+
+def seed_scenario(db, clients, concerts, avg_friends, visit_rate, seed):
+    """Create `clients` users split across `concerts` tonight-concerts, one show each, with
+    accepted friendships among attendees of the same concert. Returns the client specs."""
+    from flask_jwt_extended import create_access_token
+    from werkzeug.security import generate_password_hash
+    from app.models import User, Artist, Venue, Concert, Show, Friendship
+    from app.utils.synthetic import SYNTHETIC_PASSWORD
+
+    rng = random.Random(seed)
+    today = date.today()
+
+    def next_id(model):
+        return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+    def insert(model, rows):
+        if rows:
+            db.session.execute(model.__table__.insert(), rows)
+
+    first_artist, first_venue, first_concert = next_id(Artist), next_id(Venue), next_id(Concert)
+    insert(Artist, [{'id': first_artist + i, 'name': f'Load Test Headliner {seed}-{i}'} for i in range(concerts)])
+    insert(Venue, [{'id': first_venue + i, 'name': f'Load Test Arena {seed}-{i}', 'city': 'Load', 'state': 'LT'}
+                   for i in range(concerts)])
+    insert(Concert, [{'id': first_concert + i, 'artist_id': first_artist + i, 'venue_id': first_venue + i,
+                      'date': today} for i in range(concerts)])
+
+    password_hash = generate_password_hash(SYNTHETIC_PASSWORD)
+    first_user, first_show = next_id(User), next_id(Show)
+    users, shows, attendees = [], [], {i: [] for i in range(concerts)}
+    for n in range(clients):
+        uid, show_id, concert = first_user + n, first_show + n, n % concerts
+        users.append({'id': uid, 'username': f'load_{seed}_{uid}', 'email': f'load_{seed}_{uid}@example.com',
+                      'password_hash': password_hash, 'email_verified': True, 'appear_offline': False})
+        shows.append({'id': show_id, 'user_id': uid, 'artist_id': first_artist + concert,
+                      'venue_id': first_venue + concert, 'concert_id': first_concert + concert, 'date': today})
+        attendees[concert].append((uid, show_id))
+    insert(User, users)
+    insert(Show, shows)
+
+    # Random friendships inside each concert's crowd
+    friends = {uid: set() for uid in range(first_user, first_user + clients)}
+    for crowd in attendees.values():
+        uids = [uid for uid, _ in crowd]
+        for uid in uids:
+            for other in rng.sample(uids, min(len(uids), max(1, avg_friends // 2) + 1)):
+                if other != uid:
+                    friends[uid].add(other)
+                    friends[other].add(uid)
+    friendship_id = next_id(Friendship)
+    rows = []
+    for uid, others in friends.items():
+        for other in others:
+            if uid < other:
+                rows.append({'id': friendship_id, 'user_id': uid, 'friend_id': other, 'status': 'accepted'})
+                friendship_id += 1
+    insert(Friendship, rows)
+    db.session.commit()
+
+    show_of = {uid: show_id for crowd in attendees.values() for uid, show_id in crowd}
+    specs = []
+    for concert, crowd in attendees.items():
+        latitude, longitude = VENUE_COORDS[concert % len(VENUE_COORDS)]
+        for uid, show_id in crowd:
+            visit = None
+            if friends[uid] and rng.random() < visit_rate:
+                visit = show_of[rng.choice(sorted(friends[uid]))]
+            specs.append({
+                'user_id': uid, 'show_id': show_id, 'visit_show_id': visit, 'concert': concert,
+                'latitude': latitude + rng.uniform(-5e-4, 5e-4), 'longitude': longitude + rng.uniform(-5e-4, 5e-4),
+                'token': create_access_token(identity=str(uid)),
+            })
+    return specs, len(rows)
+
+
+def raise_fd_limit():
+    """Every client holds a socket in a worker and in the server; lift the soft limit to the hard one."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+class ServerSampler(threading.Thread):
+    """Polls /_load/stats once a second and keeps the samples."""
+
+    def __init__(self, url, interval=1.0):
+        super().__init__(daemon=True)
+        self.url = f'{url}/_load/stats'
+        self.interval = interval
+        self.samples = []
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                self.samples.append(requests.get(self.url, timeout=5).json())
+            except requests.RequestException:
+                pass
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+    def summary(self):
+        """CPU %, RSS and DB rates between consecutive samples."""
+        if len(self.samples) < 2:
+            return {}
+        cpu, commits, writes, reads = [], [], [], []
+        for before, after in zip(self.samples, self.samples[1:]):
+            elapsed = after['time'] - before['time']
+            if elapsed <= 0:
+                continue
+            cpu.append((after['cpu_seconds'] - before['cpu_seconds']) / elapsed * 100)
+            commits.append((after['db']['commits'] - before['db']['commits']) / elapsed)
+            writes.append((after['db']['writes'] - before['db']['writes']) / elapsed)
+            reads.append((after['db']['reads'] - before['db']['reads']) / elapsed)
+        first, last = self.samples[0], self.samples[-1]
+        elapsed = last['time'] - first['time']
+        rss = [s['rss_bytes'] / 2 ** 20 for s in self.samples]
+
+        def rate(values):
+            return {'mean': round(sum(values) / len(values), 2), 'p95': round(percentile(values, 95), 2),
+                    'max': round(max(values), 2)}
+
+        return {
+            'seconds': round(elapsed, 1),
+            'cpu_percent': rate(cpu),
+            'rss_mb': {'start': round(rss[0], 1), 'max': round(max(rss), 1), 'end': round(rss[-1], 1)},
+            'commits_per_sec': rate(commits),
+            'writes_per_sec': rate(writes),
+            'reads_per_sec': rate(reads),
+            'totals': {key: last['db'][key] - first['db'][key] for key in last['db']},
+        }
+
+
+def wait_for_server(url, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Load server exited with status {process.returncode}')
+        try:
+            if requests.get(f'{url}/_load/stats', timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError('Load server did not come up')
+
+
+def partition(specs, workers):
+    """Contiguous chunks ordered by concert, so friends mostly share a worker and
+    location fan-out can be matched against the sender's clock."""
+    ordered = sorted(specs, key=lambda s: s['concert'])
+    size = -(-len(ordered) // workers)
+    return [ordered[i:i + size] for i in range(0, len(ordered), size)]
+
+
+def summarise_latencies(worker_results):
+    merged = {name: [] for name in LATENCY_EVENTS}
+    for result in worker_results:
+        for name, values in result['latencies_ms'].items():
+            merged.setdefault(name, []).extend(values)
+    summary = {}
+    for name, values in merged.items():
+        if not values:
+            summary[name] = {'count': 0}
+            continue
+        summary[name] = {
+            'count': len(values),
+            'p50_ms': round(percentile(values, 50), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+            'max_ms': round(max(values), 2),
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Socket.IO load test for the live-show event handlers')
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--concerts', type=int, default=4, help='Concerts the clients are split across')
+    parser.add_argument('--avg-friends', type=int, default=20, help='Friends per client at the same concert')
+    parser.add_argument('--visit-rate', type=float, default=0.25, help="Share of clients also joining a friend's show")
+    parser.add_argument('--background-users', type=int, default=0, help='Extra seed-synthetic users to load first')
+    parser.add_argument('--background-shows', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=max(1, min(8, (os.cpu_count() or 2) - 1)),
+                        help='Client worker processes')
+    parser.add_argument('--ramp', type=float, default=30, help='Seconds over which clients connect')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds of steady traffic after the ramp')
+    parser.add_argument('--gps-interval', type=float, default=20, help='Seconds between GPS updates per client')
+    parser.add_argument('--chat-interval', type=float, default=60, help='Mean seconds between chat messages')
+    parser.add_argument('--typing-time', type=float, default=0,
+                        help='Seconds of typing events (repeated every 2s) before each chat message')
+    parser.add_argument('--offline-interval', type=float, default=600,
+                        help='Mean seconds between appear-offline toggles (0 disables)')
+    parser.add_argument('--timeout', type=float, default=10, help='Seconds before a reply counts as lost')
+    parser.add_argument('--transport', default='websocket', choices=['websocket', 'polling'])
+    parser.add_argument('--chat-scope', default='show', choices=['show', 'concert'],
+                        help="'concert' sends chat to the concert-wide room shared by sibling shows")
+    parser.add_argument('--presence-url', default='memory://',
+                        help="Presence registry for the server: memory://, local:// or a redis:// URL")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--database-url', help='Defaults to a fresh SQLite file in the run directory')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(__file__), 'results'))
+    parser.add_argument('--keep', action='store_true', help='Keep the run directory (database, logs, plans)')
+    args = parser.parse_args(argv)
+
+    raise_fd_limit()
+    run_dir = tempfile.mkdtemp(prefix='sharemyshows-load-')
+    url = f'http://127.0.0.1:{args.port}'
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': args.database_url or f"sqlite:///{os.path.join(run_dir, 'load.db')}",
+        'SQL_PROFILING': 'False',
+        'CACHE_TYPE': 'SimpleCache',
+        'DEBUG': 'False',
+        'PRESENCE_URL': args.presence_url,
+        # websocket-client sends an Origin header, which must pass the CORS check
+        'CORS_ORIGINS': ','.join([url, os.environ.get('CORS_ORIGINS', 'http://localhost:3000')]),
+        'PYTHONPATH': BACKEND_DIR,
+    })
+    os.environ.update({key: env[key] for key in ('DATABASE_URL', 'SQL_PROFILING', 'CACHE_TYPE', 'DEBUG')})
+
+    from app import create_app
+    from app.models import db
+    from app.utils.synthetic import seed_synthetic
+
+    print(f'Seeding {args.clients} clients across {args.concerts} concerts in {run_dir}')
+    app = create_app('development')
+    with app.app_context():
+        db.create_all()
+        if args.background_shows:
+            seed_synthetic(users=args.background_users or max(100, args.background_shows // 100),
+                           shows=args.background_shows, seed=args.seed, log=lambda msg: None)
+        specs, friendships = seed_scenario(db, args.clients, args.concerts, args.avg_friends,
+                                           args.visit_rate, args.seed)
+        db.session.remove()
+        db.engine.dispose()
+
+    server_log = open(os.path.join(run_dir, 'server.log'), 'w')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'tests.load.socket_server', '--port', str(args.port)],
+        cwd=BACKEND_DIR, env=env, stdout=server_log, stderr=subprocess.STDOUT
+    )
+    workers = []
+    try:
+        wait_for_server(url, server)
+        sampler = ServerSampler(url)
+        sampler.start()
+
+        start_at = time.time() + 2
+        chunks = partition(specs, max(1, min(args.workers, len(specs))))
+        print(f'Driving {len(specs)} clients from {len(chunks)} workers: {args.ramp:.0f}s ramp + '
+              f'{args.duration:.0f}s steady ({args.transport})')
+        for n, chunk in enumerate(chunks):
+            plan = os.path.join(run_dir, f'plan_{n}.json')
+            with open(plan, 'w') as f:
+                json.dump(chunk, f)
+            workers.append((subprocess.Popen([
+                sys.executable, '-m', 'tests.load.socket_clients',
+                '--url', url, '--plan', plan, '--output', os.path.join(run_dir, f'result_{n}.json'),
+                '--start-at', str(start_at), '--ramp', str(args.ramp), '--duration', str(args.duration),
+                '--gps-interval', str(args.gps_interval), '--chat-interval', str(args.chat_interval),
+                '--offline-interval', str(args.offline_interval), '--typing-time', str(args.typing_time),
+                '--timeout', str(args.timeout),
+                '--transport', args.transport, '--chat-scope', args.chat_scope, '--seed', str(args.seed + n),
+            ], cwd=BACKEND_DIR, env=env), os.path.join(run_dir, f'result_{n}.json')))
+
+        worker_results = []
+        for process, result_path in workers:
+            process.wait()
+            if process.returncode == 0 and os.path.exists(result_path):
+                with open(result_path) as f:
+                    worker_results.append(json.load(f))
+            else:
+                print(f'Client worker exited with status {process.returncode}')
+        sampler.stop()
+    finally:
+        for process, _ in workers:
+            if process.poll() is None:
+                process.kill()
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        server_log.close()
+
+    latencies = summarise_latencies(worker_results)
+    server_stats = sampler.summary()
+    sent, errors = {}, {}
+    for result in worker_results:
+        for name, count in result['sent'].items():
+            sent[name] = sent.get(name, 0) + count
+        for message, count in result['errors'].items():
+            errors[message] = errors.get(message, 0) + count
+    results = {
+        'latency': latencies,
+        'server': server_stats,
+        'clients': {
+            'planned': len(specs),
+            'connect_failures': sum(r['connect_failures'] for r in worker_results),
+            'sent': sent,
+            'received': sum(r['received'] for r in worker_results),
+            'typing_received': sum(r.get('typing_received', 0) for r in worker_results),
+            'timeouts': sum(r['timeouts'] for r in worker_results),
+            'unmatched_locations': sum(r['unmatched_locations'] for r in worker_results),
+            'errors': errors,
+        },
+    }
+
+    print(f"\n{'event':20} {'count':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for name, row in latencies.items():
+        if row['count']:
+            print(f"{name:20} {row['count']:8} {row['p50_ms']:9.1f} {row['p95_ms']:9.1f} "
+                  f"{row['p99_ms']:9.1f} {row['max_ms']:9.1f}")
+        else:
+            print(f'{name:20} {0:8}')
+    if server_stats:
+        print(f"\nserver cpu  mean {server_stats['cpu_percent']['mean']}%  max {server_stats['cpu_percent']['max']}%")
+        print(f"server rss  start {server_stats['rss_mb']['start']} MB  max {server_stats['rss_mb']['max']} MB")
+        print(f"db commits  mean {server_stats['commits_per_sec']['mean']}/s  max {server_stats['commits_per_sec']['max']}/s"
+              f"  (writes {server_stats['writes_per_sec']['mean']}/s, reads {server_stats['reads_per_sec']['mean']}/s)")
+    clients = results['clients']
+    print(f"clients     {clients['planned']} planned, {clients['connect_failures']} failed to connect, "
+          f"{clients['timeouts']} replies timed out, errors {clients['errors'] or 'none'}")
+    if args.typing_time > 0:
+        print(f"typing      {sent.get('typing', 0)} sent, {clients['typing_received']} user_typing received")
+
+    path = write_results(results, args.output, meta={
+        'clients': args.clients, 'concerts': args.concerts, 'friendships': friendships,
+        'avg_friends': args.avg_friends, 'workers': len(workers), 'ramp': args.ramp,
+        'duration': args.duration, 'gps_interval': args.gps_interval, 'chat_interval': args.chat_interval,
+        'typing_time': args.typing_time, 'offline_interval': args.offline_interval, 'transport': args.transport, 'chat_scope': args.chat_scope, 'seed': args.seed,
+    })
+    print(f'\nResults written to {path}')
+    if args.keep:
+        print(f'Run directory kept at {run_dir}')
+    else:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    return 1 if clients['connect_failures'] or not worker_results else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Eventlet Socket.IO server for the load harness
+Runs the app the same way run.py does, plus a /_load/stats endpoint reporting process
+CPU time, resident memory, and the number of DB commits and statements issued so far.
+Started by tests.load.socket_load; the database and config come from the environment.
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import os
+import resource
+import signal
+import sys
+import threading
+import time
+
+from flask import jsonify
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import create_app, socketio
+from app.utils.media_pipeline import media_pipeline
+
+WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class DBCounters:
+    """Process-wide commit/rollback/statement totals."""
+
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+        self.reads = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def install(self):
+        # Connection-level events also count commits made outside the ORM session
+        event.listen(Engine, 'commit', self._on_commit)
+        event.listen(Engine, 'rollback', self._on_rollback)
+        event.listen(Engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_commit(self, conn):
+        with self._lock:
+            self.commits += 1
+
+    def _on_rollback(self, conn):
+        with self._lock:
+            self.rollbacks += 1
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        is_write = statement.lstrip()[:6].upper() in WRITE_VERBS
+        with self._lock:
+            if is_write:
+                self.writes += 1
+            else:
+                self.reads += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'commits': self.commits, 'rollbacks': self.rollbacks,
+                    'reads': self.reads, 'writes': self.writes}
+
+
+def rss_bytes():
+    """Current resident set size; falls back to the peak where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def create_load_app(config_name):
+    app = create_app(config_name)
+    counters = DBCounters()
+    counters.install()
+
+    @app.route('/_load/stats')
+    def load_stats():
+        times = os.times()
+        return jsonify({
+            'time': time.time(),
+            'cpu_seconds': times.user + times.system,
+            'rss_bytes': rss_bytes(),
+            'db': counters.snapshot(),
+        })
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Socket.IO server for load testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--config', default=os.getenv('FLASK_CONFIG', 'development'))
+    args = parser.parse_args(argv)
+
+    app = create_load_app(args.config)
+    # The orchestrator stops the server with SIGTERM; exit normally so queued writes flush
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f'Load server listening on http://{args.host}:{args.port}', flush=True)
+    try:
+        socketio.run(app, host=args.host, port=args.port, debug=False, use_reloader=False,
+                     log_output=False, allow_unsafe_werkzeug=True)
+    finally:
+        media_pipeline.shutdown()
+
+
+if __name__ == '__main__':
+    main()
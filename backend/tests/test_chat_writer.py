@@ -0,0 +1,99 @@
+"""Group commit of chat messages and the per-room history buffer"""
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+
+import app as app_module
+from app.models import db, Artist, Venue, Show, ChatMessage
+from app.utils import chat_writer as chat_writer_module
+from app.utils.chat_history import chat_history
+from app.utils.chat_writer import ChatWriter
+
+
+@pytest.fixture
+def show(database, make_user):
+    artist, venue = Artist(name='The Band'), Venue(name='The Hall', city='Springfield')
+    db.session.add_all([artist, venue])
+    db.session.flush()
+    show = Show(user_id=make_user('alice').id, artist_id=artist.id, venue_id=venue.id, date=date(2026, 5, 1))
+    db.session.add(show)
+    db.session.commit()
+    return show
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    events = []
+    monkeypatch.setattr(app_module.socketio, 'emit',
+                        lambda event, payload, to=None: events.append((event, payload, to)))
+    return events
+
+
+def stored():
+    return db.session.query(ChatMessage.id, ChatMessage.message).order_by(ChatMessage.id).all()
+
+
+def test_bad_row_fails_alone_and_is_reported_to_the_room(show, emitted):
+    writer = ChatWriter(flush_interval=60)
+    room = f'show_{show.id}'
+    chat_history.history(chat_history.room(show.id))  # warm the room so sends are buffered
+    messages = [writer.submit(show.id, show.user_id, text, room=room) for text in ('one', None, 'three')]
+    for message in messages:
+        chat_history.record(message, 'alice')
+
+    assert writer.flush() == 2
+
+    assert stored() == [(messages[0].id, 'one'), (messages[2].id, 'three')]
+    assert writer.stats()['retried'] == 1 and writer.stats()['failed'] == 1
+    assert writer.stats()['written'] == 2 and writer.stats()['batches'] == 0
+    assert emitted == [('message_failed', {'id': messages[1].id, 'show_id': show.id, 'user_id': show.user_id,
+                                           'error': 'Message could not be saved'}, room)]
+    history, _ = chat_history.history(chat_history.room(show.id))
+    assert [entry['message'] for entry in history] == ['one', 'three']
+
+
+def test_good_batch_is_one_insert(show, emitted):
+    writer = ChatWriter(flush_interval=60)
+    for text in ('one', 'two', 'three'):
+        writer.submit(show.id, show.user_id, text)
+
+    assert writer.flush() == 3
+
+    assert [text for _, text in stored()] == ['one', 'two', 'three']
+    assert writer.stats()['batches'] == 1 and writer.stats()['largest_batch'] == 3
+    assert emitted == []
+
+
+def test_ids_stay_monotonic_across_rest_writes_and_socket_submits(show):
+    # History from before the counter existed (e.g. a restart): ids continue after it
+    db.session.add(ChatMessage(id=41, show_id=show.id, user_id=show.user_id, message='old',
+                               created_at=datetime.utcnow()))
+    db.session.commit()
+    writer = ChatWriter(flush_interval=60)
+
+    ids = [writer.write(show.id, show.user_id, 'rest').id,
+           writer.submit(show.id, show.user_id, 'socket').id,
+           writer.write(show.id, show.user_id, 'rest again').id,
+           writer.submit(show.id, show.user_id, 'socket again').id]
+    writer.flush()
+
+    assert ids == [42, 43, 44, 45]
+    assert stored() == [(41, 'old'), (42, 'rest'), (43, 'socket'), (44, 'rest again'), (45, 'socket again')]
+
+
+def test_queued_messages_are_written_at_shutdown(app, show, monkeypatch):
+    exit_hooks, tasks = [], []
+    monkeypatch.setattr(chat_writer_module, 'atexit', SimpleNamespace(register=exit_hooks.append))
+    monkeypatch.setattr(app_module.socketio, 'start_background_task', lambda task: tasks.append(task))
+    writer = ChatWriter(flush_interval=60)
+    writer._app = app
+
+    writer.submit(show.id, show.user_id, 'last words')
+    assert len(tasks) == 1 and stored() == []  # the flusher never got to run
+
+    for hook in exit_hooks:
+        hook()
+
+    assert [text for _, text in stored()] == ['last words']
+    assert writer.stats()['pending'] == 0
@@ -0,0 +1,64 @@
+"""Shows find their canonical Concert, including when another worker creates it first"""
+from datetime import date
+
+import pytest
+
+from app.models import db, Artist, Venue, Show, Concert
+
+DAY = date(2026, 5, 1)
+
+
+@pytest.fixture
+def lineup(database, make_user):
+    artist, venue = Artist(name='The Band'), Venue(name='The Hall', city='Springfield')
+    db.session.add_all([artist, venue])
+    db.session.commit()
+    return artist, venue, make_user('alice'), make_user('bob')
+
+
+def concert_rows():
+    return db.session.query(Concert.id, Concert.date).order_by(Concert.id).all()
+
+
+def test_concert_inserted_by_a_concurrent_flush_is_reused(lineup):
+    artist, venue, alice, _ = lineup
+    raced = []
+
+    @db.event.listens_for(db.engine, 'after_cursor_execute')
+    def insert_first(conn, cursor, statement, parameters, context, executemany):
+        # Another worker inserts the same concert between our SELECT and our INSERT
+        if not raced and statement.startswith('SELECT') and 'FROM concerts' in statement:
+            raced.append(cursor.connection.execute(
+                'INSERT INTO concerts (artist_id, venue_id, date) VALUES (?, ?, ?)',
+                (artist.id, venue.id, DAY.isoformat())
+            ).lastrowid)
+
+    try:
+        show = Show(user_id=alice.id, artist_id=artist.id, venue_id=venue.id, date=DAY)
+        db.session.add(show)
+        db.session.commit()
+    finally:
+        db.event.remove(db.engine, 'after_cursor_execute', insert_first)
+
+    assert show.concert_id == raced[0]
+    assert concert_rows() == [(raced[0], DAY)]
+
+
+def test_sibling_shows_share_one_concert_and_moves_drop_empty_ones(lineup):
+    artist, venue, alice, bob = lineup
+    shows = [Show(user_id=user.id, artist_id=artist.id, venue_id=venue.id, date=DAY) for user in (alice, bob)]
+    db.session.add_all(shows)
+    db.session.commit()
+    [(shared, _)] = concert_rows()
+    assert [show.concert_id for show in shows] == [shared, shared]
+
+    shows[0].date = date(2026, 5, 2)
+    db.session.commit()
+    assert shows[0].concert_id not in (None, shared)
+    assert [row.date for row in concert_rows()] == [DAY, date(2026, 5, 2)]
+
+    # The last show leaves the shared concert for the one alice's show moved to
+    shows[1].date = date(2026, 5, 2)
+    db.session.commit()
+    assert shows[1].concert_id == shows[0].concert_id
+    assert concert_rows() == [(shows[0].concert_id, date(2026, 5, 2))]
@@ -0,0 +1,118 @@
+"""Denormalized show counters and user_stats must match a recount after every kind of write"""
+from datetime import date
+
+import pytest
+
+from app.models import (
+    db, Artist, Venue, Show, Photo, AudioRecording, VideoRecording, Comment, SetlistSong,
+    UserStats, recompute_show_counts, recompute_user_stats
+)
+
+
+@pytest.fixture
+def catalog(database):
+    artists = [Artist(name=f'Artist {i}') for i in range(2)]
+    venues = [Venue(name=f'Venue {i}', city='Springfield') for i in range(2)]
+    db.session.add_all(artists + venues)
+    db.session.commit()
+    return artists, venues
+
+
+def assert_exact():
+    """Recounting from the child tables finds nothing the flush hooks got wrong."""
+    assert recompute_show_counts() == 0
+    assert recompute_user_stats() == 0
+
+
+def add_show(user, artist, venue, day=1):
+    show = Show(user_id=user.id, artist_id=artist.id, venue_id=venue.id, date=date(2026, 5, day))
+    db.session.add(show)
+    db.session.flush()
+    return show
+
+
+def add_media(show, user, n=1):
+    for i in range(n):
+        db.session.add_all([
+            Photo(show_id=show.id, user_id=user.id, filename=f'p{show.id}_{i}.jpg'),
+            AudioRecording(show_id=show.id, user_id=user.id, filename=f'a{show.id}_{i}.mp3'),
+            VideoRecording(show_id=show.id, user_id=user.id, filename=f'v{show.id}_{i}.mp4'),
+            Comment(show_id=show.id, user_id=user.id, text='great set'),
+            SetlistSong(show_id=show.id, title=f'Song {i}', order=i + 1),
+        ])
+
+
+def test_create(catalog, make_user):
+    (artist, _), (venue, _) = catalog
+    alice, bob = make_user('alice'), make_user('bob')
+    show = add_show(alice, artist, venue)
+    add_media(show, alice, 2)
+    db.session.add(Comment(show_id=show.id, user_id=bob.id, text='wish I was there'))
+    db.session.commit()
+
+    assert (show.photo_count, show.comment_count, show.song_count) == (2, 3, 2)
+    assert db.session.get(UserStats, bob.id).total_comments == 1
+    assert_exact()
+
+
+def test_delete(catalog, make_user):
+    (artist, other_artist), (venue, _) = catalog
+    alice = make_user('alice')
+    kept, dropped = add_show(alice, artist, venue), add_show(alice, other_artist, venue, day=2)
+    add_media(kept, alice, 2)
+    add_media(dropped, alice)
+    db.session.commit()
+
+    db.session.delete(kept.photos.first())
+    db.session.delete(kept.setlist_songs.first())
+    db.session.delete(dropped)  # takes its media along
+    db.session.commit()
+
+    assert (kept.photo_count, kept.song_count) == (1, 1)
+    assert db.session.get(UserStats, alice.id).to_dict()['total_artists'] == 1
+    assert_exact()
+
+
+def test_move(catalog, make_user):
+    (artist, other_artist), (venue, other_venue) = catalog
+    alice = make_user('alice')
+    first, second = add_show(alice, artist, venue), add_show(alice, artist, venue, day=2)
+    add_media(first, alice, 2)
+    db.session.commit()
+
+    # A show re-filed under another artist and venue, and media moved to the right show;
+    # everything was expired by the commit, so the old values are not loaded yet
+    photo, comment = first.photos.first(), first.comments.first()
+    db.session.commit()
+    second.artist_id, second.venue_id = other_artist.id, other_venue.id
+    photo.show_id = comment.show_id = second.id
+    db.session.commit()
+
+    assert (first.photo_count, second.photo_count) == (1, 1)
+    assert (first.comment_count, second.comment_count) == (1, 1)
+    assert db.session.get(UserStats, alice.id).to_dict()['total_venues'] == 2
+    assert_exact()
+
+    # ...and back: the first artist and venue are still referenced by the first show
+    second.artist_id, second.venue_id = artist.id, venue.id
+    db.session.commit()
+    assert db.session.get(UserStats, alice.id).to_dict()['total_artists'] == 1
+    assert_exact()
+
+
+def test_bulk(catalog, make_user):
+    artists, venues = catalog
+    users = [make_user(name) for name in ('alice', 'bob', 'carol')]
+    shows = []
+    for day, user in enumerate(users * 3, start=1):
+        shows.append(add_show(user, artists[day % 2], venues[day % 2], day=day))
+        add_media(shows[-1], user, 3)
+    db.session.commit()  # one flush for every show's media, like a setlist import
+    assert_exact()
+
+    for show in shows[::2]:
+        db.session.delete(show)
+    for song in SetlistSong.query.filter(SetlistSong.show_id.in_([show.id for show in shows[1::2]])):
+        db.session.delete(song)
+    db.session.commit()
+    assert_exact()
@@ -0,0 +1,43 @@
+"""Feed fan-out must follow the friendships table, not another worker's stale friend cache"""
+from app.models import db, Friendship, FeedEntry, get_friend_ids
+from tests.conftest import auth_headers, befriend
+
+SHOW = {'artist_name': 'The Band', 'venue_name': 'The Hall', 'city': 'Springfield', 'date': '2026-05-01'}
+
+
+def create_show(client, user):
+    response = client.post('/api/shows', json=SHOW, headers=auth_headers(user))
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def feed_ids(client, user):
+    response = client.get('/api/shows/feed', headers=auth_headers(user))
+    assert response.status_code == 200
+    return [show['id'] for show in response.get_json()['shows']]
+
+
+def test_show_created_after_unfriend_stays_out_of_ex_friend_feed(client, make_user):
+    owner, friend = make_user('owner'), make_user('friend')
+    befriend(owner, friend)
+    assert get_friend_ids(owner.id) == {friend.id}  # this worker now caches the friendship
+
+    # Unfriended through another worker, which only invalidates its own cache
+    Friendship.query.delete()
+    db.session.commit()
+    assert get_friend_ids(owner.id) == {friend.id}
+
+    show_id = create_show(client, owner)
+
+    assert FeedEntry.query.filter_by(show_id=show_id).count() == 0
+    assert show_id not in feed_ids(client, friend)
+
+
+def test_show_created_after_new_friendship_reaches_new_friend(client, make_user):
+    owner, friend = make_user('owner'), make_user('friend')
+    assert get_friend_ids(owner.id) == set()
+
+    befriend(owner, friend)  # accepted through another worker
+    show_id = create_show(client, owner)
+
+    assert feed_ids(client, friend) == [show_id]
@@ -0,0 +1,143 @@
+"""Write-behind live location store: write-through, coalescing, batched flush, cross-worker reads"""
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app.models import db, Artist, Venue, Show, ShowCheckin
+from app.utils import live_locations as live_locations_module
+from app.utils.live_locations import LiveLocationStore
+
+FLUSH_INTERVAL = 5.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(live_locations_module, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def concert(database, make_user):
+    """Two users with shows of the same concert, each checked in to their own"""
+    artist, venue = Artist(name='The Band'), Venue(name='The Hall', city='Springfield')
+    db.session.add_all([artist, venue])
+    db.session.flush()
+    users = [make_user('alice'), make_user('bob')]
+    shows = [Show(user_id=user.id, artist_id=artist.id, venue_id=venue.id, date=date(2026, 5, 1))
+             for user in users]
+    db.session.add_all(shows)
+    db.session.flush()
+    checkins = [ShowCheckin(user_id=user.id, show_id=show.id) for user, show in zip(users, shows)]
+    db.session.add_all(checkins)
+    db.session.commit()
+    return SimpleNamespace(users=users, shows=shows, checkins=checkins)
+
+
+def stored(checkin):
+    """The checkin's position as committed, bypassing the session's identity map"""
+    return tuple(db.session.query(ShowCheckin.latitude, ShowCheckin.longitude)
+                 .filter(ShowCheckin.id == checkin.id).one())
+
+
+def test_first_move_is_written_through(concert, clock):
+    store = LiveLocationStore(flush_interval=FLUSH_INTERVAL)
+    location = store.track(concert.checkins[0], 'alice')
+
+    store.move(location, 1.0, 2.0)
+
+    assert stored(concert.checkins[0]) == (1.0, 2.0)
+    assert store.stats()['flushed'] == 1 and store.stats()['pending'] == 0
+
+
+def test_later_moves_coalesce_into_one_batched_flush(concert, clock):
+    store = LiveLocationStore(flush_interval=FLUSH_INTERVAL)
+    alice = store.track(concert.checkins[0], 'alice')
+    bob = store.track(concert.checkins[1], 'bob')
+    store.move(alice, 1.0, 1.0)
+    store.move(bob, 5.0, 5.0)
+
+    store.move(alice, 2.0, 2.0)
+    store.move(alice, 3.0, 3.0)
+    store.move(bob, 6.0, 6.0)
+
+    assert stored(concert.checkins[0]) == (1.0, 1.0)  # nothing due yet
+    stats = store.stats()
+    assert stats['pending'] == 2 and stats['coalesced'] == 1
+
+    assert store.flush() == 2
+    assert stored(concert.checkins[0]) == (3.0, 3.0)
+    assert stored(concert.checkins[1]) == (6.0, 6.0)
+    assert store.stats()['flushes'] == 1 and store.stats()['pending'] == 0
+
+
+def test_move_flushes_inline_once_the_oldest_position_is_due(concert, clock):
+    store = LiveLocationStore(flush_interval=FLUSH_INTERVAL)
+    alice = store.track(concert.checkins[0], 'alice')
+    store.move(alice, 1.0, 1.0)
+    store.move(alice, 2.0, 2.0)
+
+    clock.now += FLUSH_INTERVAL
+    store.move(alice, 3.0, 3.0)
+
+    assert stored(concert.checkins[0]) == (3.0, 3.0)
+    assert store.stats()['inline_flushes'] == 1
+
+
+def test_other_worker_reads_flushed_positions_after_the_interval(concert, clock):
+    worker_a = LiveLocationStore(flush_interval=FLUSH_INTERVAL)
+    worker_b = LiveLocationStore(flush_interval=FLUSH_INTERVAL)
+    bob_show = concert.shows[1].id
+    alice = worker_a.track(concert.checkins[0], 'alice')
+    worker_a.move(alice, 1.0, 1.0)
+    assert [loc.latitude for loc in worker_b.locations(bob_show)] == [1.0]  # sibling show
+
+    worker_a.move(alice, 2.0, 2.0)
+    worker_a.flush()
+    assert [loc.latitude for loc in worker_b.locations(bob_show)] == [1.0]  # within the interval
+
+    clock.now += FLUSH_INTERVAL
+    assert [loc.latitude for loc in worker_b.locations(bob_show)] == [2.0]
+
+
+def test_stop_sharing_clears_memory_and_database(concert, clock):
+    store = LiveLocationStore(flush_interval=FLUSH_INTERVAL)
+    alice = store.track(concert.checkins[0], 'alice')
+    store.move(alice, 1.0, 1.0)
+    store.move(alice, 2.0, 2.0)  # still pending
+
+    stopped = store.stop_sharing(concert.users[0].id, [concert.shows[0].id])
+
+    assert stopped == [alice]
+    assert stored(concert.checkins[0]) == (None, None)
+    assert store.get(concert.shows[0].id, concert.users[0].id) is None
+    assert store.flush() == 0  # the pending position is not written back
+    assert store.stats()['concerts'] == 0  # nobody left sharing at the concert
+
+
+def test_moved_show_takes_its_positions_to_the_new_concert(concert, clock, monkeypatch):
+    worker_a = LiveLocationStore(flush_interval=FLUSH_INTERVAL)
+    worker_b = LiveLocationStore(flush_interval=FLUSH_INTERVAL)
+    monkeypatch.setattr(live_locations_module, 'live_locations', worker_a)  # the worker moving it
+    alice_show, bob_show = (show.id for show in concert.shows)
+    alice = worker_a.track(concert.checkins[0], 'alice')
+    worker_a.move(alice, 1.0, 1.0)
+    for worker in (worker_a, worker_b):
+        assert [loc.user_id for loc in worker.locations(bob_show)] == [concert.users[0].id]
+
+    # Alice got the date wrong: her show becomes a concert of its own
+    worker_a.move(alice, 2.0, 2.0)  # still pending
+    concert.shows[0].date = date(2026, 5, 2)
+    db.session.commit()
+    assert concert.shows[0].concert_id != concert.shows[1].concert_id
+
+    assert worker_a.locations(bob_show) == []
+    assert worker_a.get(alice_show, alice.user_id) is alice
+    assert worker_a.flush() == 1  # the pending position moved along with its entry
+    assert stored(concert.checkins[0]) == (2.0, 2.0)
+
+    # Another worker follows once its cached answer is older than the flush interval
+    clock.now += FLUSH_INTERVAL
+    assert worker_b.locations(bob_show) == []
+    assert [loc.latitude for loc in worker_b.locations(alice_show)] == [2.0]
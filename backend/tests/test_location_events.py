@@ -0,0 +1,23 @@
+"""Location events carry the show and concert they belong to"""
+from datetime import date
+
+from app.models import db, Artist, Venue, Show
+from app.socket_events import location_event, show_concerts
+
+
+def test_location_event_is_tagged_with_show_and_concert(make_user):
+    artist, venue = Artist(name='The Band'), Venue(name='The Hall', city='Springfield')
+    db.session.add_all([artist, venue])
+    db.session.flush()
+    show = Show(user_id=make_user('alice').id, artist_id=artist.id, venue_id=venue.id, date=date(2026, 5, 1))
+    db.session.add(show)
+    db.session.commit()
+
+    # Read from the database when no connection on this worker has joined the show...
+    assert location_event(show.id, {'user_id': 1}) == {'user_id': 1, 'show_id': show.id, 'concert_id': show.concert_id}
+    # ...and from the joined shows' index when one has
+    show_concerts[show.id] = show.concert_id
+    try:
+        assert location_event(show.id, {'user_id': 1})['concert_id'] == show.concert_id
+    finally:
+        del show_concerts[show.id]
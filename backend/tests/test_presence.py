@@ -0,0 +1,130 @@
+"""Presence registries, with two SharedPresence workers over one LocalRedis"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import presence as presence_module
+from app.utils.presence import MemoryPresence, SharedPresence, LocalRedis
+
+SID_TTL = 90
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(presence_module, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def workers(clock):
+    client = LocalRedis()
+    return SharedPresence(client, sid_ttl=SID_TTL), SharedPresence(client, sid_ttl=SID_TTL)
+
+
+def member(user_id, sid):
+    return {'user_id': user_id, 'username': f'user{user_id}', 'sid': sid}
+
+
+def test_user_stays_online_until_last_connection_on_any_worker_closes(workers):
+    a, b = workers
+
+    assert a.connect(1, 'a1', online=True) is True
+    assert b.connect(1, 'b1', online=True) is False
+    assert a.online_ids([1, 2]) == [1] and b.sids(1) == {'a1', 'b1'}
+
+    assert a.disconnect(1, 'a1') is False
+    assert b.online_ids([1]) == [1]
+    assert b.disconnect(1, 'b1') is True
+    assert a.online_ids([1]) == [] and a.connected_ids([1]) == []
+
+
+def test_user_stays_in_show_until_last_connection_leaves(workers):
+    a, b = workers
+    a.connect(1, 'a1', online=True)
+    b.connect(1, 'b1', online=True)
+    b.connect(2, 'b2', online=True)
+
+    a.join_show(5, 1, member(1, 'a1'))
+    b.join_show(5, 1, member(1, 'b1'))
+    members = b.join_show(5, 2, member(2, 'b2'))
+    assert sorted(m['user_id'] for m in members) == [1, 2]  # one entry per user
+
+    # One tab closes: the user is still in the show through the other worker
+    assert a.leave_show(5, 1, 'a1') is None
+    assert b.show_present(5, {1, 2}) == {1, 2}
+
+    assert b.leave_show(5, 1, 'b1') == [member(2, 'b2')]
+    assert a.show_present(5, {1, 2}) == {2}
+    assert a.show_members(5) == [member(2, 'b2')]
+
+
+def test_concert_entries_are_kept_per_connection(workers):
+    a, b = workers
+    a.enter_concert(9, 1, 5, 'a1')
+    a.enter_concert(9, 1, 6, 'a1')
+    b.enter_concert(9, 1, 5, 'b1')
+
+    assert a.leave_concert(9, 1, 5, 'a1') is False  # a1 still holds sibling show 6
+    assert a.leave_concert(9, 1, 6, 'a1') is True
+    assert a.concert_present(9, {1, 2}) == {1}      # through b1
+    assert b.leave_concert(9, 1, 5, 'b1') is True
+    assert a.concert_present(9, {1}) == set()
+
+
+def test_crashed_worker_expires_without_heartbeat(workers, clock):
+    a, b = workers
+    for worker, user_id, sid in ((a, 1, 'a1'), (b, 2, 'b2')):
+        worker.connect(user_id, sid, online=True)
+        worker.join_show(5, user_id, member(user_id, sid))
+        worker.enter_concert(9, user_id, 5, sid)
+
+    # Worker b dies without disconnecting; only a keeps sending heartbeats
+    for _ in range(3):
+        clock.now += SID_TTL / 2
+        a.heartbeat()
+
+    assert a.online_ids([1, 2]) == [1]
+    assert a.connected_ids([1, 2]) == [1]
+    assert a.show_present(5, {1, 2}) == {1}
+    assert a.show_members(5) == [member(1, 'a1')]
+    assert a.concert_present(9, {1, 2}) == {1}
+
+    # The reads above pruned b's show and concert entries
+    assert set(a.client.hgetall('presence:show:5')) == {'a1'}
+    assert set(a.client.hgetall('presence:concert:9')) == {'a1:5'}
+    # ...and user 2's next connection counts as their first online one
+    assert a.connect(2, 'a2', online=True) is True
+    assert a.sids(2) == {'a2'}
+
+
+def test_heartbeat_does_not_revive_hidden_or_closed_connections(workers, clock):
+    a, _ = workers
+    a.connect(1, 'a1', online=True)
+    a.connect(2, 'a2', online=True)
+    a.join_show(5, 2, member(2, 'a2'))
+
+    a.go_offline(1)
+    a.leave_show(5, 2, 'a2')
+    a.disconnect(2, 'a2')
+    clock.now += SID_TTL / 2
+    a.heartbeat()
+
+    assert a.online_ids([1, 2]) == []
+    assert a.connected_ids([1, 2]) == [1]
+    assert a.show_members(5) == []
+
+
+def test_memory_registry_tracks_shows_per_connection():
+    registry = MemoryPresence()
+    registry.join_show(5, 1, member(1, 's1'))
+    registry.join_show(5, 1, member(1, 's2'))
+    registry.enter_concert(9, 1, 5, 's1')
+    registry.enter_concert(9, 1, 5, 's2')
+
+    assert registry.show_members(5) == [member(1, 's2')]
+    assert registry.leave_show(5, 1, 's1') is None
+    assert registry.leave_concert(9, 1, 5, 's1') is True
+    assert registry.concert_present(9, {1}) == {1}
+    assert registry.leave_show(5, 1, 's2') == []
+    assert registry.show_present(5, {1}) == set()
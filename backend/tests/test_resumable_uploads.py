@@ -0,0 +1,125 @@
+"""Resumable video uploads: offsets, checksums, lengths, completion and expiry"""
+import base64
+import hashlib
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import db, UploadSession, VideoRecording
+from app.utils.resumable_uploads import resumable_uploads, UploadRejected, INCOMING_DIR, part_path
+from tests.conftest import auth_headers
+
+SHOW = {'artist_name': 'The Band', 'venue_name': 'The Hall', 'city': 'Springfield', 'date': '2026-05-01'}
+VIDEO = b'0123456789' * 10
+
+
+@pytest.fixture
+def upload(client, make_user, tmp_path, monkeypatch):
+    """An open session for VIDEO; uploads/ lives in a temporary working directory"""
+    monkeypatch.chdir(tmp_path)
+    user = make_user('alice')
+    headers = auth_headers(user)
+    show_id = client.post('/api/shows', json=SHOW, headers=headers).get_json()['id']
+    response = client.post('/api/videos/uploads', headers=headers,
+                           json={'show_id': show_id, 'filename': 'encore.mp4', 'length': len(VIDEO)})
+    assert response.status_code == 201
+    return response.get_json()['url'], headers
+
+
+def send(client, upload, offset, body, checksum=None):
+    url, headers = upload
+    headers = dict(headers, **{'Upload-Offset': str(offset)})
+    if checksum:
+        headers['Upload-Checksum'] = checksum
+    return client.patch(url, data=body, headers=headers, content_type='application/offset+octet-stream')
+
+
+def sha256(body):
+    return 'sha256 ' + base64.b64encode(hashlib.sha256(body).digest()).decode()
+
+
+def received(client, upload):
+    url, headers = upload
+    return client.get(url, headers=headers).get_json()['offset']
+
+
+def test_chunks_resume_from_the_stored_offset(client, upload):
+    assert send(client, upload, 0, VIDEO[:40], sha256(VIDEO[:40])).headers['Upload-Offset'] == '40'
+
+    conflict = send(client, upload, 0, VIDEO[:40])  # a retry of a chunk that did arrive
+    assert conflict.status_code == 409
+    assert conflict.get_json()['offset'] == 40 and conflict.headers['Upload-Offset'] == '40'
+    assert send(client, upload, 60, VIDEO[60:]).status_code == 409
+    assert received(client, upload) == 40
+
+
+def test_checksum_mismatch_truncates_back_to_the_chunk_start(client, upload):
+    send(client, upload, 0, VIDEO[:40])
+
+    response = send(client, upload, 40, VIDEO[40:80], sha256(b'something else'))
+
+    assert response.status_code == 460 and response.get_json()['offset'] == 40
+    assert received(client, upload) == 40
+    assert send(client, upload, 40, VIDEO[40:80], sha256(VIDEO[40:80])).status_code == 204
+    assert resumable_uploads.stats()['checksum_failures'] >= 1
+
+
+def test_chunk_past_the_upload_length_is_refused(client, upload):
+    send(client, upload, 0, VIDEO[:90])
+
+    response = send(client, upload, 90, VIDEO[90:] + b'extra')
+
+    assert response.status_code == 413 and response.get_json()['offset'] == 90
+    assert received(client, upload) == 90
+
+
+def test_chunk_longer_than_its_content_length_is_cut_back(client, upload):
+    session = UploadSession.query.one()
+    resumable_uploads.append(session, 0, io.BytesIO(VIDEO[:90]))
+
+    with pytest.raises(UploadRejected) as rejected:
+        resumable_uploads.append(session, 90, io.BytesIO(VIDEO[90:] + b'extra'))
+
+    assert rejected.value.status == 413
+    assert os.path.getsize(part_path(session)) == 90
+
+
+def test_complete_twice_returns_the_same_video(client, upload):
+    url, headers = upload
+    assert client.post(f'{url}/complete', headers=headers).status_code == 409  # nothing sent yet
+    send(client, upload, 0, VIDEO)
+
+    first = client.post(f'{url}/complete', headers=headers)
+    second = client.post(f'{url}/complete', headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert first.get_json()['id'] == second.get_json()['id']
+    assert VideoRecording.query.count() == 1
+    video = db.session.get(VideoRecording, first.get_json()['id'])
+    with open(video.file_path, 'rb') as file:
+        assert file.read() == VIDEO
+    assert os.listdir(INCOMING_DIR) == []
+    assert send(client, upload, len(VIDEO), b'more').status_code == 409
+    assert received(client, upload) == len(VIDEO)
+
+
+def test_expire_removes_stale_sessions_and_orphaned_part_files(client, upload):
+    live = UploadSession.query.one()
+    stale = UploadSession(id='f' * 32, user_id=live.user_id, show_id=live.show_id, original_filename='old.mp4',
+                          length=10, expires_at=datetime.utcnow() - timedelta(seconds=1))
+    db.session.add(stale)
+    db.session.commit()
+    open(part_path(stale), 'wb').close()
+    orphan, recent = os.path.join(INCOMING_DIR, 'orphan.part'), os.path.join(INCOMING_DIR, 'recent.part')
+    for path in (orphan, recent):
+        open(path, 'wb').close()
+    old = (datetime.utcnow() - timedelta(seconds=resumable_uploads.expiry + 60)).timestamp()
+    os.utime(orphan, (old, old))
+    os.utime(part_path(live), (old, old))  # idle on disk, but its session has not expired
+
+    assert resumable_uploads.expire() == 2
+
+    assert [session.id for session in UploadSession.query.all()] == [live.id]
+    assert sorted(os.listdir(INCOMING_DIR)) == sorted([f'{live.id}.part', 'recent.part'])
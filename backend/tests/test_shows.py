@@ -0,0 +1,43 @@
+"""Show list response contract"""
+from app.routes.shows_swagger import show_model, artist_model, venue_model, owner_model
+from tests.conftest import auth_headers
+
+SHOW = {'artist_name': 'The Band', 'venue_name': 'The Hall', 'city': 'Springfield', 'state': 'IL',
+        'country': 'US', 'date': '2026-05-01', 'rating': 4}
+
+
+def test_show_list_is_marshalled_with_show_model(client, make_user):
+    user = make_user('owner')
+    created = client.post('/api/shows', json=SHOW, headers=auth_headers(user)).get_json()
+
+    response = client.get('/api/shows', headers=auth_headers(user))
+
+    assert response.status_code == 200
+    [show] = response.get_json()
+    assert set(show) == set(show_model)
+    assert set(show['owner']) == set(owner_model)
+    assert set(show['artist']) == set(artist_model)
+    assert set(show['venue']) == set(venue_model)
+    assert show == created  # the list and create responses describe a show the same way
+    assert show['owner'] == {'id': user.id, 'username': 'owner'}
+    assert show['is_owner'] is True
+    assert show['date'] == '2026-05-01' and show['rating'] == 4
+    assert show['artist']['name'] == 'The Band' and show['venue']['city'] == 'Springfield'
+    assert show['setlist'] is None and show['photos'] is None
+
+
+def test_show_list_filters(client, make_user):
+    user = make_user('owner')
+    headers = auth_headers(user)
+    client.post('/api/shows', json=SHOW, headers=headers)
+    client.post('/api/shows', json=dict(SHOW, artist_name='Other Act', venue_name='Club', date='2019-02-03'),
+                headers=headers)
+
+    def artists(query):
+        return [show['artist']['name'] for show in client.get(f'/api/shows{query}', headers=headers).get_json()]
+
+    assert artists('') == ['The Band', 'Other Act']  # newest first
+    assert artists('?artist=other') == ['Other Act']
+    assert artists('?venue=hall') == ['The Band']
+    assert artists('?year=2019') == ['Other Act']
+    assert artists('?limit=1') == ['The Band']
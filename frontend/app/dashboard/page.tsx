@@ -40,6 +40,22 @@ interface VenueStat {
   show_count: number;
 }
 
+interface ActivityItem {
+  type: 'photo' | 'audio' | 'video' | 'comment';
+  id: number;
+  show_id: number;
+  text?: string;
+  created_at: string;
+  show_name: string;
+}
+
+const activityLabels: Record<ActivityItem['type'], string> = {
+  photo: 'Photo',
+  audio: 'Recording',
+  video: 'Video',
+  comment: 'Comment',
+};
+
 export default function DashboardPage() {
   const { user } = useAuth();
   const router = useRouter();
@@ -50,6 +66,7 @@ export default function DashboardPage() {
   const [topVenues, setTopVenues] = useState<VenueStat[]>([]);
   const [upcomingShows, setUpcomingShows] = useState<Show[]>([]);
   const [recentShows, setRecentShows] = useState<Show[]>([]);
+  const [activity, setActivity] = useState<ActivityItem[]>([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -58,12 +75,14 @@ export default function DashboardPage() {
 
   const fetchDashboardData = async () => {
     try {
-      const [statsRes, artistsRes, venuesRes, upcomingRes, recentRes] = await Promise.all([
+      const [statsRes, artistsRes, venuesRes, upcomingRes, recentRes, activityRes] = await Promise.all([
         api.get('/dashboard/stats'),
         api.get('/dashboard/artists'),
         api.get('/dashboard/venues'),
         api.get('/shows', { params: { filter: 'upcoming', limit: 5 } }),
         api.get('/shows', { params: { filter: 'past', limit: 5 } }),
+        // Photos, recordings and comments in one request instead of the four /recent endpoints
+        api.get('/dashboard/activity', { params: { limit: 10 } }),
       ]);
 
       setStats(statsRes.data);
@@ -71,6 +90,7 @@ export default function DashboardPage() {
       setTopVenues(venuesRes.data.venues?.slice(0, 5) || []);
       setUpcomingShows(upcomingRes.data || []);
       setRecentShows(recentRes.data || []);
+      setActivity(activityRes.data.items || []);
     } catch (error) {
       console.error('Failed to fetch dashboard data:', error);
     } finally {
@@ -331,6 +351,43 @@ export default function DashboardPage() {
               </div>
             </div>
           </div>
+
+          {/* Recent Activity */}
+          {!loading && (
+            <div className="bg-secondary rounded-xl overflow-hidden mb-6">
+              <div className="px-5 py-4 border-b border-theme">
+                <h2 className="text-lg font-semibold text-primary">Recent Activity</h2>
+              </div>
+              <div className="p-4">
+                {activity.length > 0 ? (
+                  <ul className="space-y-2">
+                    {activity.map((item) => (
+                      <li
+                        key={`${item.type}-${item.id}`}
+                        onClick={() => router.push(`/shows/${item.show_id}`)}
+                        className="flex justify-between items-center p-3 rounded-lg hover:bg-tertiary transition-colors cursor-pointer"
+                      >
+                        <div className="min-w-0 flex-1">
+                          <p className="font-medium text-primary truncate">{item.text || activityLabels[item.type]}</p>
+                          <p className="text-sm text-secondary truncate">
+                            {activityLabels[item.type]} · {item.show_name}
+                          </p>
+                        </div>
+                        <div className="flex items-center gap-2 ml-3 flex-shrink-0">
+                          <span className="text-sm text-muted">{formatDate(item.created_at)}</span>
+                          <svg className="w-4 h-4 text-muted" fill="none" viewBox="0 0 24 24" stroke="currentColor">
+                            <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M9 5l7 7-7 7" />
+                          </svg>
+                        </div>
+                      </li>
+                    ))}
+                  </ul>
+                ) : (
+                  <p className="text-secondary text-center py-6">No photos, recordings or comments yet.</p>
+                )}
+              </div>
+            </div>
+          )}
         </main>
 
         {/* Modals */}
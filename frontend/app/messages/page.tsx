@@ -198,6 +198,8 @@ export default function MessagesPage() {
       });
 
       if (activeConvIdRef.current === msg.conversation_id) {
+        // A message ends the sender's typing; the server does not send a separate stop
+        setTypingUser(null);
         globalSocket.emit('dm_read', { conversation_id: msg.conversation_id });
       }
     };
@@ -206,7 +208,8 @@ export default function MessagesPage() {
       setTypingUser(data.is_typing ? data.username : null);
       if (data.is_typing) {
         if (typingTimeout.current) clearTimeout(typingTimeout.current);
-        typingTimeout.current = setTimeout(() => setTypingUser(null), 3000);
+        // The server sends is_typing=false when typing stops; this only covers a lost stop
+        typingTimeout.current = setTimeout(() => setTypingUser(null), 10000);
       }
     };
 
@@ -5,7 +5,7 @@ import { useRouter } from 'next/navigation';
 import ProtectedRoute from '@/components/ProtectedRoute';
 import Navbar from '@/components/Navbar';
 import SettingsModal from '@/components/SettingsModal';
-import { api } from '@/lib/api';
+import { api, mediaSrcSet } from '@/lib/api';
 
 interface Photo {
   id: number;
@@ -16,6 +16,7 @@ interface Photo {
   artist_name?: string;
   venue_name?: string;
   show_date?: string;
+  srcset?: string | null;
 }
 
 interface ShowGroup {
@@ -137,6 +138,8 @@ export default function PhotosPage() {
                         >
                           <img
                             src={`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000/api'}/photos/${photo.id}/thumbnail`}
+                            srcSet={mediaSrcSet(photo.srcset)}
+                            sizes="(min-width: 1024px) 300px, (min-width: 640px) 33vw, 50vw"
                             alt={photo.caption || 'Photo'}
                             className="w-full h-full object-cover"
                             onError={(e) => {
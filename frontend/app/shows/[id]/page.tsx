@@ -7,7 +7,7 @@ import Navbar from '@/components/Navbar';
 import SettingsModal from '@/components/SettingsModal';
 import FriendMapModal from '@/components/FriendMapModal';
 import LocationSharePickerModal from '@/components/LocationSharePickerModal';
-import { api } from '@/lib/api';
+import { api, mediaSrcSet, uploadVideoResumable } from '@/lib/api';
 import { useSocket } from '@/contexts/SocketContext';
 import { useAuth } from '@/contexts/AuthContext';
 
@@ -31,6 +31,8 @@ interface Photo {
   caption?: string;
   comment_count?: number;
   created_at: string;
+  processing_status?: 'pending' | 'processing' | 'ready' | 'failed';
+  srcset?: string | null;
 }
 
 interface Video {
@@ -60,6 +62,7 @@ interface Comment {
 
 interface Show {
   id: number;
+  concert_id?: number | null;
   date: string;
   show_date?: string;
   time?: string;
@@ -169,6 +172,7 @@ export default function ShowDetailPage() {
   const [chatTypingUser, setChatTypingUser] = useState<string | null>(null);
   const chatBottomRef = useRef<HTMLDivElement>(null);
   const chatTypingTimeout = useRef<ReturnType<typeof setTimeout> | null>(null);
+  const lastChatSeq = useRef<number | null>(null);
   const lastChatTypingEmit = useRef(0);
 
   // Friend map state
@@ -177,6 +181,7 @@ export default function ShowDetailPage() {
   const [sharePickerOpen, setSharePickerOpen] = useState(false);
   const [shareWithIds, setShareWithIds] = useState<number[] | null>(null);
   const shareWithIdsRef = useRef<number[] | null>(null);
+  const showConcertRef = useRef<number | null>(null);
   const [userLocation, setUserLocation] = useState<{ lat: number; lng: number } | null>(null);
   const watchIdRef = useRef<number | null>(null);
   const locationEmitIntervalRef = useRef<ReturnType<typeof setInterval> | null>(null);
@@ -219,10 +224,14 @@ export default function ShowDetailPage() {
     if (!globalSocket || !showId) return;
 
     const sid = parseInt(showId);
+    lastChatSeq.current = null;
 
-    // Join show room once socket is connected (or immediately if already connected)
+    // Join show room once socket is connected (or immediately if already connected).
+    // On reconnect, send the last chat seq seen so the server only replays the gap.
     const joinShow = () => {
-      globalSocket.emit('join_show', { show_id: sid });
+      globalSocket.emit('join_show', lastChatSeq.current === null
+        ? { show_id: sid }
+        : { show_id: sid, last_seq: lastChatSeq.current });
       api.get(`/shows/${showId}/friends-going`).then(res => {
         setFriendsGoing(res.data.friends || []);
       }).catch(() => {});
@@ -243,7 +252,21 @@ export default function ShowDetailPage() {
       }
     };
 
-    const handleLocationUpdate = (data: { user_id: number; username: string; latitude: number; longitude: number }) => {
+    // The thumbnail of a freshly uploaded photo has been rendered (or gave up)
+    const handlePhotoProcessed = (data: Photo & { show_id: number }) => {
+      if (data.show_id !== sid) return;
+      setShow(prev => prev ? {
+        ...prev,
+        photos: (prev.photos || []).map(p => (p.id === data.id ? { ...p, ...data } : p))
+      } : null);
+    };
+
+    // Location events reach every tab a friend has open; keep the ones for this concert
+    const atThisConcert = (data: { show_id: number; concert_id: number | null }) =>
+      data.concert_id != null ? data.concert_id === showConcertRef.current : data.show_id === sid;
+
+    const handleLocationUpdate = (data: { user_id: number; username: string; latitude: number; longitude: number; show_id: number; concert_id: number | null }) => {
+      if (!atThisConcert(data)) return;
       setFriendsGoing(prev => {
         const idx = prev.findIndex(f => f.id === data.user_id);
         if (idx >= 0) {
@@ -263,7 +286,8 @@ export default function ShowDetailPage() {
       });
     };
 
-    const handleLocationStopped = (data: { user_id: number }) => {
+    const handleLocationStopped = (data: { user_id: number; show_id: number; concert_id: number | null }) => {
+      if (!atThisConcert(data)) return;
       setFriendsGoing(prev => prev.map(f =>
         f.id === data.user_id
           ? { ...f, is_sharing_location: false, latitude: undefined, longitude: undefined }
@@ -317,32 +341,50 @@ export default function ShowDetailPage() {
     };
 
     // Show chat events
-    const handleMessageHistory = (data: { messages: Array<{ id: number; user_id: number; username?: string; user?: { username: string }; message: string; created_at: string }> }) => {
-      setChatMessages(data.messages.map(m => ({
+    const handleMessageHistory = (data: { resumed?: boolean; messages: Array<{ id: number; seq?: number; user_id: number; username?: string; user?: { username: string }; message: string; created_at: string }> }) => {
+      const messages = data.messages.map(m => ({
         id: m.id,
         user_id: m.user_id,
         username: m.username || m.user?.username || 'Unknown',
         message: m.message,
         created_at: m.created_at,
-      })));
+      }));
+      const last = data.messages[data.messages.length - 1];
+      if (last?.seq !== undefined) lastChatSeq.current = Math.max(lastChatSeq.current ?? 0, last.seq);
+      if (data.resumed) {
+        // Only the messages missed while disconnected
+        setChatMessages(prev => [...prev, ...messages.filter(m => !prev.some(p => p.id === m.id))]);
+      } else {
+        setChatMessages(messages);
+      }
     };
 
-    const handleNewMessage = (data: { id: number; user_id: number; username: string; message: string; created_at: string }) => {
+    const handleNewMessage = (data: { id: number; seq?: number; user_id: number; username: string; message: string; created_at: string }) => {
+      if (data.seq !== undefined) lastChatSeq.current = Math.max(lastChatSeq.current ?? 0, data.seq);
       setChatMessages(prev => {
         if (prev.some(m => m.id === data.id)) return prev;
         return [...prev, data];
       });
+      // A message ends the sender's typing; the server does not send a separate stop
+      setChatTypingUser(prev => (prev === data.username ? null : prev));
+    };
+
+    // A message was broadcast but the server could not save it
+    const handleMessageFailed = (data: { id: number }) => {
+      setChatMessages(prev => prev.filter(m => m.id !== data.id));
     };
 
     const handleUserTyping = (data: { username: string; is_typing: boolean }) => {
       setChatTypingUser(data.is_typing ? data.username : null);
       if (data.is_typing) {
         if (chatTypingTimeout.current) clearTimeout(chatTypingTimeout.current);
-        chatTypingTimeout.current = setTimeout(() => setChatTypingUser(null), 3000);
+        // The server sends is_typing=false when typing stops; this only covers a lost stop
+        chatTypingTimeout.current = setTimeout(() => setChatTypingUser(null), 10000);
       }
     };
 
     globalSocket.on('comment_added', handleCommentAdded);
+    globalSocket.on('photo_processed', handlePhotoProcessed);
     globalSocket.on('location_update', handleLocationUpdate);
     globalSocket.on('location_stopped', handleLocationStopped);
     globalSocket.on('friends_locations', handleFriendsLocations);
@@ -352,12 +394,14 @@ export default function ShowDetailPage() {
     globalSocket.on('friend_show_at_show', handleFriendShowAtShow);
     globalSocket.on('message_history', handleMessageHistory);
     globalSocket.on('new_message', handleNewMessage);
+    globalSocket.on('message_failed', handleMessageFailed);
     globalSocket.on('user_typing', handleUserTyping);
 
     return () => {
       globalSocket.emit('leave_show', { show_id: sid });
       globalSocket.off('connect', joinShow);
       globalSocket.off('comment_added', handleCommentAdded);
+      globalSocket.off('photo_processed', handlePhotoProcessed);
       globalSocket.off('location_update', handleLocationUpdate);
       globalSocket.off('location_stopped', handleLocationStopped);
       globalSocket.off('friends_locations', handleFriendsLocations);
@@ -367,6 +411,7 @@ export default function ShowDetailPage() {
       globalSocket.off('friend_show_at_show', handleFriendShowAtShow);
       globalSocket.off('message_history', handleMessageHistory);
       globalSocket.off('new_message', handleNewMessage);
+      globalSocket.off('message_failed', handleMessageFailed);
       globalSocket.off('user_typing', handleUserTyping);
     };
   }, [globalSocket, showId]);
@@ -375,6 +420,7 @@ export default function ShowDetailPage() {
     try {
       const response = await api.get(`/shows/${showId}`);
       setShow(response.data);
+      showConcertRef.current = response.data.concert_id ?? null;
       setComments(response.data.comments || []);
     } catch (error) {
       console.error('Failed to fetch show:', error);
@@ -802,22 +848,15 @@ export default function ShowDetailPage() {
     setVideoUploadProgress(0);
     try {
       for (const file of Array.from(files)) {
-        const formData = new FormData();
-        formData.append('file', file);
-        formData.append('show_id', showId);
-        if (videoTitle.trim()) formData.append('title', videoTitle.trim());
-
-        const response = await api.post('/videos', formData, {
-          headers: { 'Content-Type': 'multipart/form-data' },
-          onUploadProgress: (progressEvent) => {
-            const percent = Math.round((progressEvent.loaded * 100) / (progressEvent.total || 1));
-            setVideoUploadProgress(percent);
-          }
-        });
+        const video = await uploadVideoResumable(
+          file,
+          { show_id: showId, ...(videoTitle.trim() ? { title: videoTitle.trim() } : {}) },
+          setVideoUploadProgress
+        );
 
         setShow(prev => prev ? {
           ...prev,
-          videos: [...(prev.videos || []), response.data]
+          videos: [...(prev.videos || []), video]
         } : null);
       }
       setVideoTitle('');
@@ -917,22 +956,15 @@ export default function ShowDetailPage() {
     setIsVideoUploading(true);
     setVideoUploadProgress(0);
     try {
-      const formData = new FormData();
-      formData.append('file', file);
-      formData.append('show_id', showId);
-      if (videoTitle.trim()) formData.append('title', videoTitle.trim());
-
-      const response = await api.post('/videos', formData, {
-        headers: { 'Content-Type': 'multipart/form-data' },
-        onUploadProgress: (progressEvent) => {
-          const percent = Math.round((progressEvent.loaded * 100) / (progressEvent.total || 1));
-          setVideoUploadProgress(percent);
-        }
-      });
+      const video = await uploadVideoResumable(
+        file,
+        { show_id: showId, ...(videoTitle.trim() ? { title: videoTitle.trim() } : {}) },
+        setVideoUploadProgress
+      );
 
       setShow(prev => prev ? {
         ...prev,
-        videos: [...(prev.videos || []), response.data]
+        videos: [...(prev.videos || []), video]
       } : null);
       cancelRecording();
       setVideoTitle('');
@@ -1507,7 +1539,9 @@ export default function ShowDetailPage() {
                       className="aspect-square bg-secondary rounded-xl overflow-hidden relative group cursor-pointer"
                     >
                       <img
-                        src={`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000/api'}/photos/${photo.id}/thumbnail`}
+                        src={`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000/api'}/photos/${photo.id}${photo.processing_status && photo.processing_status !== 'ready' ? '' : '/thumbnail'}`}
+                        srcSet={mediaSrcSet(photo.srcset)}
+                        sizes="(min-width: 640px) 290px, 50vw"
                         alt={photo.caption || 'Photo'}
                         className="w-full h-full object-cover"
                         onError={(e) => {
@@ -2117,6 +2151,8 @@ export default function ShowDetailPage() {
               <div className="flex-shrink-0">
                 <img
                   src={`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000/api'}/photos/${selectedPhoto.id}`}
+                  srcSet={mediaSrcSet(selectedPhoto.srcset)}
+                  sizes="(min-width: 768px) 768px, 100vw"
                   alt={selectedPhoto.caption || 'Photo'}
                   className="w-full max-h-[50vh] object-contain bg-black"
                 />
@@ -2253,6 +2289,7 @@ export default function ShowDetailPage() {
           isOpen={friendMapOpen}
           onClose={() => setFriendMapOpen(false)}
           showId={parseInt(showId)}
+          concertId={show.concert_id ?? null}
           userLocation={userLocation}
           venueLocation={
             show.venue?.latitude && show.venue?.longitude
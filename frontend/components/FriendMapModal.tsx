@@ -13,10 +13,17 @@ interface FriendLocation {
   updated_at?: string;
 }
 
+// Socket location events also say which show (and concert) the position is for
+interface LocationEvent {
+  show_id: number;
+  concert_id: number | null;
+}
+
 interface FriendMapModalProps {
   isOpen: boolean;
   onClose: () => void;
   showId: number;
+  concertId: number | null;
   userLocation: { lat: number; lng: number } | null;
   venueLocation?: { lat: number; lng: number } | null;
 }
@@ -30,6 +37,7 @@ export default function FriendMapModal({
   isOpen,
   onClose,
   showId,
+  concertId,
   userLocation,
   venueLocation,
 }: FriendMapModalProps) {
@@ -74,7 +82,12 @@ export default function FriendMapModal({
   useEffect(() => {
     if (!isOpen || !socket) return;
 
-    const handleLocationUpdate = (data: FriendLocation) => {
+    // Friends' positions at other concerts reach this socket too
+    const atThisConcert = (data: LocationEvent) =>
+      data.concert_id != null ? data.concert_id === concertId : data.show_id === showId;
+
+    const handleLocationUpdate = (data: FriendLocation & LocationEvent) => {
+      if (!atThisConcert(data)) return;
       setFriends(prev => {
         const idx = prev.findIndex(f => f.user_id === data.user_id);
         if (idx >= 0) {
@@ -90,7 +103,8 @@ export default function FriendMapModal({
       setFriends(data.friends);
     };
 
-    const handleLocationStopped = (data: { user_id: number }) => {
+    const handleLocationStopped = (data: { user_id: number } & LocationEvent) => {
+      if (!atThisConcert(data)) return;
       setFriends(prev => prev.filter(f => f.user_id !== data.user_id));
       if (selectedFriend?.user_id === data.user_id) {
         setSelectedFriend(null);
@@ -108,7 +122,7 @@ export default function FriendMapModal({
       socket.off('friends_locations', handleFriendsLocations);
       socket.off('location_stopped', handleLocationStopped);
     };
-  }, [isOpen, socket, selectedFriend]);
+  }, [isOpen, socket, selectedFriend, showId, concertId]);
 
   // Fetch walking directions when a friend is selected
   const fetchDirections = useCallback((friend: FriendLocation) => {
@@ -48,4 +48,64 @@ api.interceptors.response.use(
   }
 );
 
+// Photo srcset values from the API use /api/... paths; point them at the API host
+export function mediaSrcSet(srcset?: string | null): string | undefined {
+  return srcset ? srcset.replace(/\/api\//g, `${API_BASE_URL}/`) : undefined;
+}
+
+// Resumable video upload: the file goes up in chunks, and a dropped chunk is resent from
+// the offset the server reports instead of restarting the whole file
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_RETRIES = 5;
+
+async function chunkChecksum(chunk: Blob): Promise<string | undefined> {
+  if (typeof crypto === 'undefined' || !crypto.subtle) return undefined; // insecure context
+  const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', await chunk.arrayBuffer()));
+  return `sha256 ${btoa(String.fromCharCode(...Array.from(digest)))}`;
+}
+
+export async function uploadVideoResumable(
+  file: File,
+  fields: { show_id: string | number; title?: string; description?: string },
+  onProgress?: (percent: number) => void
+) {
+  const created = await api.post('/videos/uploads', {
+    ...fields,
+    show_id: Number(fields.show_id),
+    filename: file.name,
+    length: file.size,
+  });
+  const uploadPath = `/videos/uploads/${created.data.id}`;
+  let offset = 0;
+  let failures = 0;
+
+  while (offset < file.size) {
+    const chunk = file.slice(offset, offset + UPLOAD_CHUNK_SIZE);
+    const checksum = await chunkChecksum(chunk);
+    try {
+      const response = await api.patch(uploadPath, chunk, {
+        headers: {
+          'Content-Type': 'application/offset+octet-stream',
+          'Upload-Offset': String(offset),
+          ...(checksum ? { 'Upload-Checksum': checksum } : {}),
+        },
+        onUploadProgress: (progressEvent) => {
+          onProgress?.(Math.round(((offset + progressEvent.loaded) * 100) / file.size));
+        },
+      });
+      offset = Number(response.headers['upload-offset']);
+      failures = 0;
+    } catch (error) {
+      if (++failures > UPLOAD_RETRIES) throw error;
+      await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** (failures - 1)));
+      // Resume from whatever the server kept
+      const status = await api.get(uploadPath);
+      offset = status.data.offset;
+    }
+  }
+
+  const completed = await api.post(`${uploadPath}/complete`);
+  return completed.data;
+}
+
 export default api;